@@ -11,6 +11,7 @@ import { useToast } from "@/hooks/use-toast"
 import { Upload, FileText, CheckCircle, Clock, AlertCircle } from "lucide-react"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
 import { useRouter } from "next/navigation"
+import { registryDataAPI } from "@/lib/api"
 
 // 抽出データの型定義
 type ExtractedData = {
@@ -65,8 +66,21 @@ export default function UploadPage() {
     }
   }
 
-  // アップロード処理
-  const handleUpload = () => {
+  // APIの抽出結果を画面の型に変換
+  const toExtractedData = (record: any): ExtractedData => ({
+    id: String(record.id),
+    extractedAt: String(record.extracted_at).split("T")[0],
+    customerName: record.customer_name ?? "",
+    postalCode: record.postal_code ?? "",
+    prefecture: record.prefecture ?? "",
+    currentAddress: record.current_address ?? "",
+    inheritanceAddress: record.inheritance_address ?? "",
+    phoneNumber: record.phone_number ?? "",
+    status: record.status,
+  })
+
+  // アップロード処理（サーバーで抽出し、進捗をSSEで受け取る）
+  const handleUpload = async () => {
     if (!selectedFile) {
       toast({
         title: "ファイルが選択されていません",
@@ -76,67 +90,68 @@ export default function UploadPage() {
       return
     }
 
-    // ファイルサイズに基づいて推定時間を計算（実際のアプリケーションではサーバーから返される）
-    const fileSizeMB = selectedFile.size / (1024 * 1024)
-    const estimatedSeconds = Math.max(20, Math.round(fileSizeMB * 5)) // 5秒/MB、最低20秒
-    setEstimatedTime(estimatedSeconds)
-
     setIsUploading(true)
     setUploadProgress(0)
 
-    // アップロード進捗のシミュレーション
-    const uploadInterval = setInterval(() => {
-      setUploadProgress((prev) => {
-        const next = prev + Math.random() * 10
-        if (next >= 100) {
-          clearInterval(uploadInterval)
-
-          // アップロード完了後、処理開始
-          setIsUploading(false)
-          setIsProcessing(true)
-          setProcessingProgress(0)
-
-          // 経過時間のカウント開始
-          const timerInterval = setInterval(() => {
-            setElapsedTime((prev) => prev + 1)
-          }, 1000)
-
-          // 処理進捗のシミュレーション
-          const processInterval = setInterval(() => {
-            setProcessingProgress((prev) => {
-              // 処理は少しずつ遅くなる
-              const increment = Math.max(1, 10 - Math.floor(prev / 10))
-              const next = prev + increment * Math.random()
-
-              if (next >= 100) {
-                clearInterval(processInterval)
-                clearInterval(timerInterval)
-
-                // 処理完了
-                setIsProcessing(false)
-                setIsComplete(true)
-
-                // ダミーデータを生成
-                const dummyData = generateDummyExtractedData()
-                setExtractedData(dummyData)
-                setEditableData(dummyData)
-
-                toast({
-                  title: "処理が完了しました",
-                  description: `${selectedFile.name} の処理が完了しました。抽出データを確認してください。`,
-                })
-
-                return 100
-              }
-              return next
+    // 経過時間のカウント開始
+    const startedAt = Date.now()
+    const timerInterval = setInterval(() => {
+      setElapsedTime(Math.floor((Date.now() - startedAt) / 1000))
+    }, 1000)
+
+    const rows: ExtractedData[] = []
+    try {
+      await registryDataAPI.uploadLedgers([selectedFile], {
+        onUploadProgress: (percent) => setUploadProgress(percent),
+        onEvent: ({ event, data }) => {
+          if (event === "upload") {
+            // アップロード完了後、処理開始
+            setUploadProgress(100)
+            setIsUploading(false)
+            setIsProcessing(true)
+            setProcessingProgress(0)
+          } else if (event === "progress") {
+            setProcessingProgress((data.pages_done / data.pages) * 100)
+            // これまでのページ処理速度から全体の所要時間を推定
+            const elapsedSeconds = (Date.now() - startedAt) / 1000
+            setEstimatedTime(Math.round((elapsedSeconds / data.pages_done) * data.pages))
+          } else if (event === "file") {
+            if (data.duplicate) {
+              toast({
+                title: "アップロード済みのファイルです",
+                description: `${data.filename} は既に取り込まれています`,
+              })
+            }
+            rows.push(...data.records.map(toExtractedData))
+          } else if (event === "error") {
+            toast({
+              title: "PDFを読み取れませんでした",
+              description: data.detail,
+              variant: "destructive",
             })
-          }, 500)
+          }
+        },
+      })
 
-          return 100
-        }
-        return next
+      // 処理完了
+      setExtractedData(rows)
+      setEditableData(rows)
+      setIsComplete(true)
+      toast({
+        title: "処理が完了しました",
+        description: `${selectedFile.name} の処理が完了しました。抽出データを確認してください。`,
       })
-    }, 200)
+    } catch (error) {
+      toast({
+        title: "アップロードに失敗しました",
+        description: error instanceof Error ? error.message : String(error),
+        variant: "destructive",
+      })
+    } finally {
+      clearInterval(timerInterval)
+      setIsUploading(false)
+      setIsProcessing(false)
+    }
   }
 
   // 残り時間の計算
@@ -214,26 +229,6 @@ export default function UploadPage() {
     router.push("/dashboard/customers")
   }
 
-  // ダミーデータ生成
-  const generateDummyExtractedData = (): ExtractedData[] => {
-    const prefectures = ["東京都", "神奈川県", "埼玉県", "千葉県", "大阪府", "京都府", "兵庫県", "愛知県"]
-
-    return Array.from({ length: 5 }, (_, i) => {
-      const prefecture = prefectures[Math.floor(Math.random() * prefectures.length)]
-      return {
-        id: `${Date.now()}-${i}`,
-        extractedAt: new Date().toISOString().split("T")[0],
-        customerName: `相続者 太郎${i + 1}`,
-        postalCode: `${100 + Math.floor(Math.random() * 900)}-${1000 + Math.floor(Math.random() * 9000)}`,
-        prefecture: prefecture,
-        currentAddress: `${prefecture}${["新宿区", "渋谷区", "中央区", "港区"][i % 4]}${i + 1}-${i + 1}-${i + 1}`,
-        inheritanceAddress: `${prefecture}${["品川区", "目黒区", "世田谷区", "杉並区"][i % 4]}${i + 1}-${i + 1}-${i + 1}`,
-        phoneNumber: `03-${1234 + i}-${5678 + i}`,
-        status: i % 5 === 0 ? "registered" : i % 4 === 0 ? "error" : "pending",
-      }
-    })
-  }
-
   return (
     <div className="space-y-6">
       <Card>
@@ -1,11 +1,13 @@
-from typing import Generator, Optional
+from typing import AsyncGenerator, Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.db.session import SessionLocal
+from app.core.cache import principal_cache
+from app.db.session import AsyncSessionLocal, SessionLocal, SessionRunner
 from app.models.user import User
 from app.core.config import settings
 from app.schemas.user import TokenPayload
@@ -14,15 +16,27 @@ oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
-def get_db() -> Generator:
+async def get_db() -> AsyncGenerator[SessionRunner, None]:
+    if settings.DB_ASYNC:
+        async with AsyncSessionLocal() as session:
+            yield SessionRunner(session)
+        return
+    
+    db = SessionLocal()
     try:
-        db = SessionLocal()
-        yield db
+        yield SessionRunner(db)
     finally:
-        db.close()
+        await run_in_threadpool(db.close)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+def _get_user(db: Session, user_id: int) -> Optional[User]:
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        # Detach so the instance can be shared with requests on other sessions.
+        db.expunge(user)
+    return user
+
+async def get_current_user(
+    db: SessionRunner = Depends(get_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     try:
         payload = jwt.decode(
@@ -34,17 +48,24 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = db.query(User).filter(User.id == token_data.sub).first()
+    key = str(token_data.sub)
+    user = principal_cache.get(key)
+    if user is not None:
+        return user
+    
+    user = await db.run(_get_user, token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if settings.PRINCIPAL_CACHE_TTL_SECONDS > 0:
+        principal_cache.set(key, user, settings.PRINCIPAL_CACHE_TTL_SECONDS)
     return user
 
-def get_current_active_user(
+async def get_current_active_user(
     current_user: User = Depends(get_current_user),
 ) -> User:
     return current_user
 
-def get_current_owner(
+async def get_current_owner(
     current_user: User = Depends(get_current_user),
 ) -> User:
     if current_user.role != "owner":
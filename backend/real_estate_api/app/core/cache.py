@@ -0,0 +1,322 @@
+"""
+Small result cache with pluggable storage backends.
+
+CacheBackend is the storage interface; InMemoryCache is the default
+in-process LRU/TTL implementation. SQLiteCache persists entries in a local
+file shared by every worker, and TieredCache puts an InMemoryCache in front
+of it. ResultCache runs on the event loop and goes through get_async and
+set_async, which do the SQLite work in the thread pool.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+class CacheBackend:
+    """Storage interface for ResultCache."""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, keys: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """get for callers on the event loop; backends that block override it."""
+        return self.get(key)
+
+    async def set_async(self, key: str, value: Any, ttl: float) -> None:
+        self.set(key, value, ttl)
+
+
+class InMemoryCache(CacheBackend):
+    """Thread-safe in-process cache with LRU eviction and per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache(CacheBackend):
+    """JSON values in a SQLite file; survives restarts and is shared between workers."""
+
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return (value, seconds left) for a live entry."""
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            return None
+        return json.loads(row[0]), remaining
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), now + ttl),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+
+    def contains(self, keys: Iterable[str]) -> set:
+        keys = list(keys)
+        found = set()
+        conn = self._connect()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key FROM cache_entries WHERE expires_at > ? "
+                f"AND key IN ({','.join('?' * len(chunk))})",
+                (time.time(), *chunk),
+            )
+            found.update(row[0] for row in rows)
+        return found
+
+    def delete(self, keys: Iterable[str]) -> None:
+        self._connect().executemany(
+            "DELETE FROM cache_entries WHERE key = ?", [(key,) for key in keys]
+        )
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM cache_entries")
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        return await run_in_threadpool(self.get, key)
+
+    async def set_async(self, key: str, value: Any, ttl: float) -> None:
+        await run_in_threadpool(self.set, key, value, ttl)
+
+
+class TieredCache(CacheBackend):
+    """An InMemoryCache in front of a SQLiteCache; persistent hits are promoted."""
+
+    def __init__(self, memory: InMemoryCache, persistent: SQLiteCache):
+        self.memory = memory
+        self.persistent = persistent
+        self.memory_hits = 0
+        self.persistent_hits = 0
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+        return value
+
+    def _promote(self, key: str, entry: Optional[Tuple[Any, float]]) -> Optional[Any]:
+        if entry is None:
+            return None
+        value, remaining = entry
+        self.memory.set(key, value, remaining)
+        self.persistent_hits += 1
+        return value
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return self._promote(key, self.persistent.get_entry(key))
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        if value is not None:
+            return value
+        return self._promote(key, await run_in_threadpool(self.persistent.get_entry, key))
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, value, ttl)
+        self.persistent.set(key, value, ttl)
+
+    async def set_async(self, key: str, value: Any, ttl: float) -> None:
+        self.memory.set(key, value, ttl)
+        await self.persistent.set_async(key, value, ttl)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        self.memory.delete(keys)
+        self.persistent.delete(keys)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "memory_entries": len(self.memory),
+        }
+
+
+class ResultCache:
+    """
+    Caches JSON-compatible results under a namespace and counts hits and misses.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        namespace: str,
+        ttl: float,
+        negative_ttl: Optional[float] = None,
+        is_negative: Optional[Callable[[Any], bool]] = None,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        # Failed results are kept for negative_ttl instead of ttl.
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.is_negative = is_negative
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        value = await self.backend.get_async(self._key(key))
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = jsonable_encoder(await compute())
+        ttl = self.negative_ttl if self.is_negative and self.is_negative(value) else self.ttl
+        if ttl > 0:
+            await self.backend.set_async(self._key(key), value, ttl)
+        return value
+
+    def cached_keys(self, keys: Iterable[str]) -> set:
+        """The subset of keys with a live entry in the persistent tier."""
+        persistent = getattr(self.backend, "persistent", self.backend)
+        if not isinstance(persistent, SQLiteCache):
+            return set()
+        prefix = len(self.namespace) + 1
+        return {key[prefix:] for key in persistent.contains(self._key(key) for key in keys)}
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        self.backend.delete([self._key(key) for key in keys])
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+        if hasattr(self.backend, "stats"):
+            stats.update(self.backend.stats())
+        return stats
+
+
+ANALYTICS_ENDPOINTS = ("dashboard", "status", "sales")
+
+analytics_cache = ResultCache(
+    InMemoryCache(max_entries=settings.ANALYTICS_CACHE_MAX_ENTRIES),
+    namespace="analytics",
+    ttl=settings.ANALYTICS_CACHE_TTL_SECONDS,
+)
+
+
+def analytics_scope(user: Any) -> str:
+    """Owners see every customer; members only see their own."""
+    return "all" if user.role == "owner" else f"user:{user.id}"
+
+
+def invalidate_analytics(*assigned_to: Optional[int]) -> None:
+    """Drop cached analytics visible to the owners and the given assignees."""
+    scopes = {"all"} | {f"user:{user_id}" for user_id in assigned_to if user_id is not None}
+    analytics_cache.invalidate(
+        f"{endpoint}:{scope}" for endpoint in ANALYTICS_ENDPOINTS for scope in scopes
+    )
+
+
+# Resolved users for get_current_user, keyed by the token subject. The cached
+# objects are detached from their session, so they only carry column values.
+principal_cache = InMemoryCache(max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+def invalidate_principal(*user_ids: int) -> None:
+    """Forget cached users after their row changed or was deleted."""
+    principal_cache.delete(str(user_id) for user_id in user_ids)
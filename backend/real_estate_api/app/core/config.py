@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from typing import Optional, Dict, Any, List
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -23,8 +24,104 @@ class Settings(BaseSettings):
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
     
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_PROCESSES: bool = os.getenv("PASSWORD_HASH_PROCESSES", "true").lower() in ("1", "true", "yes")
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+    
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./real_estate.db")
     
+    # Serve API routes through the async engine (aiosqlite / asyncpg) instead of
+    # the threadpool-backed sync engine. ASYNC_DATABASE_URL overrides the driver.
+    DB_ASYNC: bool = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes")
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+    
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    
+    # SQLite connection profile, applied to every new connection.
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))  # negative = KiB
+    
+    RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_USER_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_USER_PER_MINUTE", str(RATE_LIMIT_PER_MINUTE)))
+    # Extra limits per route, e.g. "POST /api/v1/auth/login=10,/api/v1/customers/export=5"
+    RATE_LIMIT_ROUTES: str = os.getenv("RATE_LIMIT_ROUTES", "POST /api/v1/auth/login=20")
+    RATE_LIMIT_STORE: str = os.getenv("RATE_LIMIT_STORE", "memory")  # memory/sqlite
+    RATE_LIMIT_SQLITE_PATH: str = os.getenv(
+        "RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "real_estate_rate_limits.db")
+    )
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+    
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+    # Bulk customer operations, committed in chunks.
+    CUSTOMER_BULK_MAX_OPERATIONS: int = int(os.getenv("CUSTOMER_BULK_MAX_OPERATIONS", "10000"))
+    CUSTOMER_BULK_CHUNK: int = int(os.getenv("CUSTOMER_BULK_CHUNK", "1000"))
+    
+    ANALYTICS_CACHE_TTL_SECONDS: float = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "60"))
+    ANALYTICS_CACHE_MAX_ENTRIES: int = int(os.getenv("ANALYTICS_CACHE_MAX_ENTRIES", "1024"))
+    
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "4096"))
+    
+    # External lookup services. An empty base URL serves the built-in offline data.
+    POSTAL_CODE_API_URL: str = os.getenv("POSTAL_CODE_API_URL", "")
+    POSTAL_CODE_API_KEY: str = os.getenv("POSTAL_CODE_API_KEY", "mock_api_key")
+    POSTAL_CODE_MIN_INTERVAL: float = float(os.getenv("POSTAL_CODE_MIN_INTERVAL", "1"))
+    PHONE_NUMBER_API_URL: str = os.getenv("PHONE_NUMBER_API_URL", "")
+    PHONE_NUMBER_API_KEY: str = os.getenv("PHONE_NUMBER_API_KEY", "mock_api_key")
+    PHONE_NUMBER_MIN_INTERVAL: float = float(os.getenv("PHONE_NUMBER_MIN_INTERVAL", "1"))
+    REGISTRY_LIBRARY_URL: str = os.getenv("REGISTRY_LIBRARY_URL", "")
+    REGISTRY_LIBRARY_MIN_INTERVAL: float = float(os.getenv("REGISTRY_LIBRARY_MIN_INTERVAL", "5"))
+    # Pooled Registry Library sessions: "user1:password1,user2:password2".
+    REGISTRY_LIBRARY_ACCOUNTS: str = os.getenv("REGISTRY_LIBRARY_ACCOUNTS", "")
+    REGISTRY_LIBRARY_SESSIONS_PER_ACCOUNT: int = int(os.getenv("REGISTRY_LIBRARY_SESSIONS_PER_ACCOUNT", "1"))
+    REGISTRY_LIBRARY_MAX_CONCURRENCY: int = int(os.getenv("REGISTRY_LIBRARY_MAX_CONCURRENCY", "0"))  # 0 = one per session
+    REGISTRY_LIBRARY_SESSION_TTL: float = float(os.getenv("REGISTRY_LIBRARY_SESSION_TTL", "1500"))
+    REGISTRY_LIBRARY_HEALTH_CHECK_INTERVAL: float = float(os.getenv("REGISTRY_LIBRARY_HEALTH_CHECK_INTERVAL", "300"))  # 0 = off
+    # Registry PDFs, stored by SHA-256 so identical documents are kept once.
+    REGISTRY_PDF_DIR: str = os.getenv("REGISTRY_PDF_DIR", "./data/registry_pdfs")
+    REGISTRY_PDF_CONCURRENCY: int = int(os.getenv("REGISTRY_PDF_CONCURRENCY", "2"))
+    # Reception ledger uploads: extraction runs one page per worker.
+    REGISTRY_UPLOAD_MAX_BYTES: int = int(os.getenv("REGISTRY_UPLOAD_MAX_BYTES", str(200 * 1024 * 1024)))
+    REGISTRY_UPLOAD_INSERT_BATCH: int = int(os.getenv("REGISTRY_UPLOAD_INSERT_BATCH", "500"))
+    REGISTRY_EXTRACT_PROCESSES: bool = os.getenv("REGISTRY_EXTRACT_PROCESSES", "true").lower() in ("1", "true", "yes")
+    REGISTRY_EXTRACT_WORKERS: int = int(os.getenv("REGISTRY_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+    # Promotion of registry rows to customers, committed in chunks; explicit id lists are capped.
+    REGISTRY_PROMOTE_CHUNK: int = int(os.getenv("REGISTRY_PROMOTE_CHUNK", "500"))
+    REGISTRY_PROMOTION_MAX_IDS: int = int(os.getenv("REGISTRY_PROMOTION_MAX_IDS", "10000"))
+    # Background registry jobs, queued in a local SQLite file shared by all workers.
+    JOB_QUEUE_PATH: str = os.getenv("JOB_QUEUE_PATH", "./data/jobs.db")
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "0"))  # 0 = one per Registry Library session
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+    JOB_RETRY_DELAY: float = float(os.getenv("JOB_RETRY_DELAY", "10"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+    JOB_RETENTION_SECONDS: float = float(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+    JOB_EVENTS_KEEPALIVE_SECONDS: float = float(os.getenv("JOB_EVENTS_KEEPALIVE_SECONDS", "15"))
+    # Offline postal code index compiled from KEN_ALL.CSV (python -m app.core.postal_index rebuild).
+    POSTAL_INDEX_PATH: str = os.getenv("POSTAL_INDEX_PATH", "./data/postal_codes.idx")
+    POSTAL_INDEX_SOURCE: str = os.getenv("POSTAL_INDEX_SOURCE", "")
+    # Cache of upstream lookup results: in-process LRU plus a SQLite file.
+    LOOKUP_CACHE_PATH: str = os.getenv("LOOKUP_CACHE_PATH", "./data/lookup_cache.db")
+    LOOKUP_CACHE_MAX_ENTRIES: int = int(os.getenv("LOOKUP_CACHE_MAX_ENTRIES", "10000"))
+    LOOKUP_CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("LOOKUP_CACHE_NEGATIVE_TTL_SECONDS", "300"))
+    POSTAL_CODE_CACHE_TTL_SECONDS: float = float(os.getenv("POSTAL_CODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+    PHONE_NUMBER_CACHE_TTL_SECONDS: float = float(os.getenv("PHONE_NUMBER_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    LOOKUP_CACHE_WARM_ON_STARTUP: bool = os.getenv("LOOKUP_CACHE_WARM_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+    LOOKUP_CACHE_WARM_LIMIT: int = int(os.getenv("LOOKUP_CACHE_WARM_LIMIT", "1000"))
+    EXTERNAL_BATCH_MAX_ITEMS: int = int(os.getenv("EXTERNAL_BATCH_MAX_ITEMS", "10000"))
+    EXTERNAL_BATCH_CONCURRENCY: int = int(os.getenv("EXTERNAL_BATCH_CONCURRENCY", "8"))
+    EXTERNAL_HTTP_TIMEOUT: float = float(os.getenv("EXTERNAL_HTTP_TIMEOUT", "10"))
+    EXTERNAL_HTTP_MAX_CONNECTIONS: int = int(os.getenv("EXTERNAL_HTTP_MAX_CONNECTIONS", "20"))
+    EXTERNAL_HTTP_MAX_KEEPALIVE: int = int(os.getenv("EXTERNAL_HTTP_MAX_KEEPALIVE", "10"))
+    
     class Config:
         case_sensitive = True
 
@@ -0,0 +1,290 @@
+"""
+Duplicate detection across customers and registry rows.
+
+Comparing every pair of records is quadratic, so each record is reduced to a
+few blocking keys and only records sharing a key are candidates:
+
+    phone   digits of the phone number           09012345678
+    name    postal code digits + folded name     1500001:山田太郎
+    email   local part of the email address      taro.yamada
+
+Keys live in the duplicate_keys table. Write paths call index_customers /
+index_registry_rows / unindex_records inside their own transaction, like the
+analytics rollups; rebuild_duplicate_keys scans every record for data written
+before the index existed. Registered registry rows are left out, as the
+customer created from them already stands for them.
+
+Clusters are paged by their smallest shared key. A GROUP BY over the index
+lists the colliding keys in key order after the cursor, and each page only
+follows the keys and records of its own clusters. The cost of a page grows
+with the size of its clusters, not with the number of pairs or of records.
+
+Usage:
+    python -m app.core.duplicates rebuild
+"""
+import unicodedata
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, insert, or_, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.customer import Customer
+from app.models.duplicate_key import DuplicateKey
+from app.models.registry_data import RegistryData
+
+CUSTOMER, REGISTRY_DATA = "customer", "registry_data"
+KINDS = ("phone", "name", "email")
+
+Key = Tuple[str, str]
+Record = Tuple[str, int]
+Entry = Tuple[int, Optional[int], Set[Key]]
+
+
+def _digits(value: str) -> str:
+    return "".join(char for char in unicodedata.normalize("NFKC", value) if char.isdigit())
+
+
+def fold_name(value: str) -> str:
+    """Names compare without spaces, width or case: "山田　太郎" == "山田太郎"."""
+    return "".join(unicodedata.normalize("NFKC", value).casefold().split())
+
+
+def blocking_keys(
+    name: Optional[str],
+    phone_number: Optional[str],
+    postal_code: Optional[str],
+    email: Optional[str] = None,
+) -> Set[Key]:
+    keys = set()
+    phone = _digits(phone_number or "")
+    if len(phone) >= 10:
+        keys.add(("phone", phone))
+    postal = _digits(postal_code or "")
+    folded = fold_name(name or "")
+    if len(postal) == 7 and folded:
+        keys.add(("name", f"{postal}:{folded}"))
+    local_part = unicodedata.normalize("NFKC", email or "").strip().casefold().partition("@")[0]
+    if local_part:
+        keys.add(("email", local_part))
+    return keys
+
+
+def _field(record: Any, name: str) -> Any:
+    return record.get(name) if isinstance(record, Mapping) else getattr(record, name, None)
+
+
+def _customer_entry(customer: Any) -> Entry:
+    return (
+        _field(customer, "id"),
+        _field(customer, "assigned_to"),
+        blocking_keys(
+            _field(customer, "name"), _field(customer, "phone_number"),
+            _field(customer, "postal_code"), _field(customer, "email"),
+        ),
+    )
+
+
+def _registry_entry(row: Any) -> Entry:
+    keys = set()
+    if _field(row, "status") != "registered":
+        keys = blocking_keys(
+            _field(row, "customer_name"), _field(row, "phone_number"), _field(row, "postal_code")
+        )
+    return _field(row, "id"), _field(row, "created_by"), keys
+
+
+def _insert_keys(db: Session, record_type: str, entries: Iterable[Entry]) -> None:
+    rows = [
+        {"kind": kind, "key": key, "record_type": record_type, "record_id": record_id, "owner_id": owner_id}
+        for record_id, owner_id, keys in entries
+        for kind, key in keys
+    ]
+    if rows:
+        db.execute(insert(DuplicateKey), rows)
+
+
+def unindex_records(db: Session, record_type: str, record_ids: List[int]) -> None:
+    if record_ids:
+        db.query(DuplicateKey).filter(
+            DuplicateKey.record_type == record_type, DuplicateKey.record_id.in_(record_ids)
+        ).delete(synchronize_session=False)
+
+
+def index_customers(db: Session, customers: Iterable[Any]) -> None:
+    """(Re)write the keys of flushed customers, given as rows or mappings."""
+    entries = [_customer_entry(customer) for customer in customers]
+    unindex_records(db, CUSTOMER, [record_id for record_id, _, _ in entries])
+    _insert_keys(db, CUSTOMER, entries)
+
+
+def index_registry_rows(db: Session, rows: Iterable[Any]) -> None:
+    """(Re)write the keys of registry rows, given as rows or mappings."""
+    entries = [_registry_entry(row) for row in rows]
+    unindex_records(db, REGISTRY_DATA, [record_id for record_id, _, _ in entries])
+    _insert_keys(db, REGISTRY_DATA, entries)
+
+
+def existing_customer_keys(db: Session, keys: Set[Key]) -> Set[Key]:
+    """The given keys that some customer already has."""
+    if not keys:
+        return set()
+    return {
+        (kind, key) for kind, key in
+        db.query(DuplicateKey.kind, DuplicateKey.key)
+        .filter(DuplicateKey.record_type == CUSTOMER, tuple_(DuplicateKey.kind, DuplicateKey.key).in_(keys))
+        .distinct()
+    }
+
+
+def rebuild_duplicate_keys(db: Session, batch_size: int = 1000) -> Dict[str, int]:
+    """Recompute the key index from every customer and registry row."""
+    db.query(DuplicateKey).delete(synchronize_session=False)
+    sources = [
+        (CUSTOMER, _customer_entry, Customer.id, db.query(
+            Customer.id, Customer.assigned_to, Customer.name, Customer.phone_number,
+            Customer.postal_code, Customer.email,
+        )),
+        (REGISTRY_DATA, _registry_entry, RegistryData.id, db.query(
+            RegistryData.id, RegistryData.created_by, RegistryData.customer_name,
+            RegistryData.phone_number, RegistryData.postal_code, RegistryData.status,
+        ).filter(or_(RegistryData.status.is_(None), RegistryData.status != "registered"))),
+    ]
+    counts = {}
+    for record_type, entry, id_column, query in sources:
+        counts[record_type] = 0
+        last_id = 0
+        while True:
+            # Keyset batches keep memory flat however large the backlog is.
+            batch = query.filter(id_column > last_id).order_by(id_column).limit(batch_size).all()
+            if not batch:
+                break
+            _insert_keys(db, record_type, (entry(row) for row in batch))
+            counts[record_type] += len(batch)
+            last_id = batch[-1].id
+    counts["keys"] = db.query(func.count(DuplicateKey.id)).scalar()
+    db.commit()
+    return counts
+
+
+def ensure_duplicate_keys(db: Session) -> None:
+    """Build the key index on first start against a database that predates it."""
+    if db.query(DuplicateKey.id).first():
+        return
+    if db.query(Customer.id).first() or db.query(RegistryData.id).first():
+        rebuild_duplicate_keys(db)
+
+
+def _shared_keys(db: Session, criteria: List[Any]):
+    """Keys carried by more than one record, in key order."""
+    return (
+        db.query(DuplicateKey.kind, DuplicateKey.key)
+        .filter(*criteria)
+        .group_by(DuplicateKey.kind, DuplicateKey.key)
+        .having(func.count(DuplicateKey.id) > 1)
+        .order_by(DuplicateKey.kind, DuplicateKey.key)
+    )
+
+
+def _expand_cluster(db: Session, criteria: List[Any], key: Key) -> Tuple[Set[Key], Set[Record]]:
+    """Follow shared keys and the records carrying them out from one key."""
+    keys, records, frontier = {key}, set(), {key}
+    while frontier:
+        found = {
+            (record_type, record_id) for record_type, record_id in
+            db.query(DuplicateKey.record_type, DuplicateKey.record_id)
+            .filter(*criteria, tuple_(DuplicateKey.kind, DuplicateKey.key).in_(frontier))
+        } - records
+        records |= found
+        if not found:
+            break
+        # One IN list per record type; SQLite does not use the index for row values here.
+        by_type: Dict[str, List[int]] = {}
+        for record_type, record_id in found:
+            by_type.setdefault(record_type, []).append(record_id)
+        candidates = {
+            (kind, key) for kind, key in
+            db.query(DuplicateKey.kind, DuplicateKey.key).filter(*criteria, or_(*(
+                and_(DuplicateKey.record_type == record_type, DuplicateKey.record_id.in_(record_ids))
+                for record_type, record_ids in by_type.items()
+            )))
+        } - keys
+        frontier = {
+            (kind, key) for kind, key in
+            _shared_keys(db, criteria).filter(tuple_(DuplicateKey.kind, DuplicateKey.key).in_(candidates))
+        } if candidates else set()
+        keys |= frontier
+    return keys, records
+
+
+def find_duplicate_clusters(
+    db: Session,
+    owner_id: Optional[int] = None,
+    kinds: Optional[Iterable[str]] = None,
+    limit: int = 100,
+    after: Optional[Key] = None,
+) -> Tuple[List[Tuple[List[Key], List[Record]]], Optional[Key]]:
+    """
+    One page of groups of records connected by shared keys, in order of each
+    group's smallest key, starting after the key `after`. Each cluster is
+    (shared keys, [(record type, record id), ...]); the second value is the
+    `after` of the next page, None on the last one.
+
+    Shared keys are read in key order from the index and only the clusters on
+    the page are expanded, so a page costs about the same however large the
+    index is.
+    """
+    criteria = []
+    if owner_id is not None:
+        criteria.append(DuplicateKey.owner_id == owner_id)
+    if kinds:
+        criteria.append(DuplicateKey.kind.in_(list(kinds)))
+
+    clusters: List[Tuple[List[Key], List[Record]]] = []
+    covered: Set[Key] = set()
+    batch_size = max(limit, 100)
+    # One cluster past the page tells whether there is a next page.
+    while len(clusters) <= limit:
+        query = _shared_keys(db, criteria)
+        if after is not None:
+            query = query.filter(tuple_(DuplicateKey.kind, DuplicateKey.key) > after)
+        batch = [(kind, key) for kind, key in query.limit(batch_size)]
+        for key in batch:
+            if key in covered:
+                continue
+            keys, records = _expand_cluster(db, criteria, key)
+            covered |= keys
+            # A cluster reaching back before this key was on an earlier page.
+            if min(keys) == key:
+                clusters.append((sorted(keys), sorted(records)))
+                if len(clusters) > limit:
+                    break
+        if len(batch) < batch_size:
+            break
+        after = batch[-1]
+
+    if len(clusters) > limit:
+        clusters = clusters[:limit]
+        return clusters, clusters[-1][0][0]
+    return clusters, None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the duplicate detection key index.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        counts = rebuild_duplicate_keys(db)
+        print(
+            f"Indexed {counts[CUSTOMER]} customers and {counts[REGISTRY_DATA]} registry rows "
+            f"into {counts['keys']} keys"
+        )
+    finally:
+        db.close()
@@ -1,282 +1,614 @@
-import requests
+import asyncio
+import os
+import re
+import threading
 import time
-from typing import Dict, Any, Optional
+import unicodedata
+import weakref
+from typing import AsyncIterator, Awaitable, Callable, Dict, Any, Iterable, List, Optional
 import logging
 
+import anyio
+import httpx
+
+from app.core.cache import InMemoryCache, ResultCache, SQLiteCache, TieredCache
+from app.core.config import settings
+from app.core.postal_index import PostalCodeIndex, postal_code_index
+
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-class PostalCodeService:
+class ExternalServiceError(Exception):
+    """The remote service could not be reached or answered with an error."""
+
+
+class RegistrySessionExpired(ExternalServiceError):
+    """The Registry Library rejected the session; log in again and retry."""
+
+
+class AsyncRateLimiter:
+    """
+    Spaces calls at least min_interval seconds apart without blocking threads.
+    Each caller reserves the next free slot on arrival, so waiters are served
+    in the order they called acquire().
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# One pooled keep-alive client per event loop; connections cannot move between loops.
+_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=settings.EXTERNAL_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.EXTERNAL_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.EXTERNAL_HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        _http_clients[loop] = client
+    return client
+
+
+async def close_http_client() -> None:
+    """Close the pooled client of the running event loop, if any."""
+    client = _http_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def lookup_cache(namespace: str, ttl: float) -> ResultCache:
+    """
+    Two-tier cache for upstream lookup results: an in-process LRU in front of
+    the SQLite file at LOOKUP_CACHE_PATH. Errors are kept for the shorter
+    LOOKUP_CACHE_NEGATIVE_TTL_SECONDS.
+    """
+    return ResultCache(
+        TieredCache(
+            InMemoryCache(max_entries=settings.LOOKUP_CACHE_MAX_ENTRIES),
+            SQLiteCache(settings.LOOKUP_CACHE_PATH),
+        ),
+        namespace=namespace,
+        ttl=ttl,
+        negative_ttl=settings.LOOKUP_CACHE_NEGATIVE_TTL_SECONDS,
+        is_negative=lambda value: "error" in value,
+    )
+
+
+class ExternalService:
+    """
+    Base for the lookup clients: throttled requests on the shared HTTP client,
+    optionally behind a result cache keyed on the normalised input.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        limiter: AsyncRateLimiter,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limiter = limiter
+        self.client = client
+        self.cache = cache
+
+    @property
+    def is_remote(self) -> bool:
+        return bool(self.base_url)
+
+    def _headers(self) -> Dict[str, str]:
+        return {}
+
+    async def _request(self, method: str, path: str, **kwargs: Any) -> httpx.Response:
+        await self.limiter.acquire()
+        client = self.client or get_http_client()
+        try:
+            return await client.request(
+                method, f"{self.base_url}{path}", headers=self._headers(), **kwargs
+            )
+        except httpx.HTTPError as exc:
+            raise ExternalServiceError(f"{type(self).__name__}: {exc}") from exc
+
+    async def _cached(self, key: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        if self.cache is None:
+            return await fetch()
+
+        async def fetch_or_failure() -> Dict[str, Any]:
+            try:
+                return await fetch()
+            except ExternalServiceError as exc:
+                return {"error": str(exc), "unavailable": True}
+
+        result = await self.cache.get_or_compute(key, fetch_or_failure)
+        if result.get("unavailable"):
+            # A recent upstream failure; answer from the cache instead of retrying.
+            raise ExternalServiceError(result["error"])
+        return result
+
+    def _check(self, response: httpx.Response, method: str, path: str) -> None:
+        if response.status_code >= 400:
+            raise ExternalServiceError(
+                f"{type(self).__name__}: {method} {path} returned {response.status_code}"
+            )
+
+    async def _json(self, method: str, path: str, **kwargs: Any) -> Dict[str, Any]:
+        response = await self._request(method, path, **kwargs)
+        self._check(response, method, path)
+        return response.json()
+
+
+POSTAL_REGIONS = {
+    "0": {"prefecture": "Hokkaido", "city": "Sapporo"},
+    "1": {"prefecture": "Tokyo", "city": "Chiyoda"},
+    "2": {"prefecture": "Kanagawa", "city": "Yokohama"},
+    "3": {"prefecture": "Saitama", "city": "Saitama"},
+    "4": {"prefecture": "Aichi", "city": "Nagoya"},
+    "5": {"prefecture": "Osaka", "city": "Osaka"},
+    "6": {"prefecture": "Hyogo", "city": "Kobe"},
+    "7": {"prefecture": "Fukuoka", "city": "Fukuoka"},
+    "8": {"prefecture": "Okinawa", "city": "Naha"},
+    "9": {"prefecture": "Kyoto", "city": "Kyoto"}
+}
+
+PHONE_NUMBER_TYPES = {
+    "0": "Mobile",
+    "1": "Landline",
+    "2": "Business",
+    "3": "Mobile",
+    "4": "Landline",
+    "5": "Mobile",
+    "6": "Landline",
+    "7": "Mobile",
+    "8": "Toll-free",
+    "9": "Premium"
+}
+
+
+def is_valid_postal_code(postal_code: str) -> bool:
+    return len(postal_code) == 8 and postal_code[3] == '-'
+
+
+def is_valid_phone_number(phone_number: str) -> bool:
+    return len(phone_number) >= 10 and len(phone_number) <= 13
+
+
+# Dash-like characters NFKC leaves alone (katakana prolonged mark, minus sign, ...).
+_DASHES = re.compile("[\u2010-\u2015\u2212\u30fc\uff70]")
+
+
+def normalize_postal_code(value: str) -> str:
+    """Canonical "123-4567" form for inputs like "〒１２３－４５６７" or "1234567"."""
+    value = _DASHES.sub("-", unicodedata.normalize("NFKC", value))
+    value = "".join(value.split()).lstrip("〒")
+    if len(value) == 7 and value.isdigit():
+        return f"{value[:3]}-{value[3:]}"
+    return value
+
+
+def normalize_phone_number(value: str) -> str:
+    """Strip full-width characters, spaces and brackets from a phone number."""
+    value = _DASHES.sub("-", unicodedata.normalize("NFKC", value))
+    return "".join(char for char in value if char not in " ()\t")
+
+
+def offline_postal_code(postal_code: str) -> Dict[str, Any]:
+    """Built-in sample data used when no postal code API is configured."""
+    region = POSTAL_REGIONS.get(postal_code[0], {"prefecture": "Unknown", "city": "Unknown"})
+
+    return {
+        "postal_code": postal_code,
+        "prefecture": region["prefecture"],
+        "city": region["city"],
+        "street": "Example Street",
+        "success": True
+    }
+
+
+def offline_phone_number(phone_number: str) -> Dict[str, Any]:
+    """Built-in sample data used when no phone number API is configured."""
+    first_digit = phone_number[0] if phone_number[0] != '+' else phone_number[1]
+
+    return {
+        "phone_number": phone_number,
+        "type": PHONE_NUMBER_TYPES.get(first_digit, "Unknown"),
+        "carrier": "Example Carrier",
+        "is_valid": True,
+        "success": True
+    }
+
+
+class PostalCodeService(ExternalService):
     """
     Service for postal code lookups.
-    In a real application, this would integrate with an actual postal code API.
+    Answers from the offline KEN_ALL index and only calls the API at base_url
+    for codes the index does not know. Without either it serves sample data.
     """
-    
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
-        self.api_key = api_key or "mock_api_key"
-        self.base_url = base_url or "https://api.postal-code-service.example.com"
-        self.last_request_time = 0
-        self.rate_limit_delay = 1  # seconds between requests
-    
-    def _throttle(self):
-        """Throttle requests to respect rate limits"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
-    
-    def lookup(self, postal_code: str) -> Dict[str, Any]:
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[AsyncRateLimiter] = None,
+        index: Optional[PostalCodeIndex] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        super().__init__(
+            settings.POSTAL_CODE_API_URL if base_url is None else base_url,
+            limiter or AsyncRateLimiter(settings.POSTAL_CODE_MIN_INTERVAL),
+            client,
+            cache,
+        )
+        self.api_key = api_key or settings.POSTAL_CODE_API_KEY
+        self.index = index or postal_code_index
+
+    def _headers(self) -> Dict[str, str]:
+        return {"X-API-Key": self.api_key}
+
+    async def lookup(self, postal_code: str) -> Dict[str, Any]:
         """
         Look up address details by postal code.
-        
+
         Args:
             postal_code: The postal code to look up
-            
+
         Returns:
             Dict containing address details
         """
-        self._throttle()
-        
         logger.info(f"Looking up postal code: {postal_code}")
-        
-        if not (len(postal_code) == 8 and postal_code[3] == '-'):
+
+        postal_code = normalize_postal_code(postal_code)
+        if not is_valid_postal_code(postal_code):
             return {"error": "Invalid postal code format"}
-        
-        first_digit = postal_code[0]
-        
-        regions = {
-            "0": {"prefecture": "Hokkaido", "city": "Sapporo"},
-            "1": {"prefecture": "Tokyo", "city": "Chiyoda"},
-            "2": {"prefecture": "Kanagawa", "city": "Yokohama"},
-            "3": {"prefecture": "Saitama", "city": "Saitama"},
-            "4": {"prefecture": "Aichi", "city": "Nagoya"},
-            "5": {"prefecture": "Osaka", "city": "Osaka"},
-            "6": {"prefecture": "Hyogo", "city": "Kobe"},
-            "7": {"prefecture": "Fukuoka", "city": "Fukuoka"},
-            "8": {"prefecture": "Okinawa", "city": "Naha"},
-            "9": {"prefecture": "Kyoto", "city": "Kyoto"}
-        }
-        
-        region = regions.get(first_digit, {"prefecture": "Unknown", "city": "Unknown"})
-        
-        return {
-            "postal_code": postal_code,
-            "prefecture": region["prefecture"],
-            "city": region["city"],
-            "street": "Example Street",
-            "success": True
-        }
 
+        address = self.index.get(postal_code)
+        if address is not None:
+            return {**address, "success": True}
+
+        if not self.is_remote:
+            if self.index.available:
+                return {"error": "Postal code not found"}
+            return offline_postal_code(postal_code)
+
+        return await self._cached(postal_code, lambda: self._fetch(postal_code))
 
-class PhoneNumberService:
+    async def _fetch(self, postal_code: str) -> Dict[str, Any]:
+        response = await self._request("GET", f"/postal-codes/{postal_code}")
+        if response.status_code == 404:
+            return {"error": "Postal code not found"}
+        if response.status_code >= 400:
+            raise ExternalServiceError(f"Postal code lookup returned {response.status_code}")
+        return {**response.json(), "success": True}
+
+
+class PhoneNumberService(ExternalService):
     """
     Service for phone number lookups.
-    In a real application, this would integrate with an actual phone number API.
+    Calls the API at base_url, or answers from built-in sample data when none is set.
     """
-    
-    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
-        self.api_key = api_key or "mock_api_key"
-        self.base_url = base_url or "https://api.phone-number-service.example.com"
-        self.last_request_time = 0
-        self.rate_limit_delay = 1  # seconds between requests
-    
-    def _throttle(self):
-        """Throttle requests to respect rate limits"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
-    
-    def lookup(self, phone_number: str) -> Dict[str, Any]:
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[AsyncRateLimiter] = None,
+        cache: Optional[ResultCache] = None,
+    ):
+        super().__init__(
+            settings.PHONE_NUMBER_API_URL if base_url is None else base_url,
+            limiter or AsyncRateLimiter(settings.PHONE_NUMBER_MIN_INTERVAL),
+            client,
+            cache,
+        )
+        self.api_key = api_key or settings.PHONE_NUMBER_API_KEY
+
+    def _headers(self) -> Dict[str, str]:
+        return {"X-API-Key": self.api_key}
+
+    async def lookup(self, phone_number: str) -> Dict[str, Any]:
         """
         Look up details by phone number.
-        
+
         Args:
             phone_number: The phone number to look up
-            
+
         Returns:
             Dict containing phone number details
         """
-        self._throttle()
-        
         logger.info(f"Looking up phone number: {phone_number}")
-        
-        if not (len(phone_number) >= 10 and len(phone_number) <= 13):
+
+        phone_number = normalize_phone_number(phone_number)
+        if not is_valid_phone_number(phone_number):
             return {"error": "Invalid phone number format"}
-        
-        first_digit = phone_number[0] if phone_number[0] != '+' else phone_number[1]
-        
-        number_types = {
-            "0": "Mobile",
-            "1": "Landline",
-            "2": "Business",
-            "3": "Mobile",
-            "4": "Landline",
-            "5": "Mobile",
-            "6": "Landline",
-            "7": "Mobile",
-            "8": "Toll-free",
-            "9": "Premium"
-        }
-        
-        number_type = number_types.get(first_digit, "Unknown")
-        
-        return {
-            "phone_number": phone_number,
-            "type": number_type,
-            "carrier": "Example Carrier",
-            "is_valid": True,
-            "success": True
-        }
 
+        if not self.is_remote:
+            return offline_phone_number(phone_number)
+
+        return await self._cached(phone_number, lambda: self._fetch(phone_number))
+
+    async def _fetch(self, phone_number: str) -> Dict[str, Any]:
+        response = await self._request("GET", f"/phone-numbers/{phone_number}")
+        if response.status_code == 404:
+            return {"error": "Phone number not found"}
+        if response.status_code >= 400:
+            raise ExternalServiceError(f"Phone number lookup returned {response.status_code}")
+        return {**response.json(), "success": True}
+
+
+def offline_registry_search(criteria: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "results": [
+            {
+                "id": "REG123456",
+                "property_type": "Residential",
+                "address": criteria.get("address", "Unknown"),
+                "owner": criteria.get("name", "Unknown"),
+                "registration_date": "2025-01-15"
+            }
+        ]
+    }
+
+
+def offline_registry_details(registry_id: str) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "registry_id": registry_id,
+        "property_type": "Residential",
+        "address": "Tokyo, Shibuya-ku, 1-1-1",
+        "owner": "John Doe",
+        "registration_date": "2025-01-15",
+        "property_details": {
+            "land_area": "150 sq.m",
+            "building_area": "120 sq.m",
+            "construction_type": "Reinforced Concrete",
+            "year_built": "2010"
+        },
+        "ownership_history": [
+            {
+                "owner": "Jane Smith",
+                "from_date": "2005-03-10",
+                "to_date": "2025-01-15",
+                "transfer_type": "Sale"
+            }
+        ]
+    }
 
-class RegistryLibraryService:
+
+def offline_registry_pdf(registry_id: str) -> bytes:
+    return (
+        b"%PDF-1.4\n% sample registry document\n% "
+        + registry_id.encode("utf-8", "replace")
+        + b"\n%%EOF\n"
+    )
+
+
+CONTENT_RANGE = re.compile(r"bytes (?:(\d+)-\d+|\*)/(\d+)")
+
+
+def _range_start(response: httpx.Response) -> Optional[int]:
+    match = CONTENT_RANGE.fullmatch(response.headers.get("content-range", "").strip())
+    return int(match.group(1)) if match and match.group(1) is not None else None
+
+
+def _document_size(response: httpx.Response) -> Optional[int]:
+    """The whole document's size: the total of Content-Range, or Content-Length of a 200."""
+    match = CONTENT_RANGE.fullmatch(response.headers.get("content-range", "").strip())
+    if match:
+        return int(match.group(2))
+    length = response.headers.get("content-length", "")
+    if response.status_code == 200 and length.isdigit():
+        return int(length)
+    return None
+
+
+# The Registry Library is throttled as a whole, however many service objects exist.
+registry_library_limiter = AsyncRateLimiter(settings.REGISTRY_LIBRARY_MIN_INTERVAL)
+
+
+class RegistryLibraryService(ExternalService):
     """
     Service for automating interactions with the Registry Library website.
-    In a real application, this would interact with the actual Registry Library website.
+    Talks to the site at base_url, or answers from built-in sample data when none is set.
     """
-    
-    def __init__(self, username: Optional[str] = None, password: Optional[str] = None):
+
+    def __init__(
+        self,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        limiter: Optional[AsyncRateLimiter] = None,
+    ):
+        super().__init__(
+            settings.REGISTRY_LIBRARY_URL if base_url is None else base_url,
+            limiter or registry_library_limiter,
+            client,
+        )
         self.username = username or "mock_username"
         self.password = password or "mock_password"
-        self.last_request_time = 0
-        self.rate_limit_delay = 5  # seconds between requests (higher for web scraping)
-        self.base_url = "https://registry-library.example.com"
-    
-    def _throttle(self):
-        """Throttle requests to respect rate limits"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
-    
-    def _get_driver(self):
-        """
-        Mock method that would set up a browser driver
-        This is a simplified version that doesn't use Selenium
-        """
-        logger.info("Mock driver setup - no actual browser used")
-        return {"mock_driver": True}
-    
-    def login(self) -> Dict[str, Any]:
+        self.session_token: Optional[str] = None
+
+    def _headers(self) -> Dict[str, str]:
+        if self.session_token:
+            return {"Authorization": f"Bearer {self.session_token}"}
+        return {}
+
+    def _check(self, response: httpx.Response, method: str, path: str) -> None:
+        if response.status_code == 401:
+            raise RegistrySessionExpired(f"Registry Library session rejected on {method} {path}")
+        super()._check(response, method, path)
+
+    async def login(self) -> Dict[str, Any]:
         """
         Log in to the Registry Library website.
-        
+
         Returns:
             Dict containing login status
         """
-        self._throttle()
-        
         logger.info(f"Logging in to Registry Library as {self.username}")
-        
-        
+
+        if not self.is_remote:
+            return {
+                "success": True,
+                "message": "Successfully logged in to Registry Library"
+            }
+
+        result = await self._json(
+            "POST", "/login", json={"username": self.username, "password": self.password}
+        )
+        self.session_token = result.get("token")
         return {
-            "success": True,
-            "message": "Successfully logged in to Registry Library"
+            "success": bool(result.get("success", self.session_token)),
+            "message": result.get("message", "Successfully logged in to Registry Library"),
         }
-    
-    def search_registry(self, criteria: Dict[str, Any]) -> Dict[str, Any]:
+
+    async def search_registry(self, criteria: Dict[str, Any]) -> Dict[str, Any]:
         """
         Search for registry information based on criteria.
-        
+
         Args:
             criteria: Dict containing search criteria (e.g., address, name)
-            
+
         Returns:
             Dict containing search results
         """
-        self._throttle()
-        
         logger.info(f"Searching Registry Library with criteria: {criteria}")
-        
-        
-        return {
-            "success": True,
-            "results": [
-                {
-                    "id": "REG123456",
-                    "property_type": "Residential",
-                    "address": criteria.get("address", "Unknown"),
-                    "owner": criteria.get("name", "Unknown"),
-                    "registration_date": "2025-01-15"
-                }
-            ]
-        }
-    
-    def get_registry_details(self, registry_id: str) -> Dict[str, Any]:
+
+        if not self.is_remote:
+            return offline_registry_search(criteria)
+        return await self._json("GET", "/search", params=criteria)
+
+    async def get_registry_details(self, registry_id: str) -> Dict[str, Any]:
         """
         Get detailed information for a specific registry.
-        
+
         Args:
             registry_id: The ID of the registry to retrieve
-            
+
         Returns:
             Dict containing registry details
         """
-        self._throttle()
-        
         logger.info(f"Getting details for registry ID: {registry_id}")
-        
-        
-        return {
-            "success": True,
-            "registry_id": registry_id,
-            "property_type": "Residential",
-            "address": "Tokyo, Shibuya-ku, 1-1-1",
-            "owner": "John Doe",
-            "registration_date": "2025-01-15",
-            "property_details": {
-                "land_area": "150 sq.m",
-                "building_area": "120 sq.m",
-                "construction_type": "Reinforced Concrete",
-                "year_built": "2010"
-            },
-            "ownership_history": [
-                {
-                    "owner": "Jane Smith",
-                    "from_date": "2005-03-10",
-                    "to_date": "2025-01-15",
-                    "transfer_type": "Sale"
-                }
-            ]
-        }
-    
-    def download_registry_pdf(self, registry_id: str, save_path: str) -> Dict[str, Any]:
+
+        if not self.is_remote:
+            return offline_registry_details(registry_id)
+        return await self._json("GET", f"/registries/{registry_id}")
+
+    async def download_registry_pdf(self, registry_id: str, save_path: str, resume: bool = False) -> Dict[str, Any]:
         """
-        Download the PDF for a specific registry.
-        
+        Download the PDF for a specific registry, streaming it to disk.
+
         Args:
             registry_id: The ID of the registry to download
             save_path: The path where the PDF should be saved
-            
+            resume: Continue a partial file at save_path with a Range request
+
         Returns:
-            Dict containing download status
+            Dict containing download status and the document's full size, if known
         """
-        self._throttle()
-        
         logger.info(f"Downloading PDF for registry ID: {registry_id} to {save_path}")
-        
-        
+
+        size = None
+        if self.is_remote:
+            path = f"/registries/{registry_id}/pdf"
+            offset = os.path.getsize(save_path) if resume and os.path.exists(save_path) else 0
+            headers = self._headers()
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+            await self.limiter.acquire()
+            client = self.client or get_http_client()
+            try:
+                async with client.stream("GET", f"{self.base_url}{path}", headers=headers) as response:
+                    size = _document_size(response)
+                    # 416: the partial file already holds the whole document.
+                    if not (offset and response.status_code == 416):
+                        self._check(response, "GET", path)
+                        if response.status_code == 206 and _range_start(response) != offset:
+                            os.remove(save_path)
+                            raise ExternalServiceError(
+                                f"RegistryLibraryService: range for {registry_id} does not start at byte {offset}"
+                            )
+                        # 206 continues the partial file; 200 means the whole document was sent again.
+                        mode = "ab" if response.status_code == 206 else "wb"
+                        async with await anyio.open_file(save_path, mode) as file:
+                            async for chunk in response.aiter_bytes():
+                                await file.write(chunk)
+            except httpx.HTTPError as exc:
+                raise ExternalServiceError(f"RegistryLibraryService: {exc}") from exc
+        else:
+            content = offline_registry_pdf(registry_id)
+            size = len(content)
+            async with await anyio.open_file(save_path, "wb") as file:
+                await file.write(content)
+
         return {
             "success": True,
             "message": f"Successfully downloaded PDF for registry ID: {registry_id}",
-            "file_path": save_path
+            "file_path": save_path,
+            "size": size,
         }
-    
-    def close(self):
-        """Mock method to close the browser session"""
-        logger.info("Mock closing Registry Library session - no actual browser used")
+
+    async def close(self):
+        """Forget the Registry Library session."""
+        logger.info("Closing Registry Library session")
+        self.session_token = None
+
+
+async def resolve_batch(
+    values: Iterable[str],
+    normalize: Callable[[str], str],
+    lookup: Callable[[str], Awaitable[Dict[str, Any]]],
+    concurrency: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Look up each distinct normalised value once, at most `concurrency` at a
+    time, yielding {"value", "inputs", "result" | "error"} as lookups finish.
+    """
+    inputs: Dict[str, List[str]] = {}
+    for value in values:
+        inputs.setdefault(normalize(value), []).append(value)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(value: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                result = await lookup(value)
+            except ExternalServiceError as exc:
+                result = {"error": str(exc)}
+        item: Dict[str, Any] = {"value": value, "inputs": inputs[value]}
+        if "error" in result:
+            item["error"] = result["error"]
+        else:
+            item["result"] = result
+        return item
+
+    tasks = [asyncio.ensure_future(resolve(value)) for value in inputs]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # The client may disconnect mid-stream; drop the lookups still queued.
+        for task in tasks:
+            task.cancel()
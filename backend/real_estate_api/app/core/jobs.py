@@ -0,0 +1,336 @@
+"""
+Background jobs for slow upstream work, queued in a local SQLite file.
+
+Requests submit a job and return its id straight away; a pool of worker tasks
+claims queued jobs and runs the registered handler for their kind. Claiming
+takes a lease, so a job whose worker died with its process is picked up again
+once the lease expires, and the queue survives restarts. Each claim carries its
+own lease token; a worker whose lease was taken over cannot record an outcome. Every worker process
+on the host shares the same file.
+
+Job states: queued -> running -> succeeded | failed. Handlers raising
+ExternalServiceError are retried with backoff up to JOB_MAX_ATTEMPTS.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.external_services import ExternalServiceError
+from app.core.registry_pool import registry_session_pool
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+FINISHED = (SUCCEEDED, FAILED)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+class JobFailed(Exception):
+    """Raised by a handler for a failure that retrying will not fix."""
+
+
+def _timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+class JobStore:
+    """Job rows in a SQLite file; claims are serialized with BEGIN IMMEDIATE."""
+
+    PRUNE_EVERY = 500
+    COLUMNS = (
+        "id, kind, params, owner_id, status, result, error, attempts, created_at, updated_at"
+    )
+
+    def __init__(self, path: str, retention: float = 7 * 24 * 3600):
+        self.path = path
+        self.retention = retention
+        self._local = threading.local()
+        self._submits = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, "
+                "owner_id INTEGER, status TEXT NOT NULL, result TEXT, error TEXT, "
+                "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                "updated_at REAL NOT NULL, available_at REAL NOT NULL, lease_expires_at REAL, "
+                "lease_owner TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "lease_owner" not in columns:
+                # Queue files created before leases were tokened.
+                conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_jobs_status_available_at ON jobs (status, available_at)"
+            )
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job_id, kind, params, owner_id, status, result, error, attempts, created_at, updated_at = row
+        return {
+            "id": job_id,
+            "kind": kind,
+            "params": json.loads(params),
+            "owner_id": owner_id,
+            "status": status,
+            "result": json.loads(result) if result is not None else None,
+            "error": error,
+            "attempts": attempts,
+            "created_at": _timestamp(created_at),
+            "updated_at": _timestamp(updated_at),
+        }
+
+    def submit(self, kind: str, params: Dict[str, Any], owner_id: Optional[int] = None) -> Dict[str, Any]:
+        conn = self._connect()
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        conn.execute(
+            "INSERT INTO jobs (id, kind, params, owner_id, status, created_at, updated_at, available_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(params, ensure_ascii=False), owner_id, QUEUED, now, now, now),
+        )
+        self._submits += 1
+        if self._submits % self.PRUNE_EVERY == 0:
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*FINISHED, now - self.retention),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"SELECT {self.COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        return self._row(row)
+
+    def claim(self, lease: float) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest runnable job, including running jobs whose lease ran out.
+        The job's "lease" token is needed to finish or retry it.
+        """
+        conn = self._connect()
+        now = time.time()
+        token = uuid.uuid4().hex
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_expires_at < ?) ORDER BY available_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_expires_at = ?, "
+                    "lease_owner = ?, updated_at = ? WHERE id = ?",
+                    (RUNNING, now + lease, token, now, row[0]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        return {**self.get(row[0]), "lease": token}
+
+    def finish(
+        self,
+        job_id: str,
+        lease: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """Record the outcome; False if the lease was lost to another worker."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires_at = NULL, "
+            "lease_owner = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+            (
+                FAILED if error is not None else SUCCEEDED,
+                json.dumps(result, ensure_ascii=False) if result is not None else None,
+                error,
+                time.time(),
+                job_id,
+                lease,
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def retry(self, job_id: str, lease: str, error: str, delay: float) -> bool:
+        """Queue the job again after delay; False if the lease was lost to another worker."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_expires_at = NULL, "
+            "lease_owner = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+            (QUEUED, error, now + delay, now, job_id, lease),
+        )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)} | dict(rows)
+
+
+class JobQueue:
+    """Worker tasks that claim jobs from a JobStore and run their handlers."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        workers: int = 1,
+        max_attempts: int = 3,
+        lease: float = 300.0,
+        retry_delay: float = 10.0,
+        poll_interval: float = 1.0,
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.handlers: Dict[str, Handler] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def handler(self, kind: str) -> Callable[[Handler], Handler]:
+        def register(fn: Handler) -> Handler:
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    async def submit(self, kind: str, params: Dict[str, Any], owner_id: Optional[int] = None) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = await run_in_threadpool(self.store.submit, kind, params, owner_id)
+        if self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job
+
+    async def run_one(self) -> bool:
+        """Claim and run one job; False when nothing is ready."""
+        job = await run_in_threadpool(self.store.claim, self.lease)
+        if job is None:
+            return False
+
+        handler = self.handlers.get(job["kind"])
+        if handler is None:
+            await self._finish(job, None, f"Unknown job kind: {job['kind']}")
+        elif job["attempts"] > self.max_attempts:
+            # Claimed again after its worker stopped on the last attempt.
+            await self._finish(job, None, job["error"] or "Job was interrupted")
+        else:
+            await self._execute(job, handler)
+        return True
+
+    async def _finish(self, job: Dict[str, Any], result: Optional[Dict[str, Any]], error: Optional[str] = None) -> None:
+        if not await run_in_threadpool(self.store.finish, job["id"], job["lease"], result, error):
+            logger.warning(f"Job {job['id']} ({job['kind']}) lost its lease; its outcome was discarded")
+
+    async def _retry(self, job: Dict[str, Any], error: str, delay: float) -> None:
+        if not await run_in_threadpool(self.store.retry, job["id"], job["lease"], error, delay):
+            logger.warning(f"Job {job['id']} ({job['kind']}) lost its lease; its retry was discarded")
+
+    async def _execute(self, job: Dict[str, Any], handler: Handler) -> None:
+        try:
+            result = await handler(job["params"])
+        except JobFailed as exc:
+            await self._finish(job, None, str(exc))
+        except ExternalServiceError as exc:
+            if job["attempts"] < self.max_attempts:
+                delay = self.retry_delay * 2 ** (job["attempts"] - 1)
+                await self._retry(job, str(exc), delay)
+            else:
+                await self._finish(job, None, str(exc))
+        except Exception as exc:
+            logger.exception(f"Job {job['id']} ({job['kind']}) failed")
+            await self._finish(job, None, f"Internal error: {exc}")
+        else:
+            await self._finish(job, result)
+
+    async def drain(self) -> int:
+        """Run jobs until none is ready; returns how many ran."""
+        ran = 0
+        while await self.run_one():
+            ran += 1
+        return ran
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                if await self.run_one():
+                    continue
+            except Exception:
+                logger.exception("Job worker error")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        # A job cut off here stays running until its lease expires, then runs again.
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks, self._wakeup, self._loop = [], None, None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": len(self._tasks), **self.store.counts()}
+
+
+job_queue = JobQueue(
+    JobStore(settings.JOB_QUEUE_PATH, retention=settings.JOB_RETENTION_SECONDS),
+    # The session pool caps concurrent Registry Library requests anyway.
+    workers=settings.JOB_WORKERS or len(registry_session_pool.sessions),
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    lease=settings.JOB_LEASE_SECONDS,
+    retry_delay=settings.JOB_RETRY_DELAY,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+)
+
+
+def _checked(result: Dict[str, Any], message: str) -> Dict[str, Any]:
+    if not result.get("success", False):
+        raise JobFailed(result.get("message", message))
+    return result
+
+
+@job_queue.handler("registry_search")
+async def registry_search_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    result = await registry_session_pool.run(lambda service: service.search_registry(params))
+    return _checked(result, "Failed to search Registry Library")
+
+
+@job_queue.handler("registry_details")
+async def registry_details_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    result = await registry_session_pool.run(
+        lambda service: service.get_registry_details(params["registry_id"])
+    )
+    return _checked(result, "Failed to get registry details")
@@ -1,98 +1,169 @@
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
-import time
+"""
+Rate limiting and CSRF protection as plain ASGI middleware.
+
+Both wrap the application callable directly instead of subclassing
+BaseHTTPMiddleware, so a request passes through without an extra task or
+memory stream per layer and streaming responses are forwarded untouched.
+"""
 import secrets
-from typing import Dict, List, Optional
-import asyncio
+from typing import List, Optional, Tuple
+
+from jose import jwt, JWTError
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.ratelimit import InMemoryRateLimitStore, RateLimitRule, RateLimitStore
+
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+def _is_excluded(path: str, exclude_paths: List[str]) -> bool:
+    return any(path.startswith(prefix) for prefix in exclude_paths)
+
+
+class RateLimitMiddleware:
+    """
+    Limits requests per client. Authenticated requests are counted per user,
+    anonymous ones per IP; route rules add stricter limits on top.
+    """
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         rate_limit_per_minute: int = 60,
-        exclude_paths: Optional[List[str]] = None
+        exclude_paths: Optional[List[str]] = None,
+        user_rate_limit_per_minute: Optional[int] = None,
+        route_limits: Optional[List[RateLimitRule]] = None,
+        store: Optional[RateLimitStore] = None,
     ):
-        super().__init__(app)
+        self.app = app
         self.rate_limit = rate_limit_per_minute
+        self.user_rate_limit = user_rate_limit_per_minute or rate_limit_per_minute
         self.exclude_paths = exclude_paths or []
-        self.request_counts: Dict[str, List[float]] = {}
+        self.route_limits = route_limits or []
+        self.store = store or InMemoryRateLimitStore()
+    
+    def _client_identity(self, conn: HTTPConnection) -> Tuple[str, bool]:
+        authorization = conn.headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            except JWTError:
+                payload = {}
+            if payload.get("sub"):
+                return f"user:{payload['sub']}", True
         
-        self.cleanup_task = asyncio.create_task(self._cleanup_old_requests())
+        client_ip = conn.client.host if conn.client else "unknown"
+        return f"ip:{client_ip}", False
     
-    async def _cleanup_old_requests(self):
-        while True:
-            await asyncio.sleep(60)  # Run every minute
-            current_time = time.time()
-            for ip, timestamps in list(self.request_counts.items()):
-                self.request_counts[ip] = [ts for ts in timestamps if current_time - ts < 60]
-                if not self.request_counts[ip]:
-                    del self.request_counts[ip]
+    def _rules(self, method: str, path: str, is_user: bool) -> List[RateLimitRule]:
+        default = RateLimitRule(
+            name="default", limit=self.user_rate_limit if is_user else self.rate_limit
+        )
+        return [default] + [rule for rule in self.route_limits if rule.matches(method, path)]
     
-    async def dispatch(self, request: Request, call_next):
-        for path in self.exclude_paths:
-            if request.url.path.startswith(path):
-                return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _is_excluded(scope["path"], self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
         
-        client_ip = request.client.host if request.client else "unknown"
+        identity, is_user = self._client_identity(HTTPConnection(scope))
         
-        if client_ip not in self.request_counts:
-            self.request_counts[client_ip] = []
-        
-        current_time = time.time()
-        
-        recent_requests = [ts for ts in self.request_counts[client_ip] if current_time - ts < 60]
-        self.request_counts[client_ip] = recent_requests
-        
-        if len(recent_requests) >= self.rate_limit:
-            return JSONResponse(
-                status_code=429,
-                content={"detail": "Rate limit exceeded. Please try again later."}
-            )
+        # A request is only counted when every rule allows it.
+        results = await self.store.hit_all_async(
+            (f"{rule.name}:{identity}", rule.limit, rule.window)
+            for rule in self._rules(scope["method"], scope["path"], is_user)
+        )
+        tightest = None
+        for result in results:
+            if not result.allowed:
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Rate limit exceeded. Please try again later."},
+                    headers={
+                        "Retry-After": str(result.retry_after),
+                        "X-RateLimit-Limit": str(result.limit),
+                        "X-RateLimit-Remaining": "0",
+                    },
+                )
+                await response(scope, receive, send)
+                return
+            if tightest is None or result.remaining < tightest.remaining:
+                tightest = result
         
-        self.request_counts[client_ip].append(current_time)
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(tightest.limit)
+                headers["X-RateLimit-Remaining"] = str(tightest.remaining)
+            await send(message)
         
-        return await call_next(request)
+        await self.app(scope, receive, send_with_headers)
 
-class CSRFMiddleware(BaseHTTPMiddleware):
+class CSRFMiddleware:
+    """
+    Double-submit cookie check: unsafe methods must echo the CSRF cookie in a
+    header. GET responses issue the cookie when the client has none.
+    """
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         csrf_token_header: str = "X-CSRF-Token",
         csrf_cookie_name: str = "csrf_token",
         exclude_methods: Optional[List[str]] = None,
         exclude_paths: Optional[List[str]] = None
     ):
-        super().__init__(app)
+        self.app = app
         self.csrf_token_header = csrf_token_header
         self.csrf_cookie_name = csrf_cookie_name
         self.exclude_methods = exclude_methods or ["GET", "HEAD", "OPTIONS"]
         self.exclude_paths = exclude_paths or ["/api/auth/login", "/api/auth/register"]
     
-    async def dispatch(self, request: Request, call_next):
-        if request.method in self.exclude_methods:
-            response = await call_next(request)
-            if request.method == "GET" and self.csrf_cookie_name not in request.cookies:
-                response.set_cookie(
-                    key=self.csrf_cookie_name,
-                    value=secrets.token_hex(32),
-                    httponly=True,
-                    samesite="strict",
-                    secure=True  # Set to False for development without HTTPS
-                )
-            return response
+    def _cookie_header(self) -> str:
+        response = Response()
+        response.set_cookie(
+            key=self.csrf_cookie_name,
+            value=secrets.token_hex(32),
+            httponly=True,
+            samesite="strict",
+            secure=True  # Set to False for development without HTTPS
+        )
+        return response.headers["set-cookie"]
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        conn = HTTPConnection(scope)
+        method = scope["method"]
+        if method in self.exclude_methods:
+            if method != "GET" or self.csrf_cookie_name in conn.cookies:
+                await self.app(scope, receive, send)
+                return
+            
+            async def send_with_cookie(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("set-cookie", self._cookie_header())
+                await send(message)
+            
+            await self.app(scope, receive, send_with_cookie)
+            return
         
-        for path in self.exclude_paths:
-            if request.url.path.startswith(path):
-                return await call_next(request)
+        if _is_excluded(scope["path"], self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
         
-        csrf_cookie = request.cookies.get(self.csrf_cookie_name)
-        csrf_header = request.headers.get(self.csrf_token_header)
+        csrf_cookie = conn.cookies.get(self.csrf_cookie_name)
+        csrf_header = conn.headers.get(self.csrf_token_header)
         
         if not csrf_cookie or not csrf_header or csrf_cookie != csrf_header:
-            return JSONResponse(
+            response = JSONResponse(
                 status_code=403,
                 content={"detail": "CSRF token missing or invalid"}
             )
+            await response(scope, receive, send)
+            return
         
-        return await call_next(request)
+        await self.app(scope, receive, send)
@@ -0,0 +1,86 @@
+"""
+Opaque keyset (cursor) pagination over descending or ascending sort keys.
+"""
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import String, tuple_, type_coerce
+from sqlalchemy.orm import Query
+
+from app.db.session import is_sqlite
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _parse_value(column: Any, value: Any) -> Any:
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor length mismatch")
+        return [_parse_value(column, value) for column, value in zip(columns, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor",
+        )
+
+
+def _bind(column: Any, value: Any) -> Any:
+    if is_sqlite and isinstance(value, datetime) and column.server_default is not None:
+        # SQLite compares timestamps as text; match the CURRENT_TIMESTAMP format
+        # server defaults are stored in, with microseconds only when present.
+        # Values written by the application keep the column type's own format.
+        return type_coerce(value.replace(tzinfo=None).isoformat(sep=" "), String)
+    return value
+
+
+def keyset_page(
+    query: Query,
+    columns: Sequence[Any],
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = True,
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Return one page of `query` ordered by `columns` (descending unless told
+    otherwise), plus the cursor for the next page (None on the last page).
+    `skip` is honoured as a plain offset when no cursor is given, for older
+    clients.
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        keys = tuple_(*columns)
+        bound = tuple_(*[_bind(column, value) for column, value in zip(columns, values)])
+        query = query.filter(keys < bound if descending else keys > bound)
+
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return rows, next_cursor
@@ -0,0 +1,206 @@
+"""
+Content-addressed store for registry PDFs.
+
+Documents are kept under their SHA-256 digest, so identical registries share
+one file however many times they are downloaded:
+
+    objects/ab/abcdef....pdf    finished documents, named by digest
+    partial/<key>.part          downloads in progress, resumed after a failure
+
+Downloads stream straight to the partial file and at most `concurrency` run
+at once per event loop; concurrent requests for the same registry share one
+download. Across event loops and worker processes an exclusive lock on the
+partial file keeps two downloads from writing it at once, and a file is only
+stored once its size matches what the Registry Library announced.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+try:
+    import fcntl
+except ImportError:
+    # Without advisory locks every download gets its own file and none resume.
+    fcntl = None
+
+from app.core.config import settings
+from app.core.external_services import ExternalServiceError
+
+HASH_CHUNK_SIZE = 1024 * 1024
+LOCK_POLL_INTERVAL = 0.05
+
+Download = Callable[[str, str], Awaitable[Dict[str, Any]]]
+
+
+class _LoopState:
+    def __init__(self, concurrency: int):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
+class RegistryPdfStore:
+    """Registry PDFs on local disk, addressed by SHA-256."""
+
+    def __init__(self, root: str, concurrency: int = 2, attempts: int = 3):
+        self.root = root
+        self.concurrency = concurrency
+        self.attempts = attempts
+        self._states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.downloads = 0
+        self.duplicates = 0
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], f"{sha256}.pdf")
+
+    def has(self, sha256: Optional[str]) -> bool:
+        return bool(sha256) and os.path.exists(self.path_for(sha256))
+
+    def _partial_path(self, registry_id: str) -> str:
+        # Registry ids come from callers; hash them rather than trusting them in a path.
+        key = hashlib.sha256(registry_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "partial", f"{key}.part")
+
+    @staticmethod
+    def _try_lock(lock_path: str) -> Optional[int]:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # The previous holder removes the lock file on release; a lock on
+            # that removed file guards nothing.
+            if os.fstat(fd).st_ino == os.stat(lock_path).st_ino:
+                return fd
+        except (BlockingIOError, FileNotFoundError):
+            pass
+        os.close(fd)
+        return None
+
+    async def _lock(self, lock_path: str) -> int:
+        while True:
+            fd = self._try_lock(lock_path)
+            if fd is not None:
+                return fd
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    @staticmethod
+    def _unlock(lock_path: str, fd: int) -> None:
+        os.remove(lock_path)
+        os.close(fd)
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            state = self._states[loop] = _LoopState(self.concurrency)
+        return state
+
+    def temp_path(self) -> str:
+        """A fresh path in the store's partial directory, for files written elsewhere."""
+        directory = os.path.join(self.root, "partial")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{uuid.uuid4().hex}.part")
+
+    def _commit(self, partial_path: str) -> Dict[str, Any]:
+        """Hash a finished download and move it to its content address."""
+        digest = hashlib.sha256()
+        size = 0
+        with open(partial_path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return self.add(partial_path, digest.hexdigest(), size)
+
+    def add(self, partial_path: str, sha256: str, size: int) -> Dict[str, Any]:
+        """Move a complete file whose digest is already known to its content address."""
+        path = self.path_for(sha256)
+        if os.path.exists(path):
+            os.remove(partial_path)
+            self.duplicates += 1
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(partial_path, path)
+        return {"sha256": sha256, "path": path, "size": size}
+
+    async def fetch(self, registry_id: str, download: Download) -> Dict[str, Any]:
+        """
+        Download a registry's PDF into the store with download(registry_id, path).
+
+        Returns {"sha256", "path", "size"}. A failed download keeps its partial
+        file and the next attempt continues from where it stopped.
+        """
+        state = self._state()
+        shared = state.inflight.get(registry_id)
+        if shared is not None:
+            return await asyncio.shield(shared)
+
+        future = asyncio.get_running_loop().create_future()
+        state.inflight[registry_id] = future
+        try:
+            async with state.semaphore:
+                result = await self._download(registry_id, download)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception as retrieved when nobody else was waiting.
+            future.exception()
+            raise
+        finally:
+            del state.inflight[registry_id]
+
+    async def _download(self, registry_id: str, download: Download) -> Dict[str, Any]:
+        if fcntl is None:
+            path = self.temp_path()
+            try:
+                return await self._download_to(registry_id, download, path)
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+
+        partial_path = self._partial_path(registry_id)
+        os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+        lock_path = f"{os.path.splitext(partial_path)[0]}.lock"
+        fd = await self._lock(lock_path)
+        try:
+            return await self._download_to(registry_id, download, partial_path)
+        finally:
+            self._unlock(lock_path, fd)
+
+    async def _download_to(self, registry_id: str, download: Download, path: str) -> Dict[str, Any]:
+        for attempt in range(1, self.attempts + 1):
+            try:
+                result = await download(registry_id, path)
+                self._check_size(registry_id, path, result.get("size"))
+                break
+            except ExternalServiceError:
+                if attempt == self.attempts:
+                    raise
+        self.downloads += 1
+        return await run_in_threadpool(self._commit, path)
+
+    @staticmethod
+    def _check_size(registry_id: str, path: str, expected: Optional[int]) -> None:
+        """Drop a file that does not hold the whole document, so the next attempt starts over."""
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if expected is not None and size != expected:
+            if os.path.exists(path):
+                os.remove(path)
+            raise ExternalServiceError(
+                f"Registry PDF {registry_id} has {size} bytes, expected {expected}"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {"downloads": self.downloads, "duplicates": self.duplicates}
+
+
+registry_pdf_store = RegistryPdfStore(
+    settings.REGISTRY_PDF_DIR, concurrency=settings.REGISTRY_PDF_CONCURRENCY
+)
@@ -0,0 +1,219 @@
+"""
+Offline postal code index compiled from Japan Post's KEN_ALL CSV.
+
+The index is one read-only file that every worker memory-maps, so the pages
+are shared through the OS page cache instead of being copied per process:
+
+    header   magic (8 bytes), record count (uint32)
+    keys     record count x uint32, the 7-digit postal codes in ascending order
+    offsets  (record count + 1) x uint32, record boundaries in the string table
+    strings  UTF-8 records "prefecture\\tcity\\ttown[|town...]"
+
+A lookup is a binary search over the keys plus one small decode.
+
+Rebuild with:
+    python -m app.core.postal_index rebuild [KEN_ALL.CSV] [--output PATH]
+"""
+import bisect
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+MAGIC = b"KENIDX1\0"
+HEADER = struct.Struct("<8sI")
+
+# KEN_ALL columns used here.
+POSTAL_CODE, PREFECTURE, CITY, TOWN = 2, 6, 7, 8
+# Placeholder town names meaning "the whole city" or "no further breakdown".
+GENERIC_TOWNS = ("以下に掲載がない場合",)
+
+
+def parse_ken_all(rows: Iterable[List[str]]) -> Iterator[Tuple[int, str, str, List[str]]]:
+    """
+    Yield (postal code, prefecture, city, towns) per postal code.
+
+    KEN_ALL splits long town names over consecutive rows while a parenthesis
+    is open, and lists one row per town when a code covers several towns.
+    """
+    current: Optional[Tuple[int, str, str, List[str]]] = None
+    for row in rows:
+        code = int(row[POSTAL_CODE])
+        town = row[TOWN]
+        if current is not None and current[0] == code:
+            towns = current[3]
+            if towns and towns[-1].count("（") > towns[-1].count("）"):
+                towns[-1] += town
+            elif town not in towns:
+                towns.append(town)
+            continue
+        if current is not None:
+            yield current
+        current = (code, row[PREFECTURE], row[CITY], [town])
+    if current is not None:
+        yield current
+
+
+def _record(prefecture: str, city: str, towns: List[str]) -> bytes:
+    towns = ["" if town.startswith(GENERIC_TOWNS) else town for town in towns]
+    return "\t".join((prefecture, city, "|".join(towns))).encode("utf-8")
+
+
+def build_index(csv_path: str, output_path: str, encoding: str = "cp932") -> int:
+    """Compile a KEN_ALL CSV into an index file; returns the number of postal codes."""
+    with open(csv_path, newline="", encoding=encoding) as file:
+        entries = sorted(parse_ken_all(csv.reader(file)), key=lambda entry: entry[0])
+
+    keys, offsets, strings = [], [0], bytearray()
+    for code, prefecture, city, towns in entries:
+        keys.append(code)
+        strings += _record(prefecture, city, towns)
+        offsets.append(len(strings))
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, len(keys)))
+        file.write(struct.pack(f"<{len(keys)}I", *keys))
+        file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        file.write(strings)
+    # Workers that still map the old file keep reading it until they reload.
+    os.replace(tmp_path, output_path)
+    return len(keys)
+
+
+class _LittleEndianArray:
+    """Sequence view of packed little-endian uint32s for big-endian hosts."""
+
+    def __init__(self, buffer: memoryview):
+        self.buffer = buffer
+
+    def __len__(self) -> int:
+        return len(self.buffer) // 4
+
+    def __getitem__(self, index: int) -> int:
+        return struct.unpack_from("<I", self.buffer, index * 4)[0]
+
+
+class PostalCodeIndex:
+    """
+    Memory-mapped lookups against a compiled index. The file is opened on first
+    use and re-opened when a rebuild replaces it (checked every RELOAD_INTERVAL).
+    """
+
+    RELOAD_INTERVAL = 30.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._tables: Optional[tuple] = None
+        self._stat: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self.count = 0
+
+    def _open(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        if self._stat == (stat.st_ino, stat.st_mtime_ns):
+            return
+
+        with open(self.path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = HEADER.unpack_from(mapped)
+        if magic != MAGIC:
+            mapped.close()
+            raise ValueError(f"{self.path} is not a postal code index")
+
+        view = memoryview(mapped)
+        keys_start = HEADER.size
+        offsets_start = keys_start + count * 4
+        strings_start = offsets_start + (count + 1) * 4
+        if sys.byteorder == "little":
+            keys = view[keys_start:offsets_start].cast("I")
+            offsets = view[offsets_start:strings_start].cast("I")
+        else:
+            keys = _LittleEndianArray(view[keys_start:offsets_start])
+            offsets = _LittleEndianArray(view[offsets_start:strings_start])
+        # Swapped in one assignment so concurrent lookups never mix two files.
+        self._tables = (keys, offsets, view[strings_start:])
+        self._stat, self.count = (stat.st_ino, stat.st_mtime_ns), count
+
+    def _close(self) -> None:
+        # Concurrent lookups may still hold the old views; the map is released with them.
+        self._tables, self._stat, self.count = None, None, 0
+
+    def _current_tables(self) -> Optional[tuple]:
+        now = time.monotonic()
+        if not self._checked_at or now - self._checked_at >= self.RELOAD_INTERVAL:
+            with self._lock:
+                self._checked_at = now
+                self._open()
+        return self._tables
+
+    @property
+    def available(self) -> bool:
+        return self._current_tables() is not None
+
+    def reload(self) -> None:
+        with self._lock:
+            self._checked_at = time.monotonic()
+            self._open()
+
+    def get(self, postal_code: str) -> Optional[Dict[str, object]]:
+        """Look up "123-4567" or "1234567"; None when the code is not in the index."""
+        digits = postal_code.replace("-", "")
+        if len(digits) != 7 or not digits.isdigit():
+            return None
+        tables = self._current_tables()
+        if tables is None:
+            return None
+
+        keys, offsets, strings = tables
+        code = int(digits)
+        position = bisect.bisect_left(keys, code)
+        if position == len(keys) or keys[position] != code:
+            return None
+
+        record = bytes(strings[offsets[position]:offsets[position + 1]]).decode("utf-8")
+        prefecture, city, towns = record.split("\t")
+        towns = towns.split("|")
+        result: Dict[str, object] = {
+            "postal_code": f"{digits[:3]}-{digits[3:]}",
+            "prefecture": prefecture,
+            "city": city,
+            "street": towns[0],
+        }
+        if len(towns) > 1:
+            result["towns"] = towns
+        return result
+
+
+postal_code_index = PostalCodeIndex(settings.POSTAL_INDEX_PATH)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the offline postal code index.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("csv", nargs="?", default=settings.POSTAL_INDEX_SOURCE,
+                        help="KEN_ALL.CSV from Japan Post")
+    parser.add_argument("--output", default=settings.POSTAL_INDEX_PATH)
+    parser.add_argument("--encoding", default="cp932",
+                        help="cp932 for the original file, utf-8 for the UTF-8 edition")
+    args = parser.parse_args()
+    if not args.csv:
+        parser.error("no CSV given and POSTAL_INDEX_SOURCE is not set")
+
+    count = build_index(args.csv, args.output, args.encoding)
+    print(f"Indexed {count} postal codes into {args.output}")
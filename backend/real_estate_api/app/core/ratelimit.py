@@ -0,0 +1,218 @@
+"""
+Sliding-window-counter rate limiting.
+
+Each key keeps three numbers: the index of the current fixed window, the
+number of hits in it and the number of hits in the previous window. The
+request rate is estimated by weighting the previous window by how much of it
+still overlaps the sliding window, so every check is O(1) in time and memory.
+
+RateLimitStore is the storage interface. InMemoryRateLimitStore is per
+process; SQLiteRateLimitStore keeps the counters in a local SQLite file so
+every worker on the host shares the same limits. A request is checked against
+all of its rules at once with hit_all: hits are only counted when every rule
+allows, so a request rejected by a route rule does not use up the default
+quota. The middleware calls hit_all_async, which SQLiteRateLimitStore runs in
+a worker thread so waiting on the file lock never blocks the event loop.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int
+
+
+class RateLimitRule(NamedTuple):
+    """A limit for requests whose path starts with path_prefix (and method, if set)."""
+    name: str
+    limit: int
+    window: float = 60.0
+    path_prefix: str = "/"
+    method: Optional[str] = None
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.path_prefix) and (self.method is None or self.method == method)
+
+
+def parse_route_limits(spec: str, window: float = 60.0) -> List[RateLimitRule]:
+    """
+    Parse "POST /api/v1/auth/login=10,/api/v1/customers/export=5" into rules.
+    """
+    rules = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, limit = item.rpartition("=")
+        method, _, path = target.strip().rpartition(" ")
+        rules.append(RateLimitRule(
+            name=f"route:{item}", limit=int(limit), window=window,
+            path_prefix=path, method=method.upper() or None,
+        ))
+    return rules
+
+
+def _slide(state: Tuple[int, int, int], now: float, window: float) -> Tuple[int, int, int]:
+    """Move (window_index, current, previous) forward to the window containing now."""
+    index = int(now // window)
+    window_index, current, previous = state
+    if window_index == index:
+        return state
+    if window_index == index - 1:
+        return index, 0, current
+    return index, 0, 0
+
+
+def _evaluate(state: Tuple[int, int, int], now: float, limit: int, window: float) -> Tuple[Tuple[int, int, int], RateLimitResult]:
+    index, current, previous = _slide(state, now, window)
+    elapsed = (now % window) / window
+    estimated = previous * (1 - elapsed) + current
+    if estimated + 1 <= limit:
+        remaining = max(int(limit - estimated - 1), 0)
+        return (index, current + 1, previous), RateLimitResult(True, limit, remaining, 0)
+
+    if current + 1 > limit or previous == 0:
+        # Nothing left to slide out of this window; wait for the next one.
+        wait = window * (1 - elapsed)
+    else:
+        needed = 1 - (limit - 1 - current) / previous
+        wait = window * (needed - elapsed)
+    return (index, current, previous), RateLimitResult(False, limit, 0, max(math.ceil(wait), 1))
+
+
+Hit = Tuple[str, int, float]  # (key, limit, window)
+
+
+def _evaluate_all(
+    states: List[Tuple[int, int, int]], hits: List[Hit], now: float
+) -> Tuple[List[Tuple[int, int, int]], List[RateLimitResult]]:
+    """Evaluate every hit; the new states count them only if all are allowed."""
+    evaluated = [_evaluate(state, now, limit, window) for state, (_, limit, window) in zip(states, hits)]
+    results = [result for _, result in evaluated]
+    if all(result.allowed for result in results):
+        return [state for state, _ in evaluated], results
+    return [_slide(state, now, window) for state, (_, _, window) in zip(states, hits)], results
+
+
+class RateLimitStore:
+    """Storage interface: count hits for keys and report whether they are allowed."""
+
+    def hit_all(self, hits: Iterable[Hit], now: Optional[float] = None) -> List[RateLimitResult]:
+        """Count one hit per (key, limit, window), or none of them if any is over its limit."""
+        raise NotImplementedError
+
+    def hit(self, key: str, limit: int, window: float, now: Optional[float] = None) -> RateLimitResult:
+        return self.hit_all([(key, limit, window)], now)[0]
+
+    async def hit_all_async(self, hits: Iterable[Hit]) -> List[RateLimitResult]:
+        """hit_all for callers on the event loop; stores that block override it."""
+        return self.hit_all(hits)
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process counters; the least recently seen keys are dropped past max_keys."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._state: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit_all(self, hits: Iterable[Hit], now: Optional[float] = None) -> List[RateLimitResult]:
+        hits = list(hits)
+        now = time.time() if now is None else now
+        with self._lock:
+            states, results = _evaluate_all(
+                [self._state.get(key, (0, 0, 0)) for key, _, _ in hits], hits, now
+            )
+            for (key, _, _), state in zip(hits, states):
+                self._state[key] = state
+                self._state.move_to_end(key)
+            while len(self._state) > self.max_keys:
+                self._state.popitem(last=False)
+            return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._state.clear()
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """Counters in a SQLite file shared by all worker processes on the host."""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_index INTEGER NOT NULL, "
+                "current INTEGER NOT NULL, previous INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def hit_all(self, hits: Iterable[Hit], now: Optional[float] = None) -> List[RateLimitResult]:
+        hits = list(hits)
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = [
+                conn.execute(
+                    "SELECT window_index, current, previous FROM rate_limits WHERE key = ?", (key,)
+                ).fetchone()
+                for key, _, _ in hits
+            ]
+            states, results = _evaluate_all([tuple(row) if row else (0, 0, 0) for row in rows], hits, now)
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)",
+                [(key, *state, (state[0] + 2) * window) for (key, _, window), state in zip(hits, states)],
+            )
+            self._hits += 1
+            if self._hits % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return results
+
+    async def hit_all_async(self, hits: Iterable[Hit]) -> List[RateLimitResult]:
+        # BEGIN IMMEDIATE can wait up to the busy timeout for other workers.
+        return await run_in_threadpool(self.hit_all, list(hits))
+
+    def clear(self) -> None:
+        self._connect().execute("DELETE FROM rate_limits")
+
+
+def create_rate_limit_store() -> RateLimitStore:
+    if settings.RATE_LIMIT_STORE == "sqlite":
+        return SQLiteRateLimitStore(settings.RATE_LIMIT_SQLITE_PATH)
+    if settings.RATE_LIMIT_STORE != "memory":
+        raise ValueError(f"Unknown RATE_LIMIT_STORE: {settings.RATE_LIMIT_STORE}")
+    return InMemoryRateLimitStore(max_keys=settings.RATE_LIMIT_MAX_KEYS)
+
@@ -0,0 +1,221 @@
+"""
+Extraction of registry rows from reception ledger (受付台帳) PDFs.
+
+Pages are independent, so each one is extracted in a worker process: the
+page's text is laid out with pypdf's layout mode, which keeps table columns
+aligned, and split into cells on runs of two or more spaces. Rows are then
+mapped onto RegistryData fields by the page's header row, or by the last
+header seen on an earlier page when a ledger only prints it once.
+"""
+import asyncio
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+from app.core.config import settings
+from app.core.external_services import (
+    is_valid_phone_number,
+    is_valid_postal_code,
+    normalize_phone_number,
+    normalize_postal_code,
+)
+
+PREFECTURES = (
+    "北海道", "青森県", "岩手県", "宮城県", "秋田県", "山形県", "福島県",
+    "茨城県", "栃木県", "群馬県", "埼玉県", "千葉県", "東京都", "神奈川県",
+    "新潟県", "富山県", "石川県", "福井県", "山梨県", "長野県", "岐阜県",
+    "静岡県", "愛知県", "三重県", "滋賀県", "京都府", "大阪府", "兵庫県",
+    "奈良県", "和歌山県", "鳥取県", "島根県", "岡山県", "広島県", "山口県",
+    "徳島県", "香川県", "愛媛県", "高知県", "福岡県", "佐賀県", "長崎県",
+    "熊本県", "大分県", "宮崎県", "鹿児島県", "沖縄県",
+)
+
+# Header labels, compared after NFKC normalization and lower-casing.
+HEADER_ALIASES = {
+    "customer_name": ("顧客名", "氏名", "名義人", "申請人", "name", "customer name"),
+    "postal_code": ("郵便番号", "〒", "postal code", "zip"),
+    "prefecture": ("都道府県", "prefecture"),
+    "current_address": ("現住所", "住所", "顧客現在住所", "current address", "address"),
+    "inheritance_address": (
+        "相続住所", "顧客相続住所", "物件所在", "不動産所在", "所在", "inheritance address", "property",
+    ),
+    "phone_number": ("電話番号", "電話", "tel", "phone", "phone number"),
+}
+HEADER_FIELDS = {
+    alias: field for field, aliases in HEADER_ALIASES.items() for alias in aliases
+}
+
+CELL = re.compile(r"\S+(?: \S+)*")
+
+Cells = List[Tuple[int, str]]
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text).strip()
+
+
+def split_cells(line: str) -> Cells:
+    """Split a laid-out line into (column, text) cells separated by 2+ spaces."""
+    line = line.replace("　", " ")
+    return [(match.start(), match.group()) for match in CELL.finditer(line)]
+
+
+def _header(cells: Cells) -> Optional[Cells]:
+    columns = [(start, HEADER_FIELDS.get(_normalize(text).lower())) for start, text in cells]
+    if sum(field is not None for _, field in columns) < 2:
+        return None
+    return [(start, field) for start, field in columns if field is not None]
+
+
+# One PdfReader per worker thread, reused for every page of the same file.
+# PdfReader is not thread-safe, so worker threads never share one.
+_readers = threading.local()
+
+
+def _reader(path: str) -> PdfReader:
+    stat = os.stat(path)
+    key = f"{path}:{stat.st_mtime_ns}"
+    if getattr(_readers, "key", None) != key:
+        _readers.reader, _readers.key = PdfReader(path), key
+    return _readers.reader
+
+
+def count_pages(path: str) -> int:
+    return len(_reader(path).pages)
+
+
+def extract_page(path: str, page_index: int) -> Dict[str, Any]:
+    """
+    Lay out one page and split it into cells. Runs in a worker process.
+
+    Returns {"page", "header": [(column, field), ...] or None, "rows": [cells, ...]}
+    where rows are the lines after the header (all lines without one).
+    """
+    text = _reader(path).pages[page_index].extract_text(extraction_mode="layout")
+    header, rows = None, []
+    for line in text.splitlines():
+        cells = split_cells(line)
+        if not cells:
+            continue
+        if header is None:
+            header = _header(cells)
+            if header is not None:
+                rows = []
+                continue
+        rows.append(cells)
+    return {"page": page_index, "header": header, "rows": rows}
+
+
+def build_records(header: Cells, rows: List[Cells]) -> List[Dict[str, Any]]:
+    """Map cells onto RegistryData fields by their nearest header column."""
+    records = []
+    for cells in rows:
+        record: Dict[str, Any] = {}
+        for start, text in cells:
+            _, field = min(header, key=lambda column: abs(column[0] - start))
+            record[field] = f"{record[field]} {text}" if field in record else text
+        if not record.get("customer_name") or len(record) < 2:
+            continue
+        records.append(clean_record(record))
+    return records
+
+
+def clean_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize extracted values; rows with unreadable codes or numbers are flagged."""
+    status = "pending"
+    postal_code = record.get("postal_code")
+    if postal_code:
+        if is_valid_postal_code(normalize_postal_code(postal_code)):
+            record["postal_code"] = normalize_postal_code(postal_code)
+        else:
+            status = "error"
+    phone_number = record.get("phone_number")
+    if phone_number:
+        if is_valid_phone_number(normalize_phone_number(phone_number)):
+            record["phone_number"] = normalize_phone_number(phone_number)
+        else:
+            status = "error"
+    if not record.get("prefecture"):
+        address = _normalize(record.get("current_address") or "")
+        record["prefecture"] = next(
+            (prefecture for prefecture in PREFECTURES if address.startswith(prefecture)), None
+        )
+    return {
+        "customer_name": record["customer_name"],
+        "postal_code": record.get("postal_code"),
+        "prefecture": record.get("prefecture"),
+        "current_address": record.get("current_address"),
+        "inheritance_address": record.get("inheritance_address"),
+        "phone_number": record.get("phone_number"),
+        "status": status,
+    }
+
+
+class RegistryExtractor:
+    """Extracts ledger pages in a bounded executor, one task per page."""
+
+    def __init__(self, workers: int, use_processes: bool = True):
+        self.workers = workers
+        self.use_processes = use_processes
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pages = 0
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.use_processes:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="registry-extract"
+                    )
+            return self._executor
+
+    async def extract(self, path: str) -> AsyncIterator[Tuple[int, int, List[Dict[str, Any]]]]:
+        """
+        Yield (pages done, total pages, new records) as pages finish.
+
+        Pages finish in any order; records are released in page order so a
+        header can carry over to the pages after it.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        total = await loop.run_in_executor(executor, count_pages, path)
+        futures = [loop.run_in_executor(executor, extract_page, path, index) for index in range(total)]
+        done: Dict[int, Dict[str, Any]] = {}
+        next_page, header = 0, None
+        try:
+            for pages_done, finished in enumerate(asyncio.as_completed(futures), 1):
+                page = await finished
+                done[page["page"]] = page
+                self.pages += 1
+                records = []
+                while next_page in done:
+                    page = done.pop(next_page)
+                    header = page["header"] or header
+                    if header is not None:
+                        records.extend(build_records(header, page["rows"]))
+                    next_page += 1
+                yield pages_done, total, records
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+registry_extractor = RegistryExtractor(
+    workers=settings.REGISTRY_EXTRACT_WORKERS,
+    use_processes=settings.REGISTRY_EXTRACT_PROCESSES,
+)
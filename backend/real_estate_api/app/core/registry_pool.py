@@ -0,0 +1,210 @@
+"""
+Pool of long-lived, authenticated Registry Library sessions.
+
+Sessions are created for the configured accounts and handed out one caller
+at a time, so the pool size is the cap on concurrent requests to the site.
+Each session has its own rate limiter, logs in lazily and is logged in again
+when it is older than REGISTRY_LIBRARY_SESSION_TTL or the site rejects it.
+"""
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+import httpx
+
+from app.core.config import settings
+from app.core.external_services import (
+    AsyncRateLimiter,
+    RegistryLibraryService,
+    RegistrySessionExpired,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def parse_accounts(spec: str) -> List[Tuple[str, str]]:
+    """Parse "user1:password1,user2:password2"."""
+    accounts = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        username, _, password = item.partition(":")
+        accounts.append((username, password))
+    return accounts
+
+
+class RegistrySession:
+    """One logged-in account with its own request pacing."""
+
+    def __init__(self, service: RegistryLibraryService, ttl: float):
+        self.service = service
+        self.ttl = ttl
+        self.logged_in_at: Optional[float] = None
+        self.requests = 0
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.logged_in_at is not None and time.monotonic() - self.logged_in_at < self.ttl
+
+    def invalidate(self) -> None:
+        self.logged_in_at = None
+
+
+class RegistrySessionPool:
+    """Hands out sessions in FIFO order; callers wait while all are busy."""
+
+    def __init__(
+        self,
+        accounts: List[Tuple[str, str]],
+        sessions_per_account: int = 1,
+        max_concurrency: Optional[int] = None,
+        min_interval: float = 5.0,
+        session_ttl: float = 1500.0,
+        base_url: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
+        slots = [account for account in accounts for _ in range(sessions_per_account)]
+        if max_concurrency:
+            slots = slots[:max_concurrency]
+        self.sessions = [
+            RegistrySession(
+                RegistryLibraryService(
+                    username=username,
+                    password=password,
+                    base_url=base_url,
+                    client=client,
+                    limiter=AsyncRateLimiter(min_interval),
+                ),
+                ttl=session_ttl,
+            )
+            for username, password in slots
+        ]
+        self._idle: Deque[RegistrySession] = deque(self.sessions)
+        self._waiters: "Deque[asyncio.Future]" = deque()
+        self._lock = threading.Lock()
+        self.logins = 0
+        self.relogins = 0
+
+    async def acquire(self) -> RegistrySession:
+        with self._lock:
+            session = self._idle.popleft() if self._idle else None
+            if session is None:
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters.append(waiter)
+        if session is None:
+            try:
+                session = await waiter
+            except asyncio.CancelledError:
+                with self._lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                if waiter.done() and not waiter.cancelled():
+                    self.release(waiter.result())
+                raise
+        try:
+            await self._ensure_logged_in(session)
+        except BaseException:
+            self.release(session)
+            raise
+        return session
+
+    def release(self, session: RegistrySession) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    # The waiter may belong to another thread's event loop.
+                    waiter.get_loop().call_soon_threadsafe(self._hand_over, waiter, session)
+                    return
+            self._idle.append(session)
+
+    def _hand_over(self, waiter: "asyncio.Future", session: RegistrySession) -> None:
+        if waiter.done():
+            self.release(session)
+        else:
+            waiter.set_result(session)
+
+    async def _ensure_logged_in(self, session: RegistrySession) -> None:
+        if session.is_fresh:
+            return
+        if session.logged_in_at is not None or session.service.session_token:
+            self.relogins += 1
+        result = await session.service.login()
+        if not result.get("success"):
+            session.invalidate()
+            raise RegistrySessionExpired(result.get("message", "Registry Library login failed"))
+        session.logged_in_at = time.monotonic()
+        self.logins += 1
+
+    async def run(self, operation: Callable[[RegistryLibraryService], Awaitable[T]]) -> T:
+        """Run operation with a pooled session, logging in again once if it expired."""
+        session = await self.acquire()
+        try:
+            session.requests += 1
+            try:
+                return await operation(session.service)
+            except RegistrySessionExpired:
+                session.invalidate()
+                await self._ensure_logged_in(session)
+                return await operation(session.service)
+        finally:
+            self.release(session)
+
+    async def health_check(self) -> int:
+        """Log idle sessions in again if they went stale; returns how many were refreshed."""
+        refreshed = 0
+        with self._lock:
+            stale = [session for session in self._idle if not session.is_fresh]
+            for session in stale:
+                self._idle.remove(session)
+        for session in stale:
+            try:
+                await self._ensure_logged_in(session)
+                refreshed += 1
+            except Exception as exc:
+                logger.warning(f"Registry Library session refresh failed for {session.service.username}: {exc}")
+            finally:
+                self.release(session)
+        return refreshed
+
+    async def run_health_checks(self, interval: float) -> None:
+        """Call health_check every interval seconds until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                refreshed = await self.health_check()
+            except Exception as exc:
+                logger.warning(f"Registry Library health check failed: {exc}")
+            else:
+                if refreshed:
+                    logger.info(f"Refreshed {refreshed} stale Registry Library sessions")
+
+    async def close(self) -> None:
+        for session in self.sessions:
+            await session.service.close()
+            session.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            idle, waiting = len(self._idle), len(self._waiters)
+        return {
+            "sessions": len(self.sessions),
+            "idle": idle,
+            "in_use": len(self.sessions) - idle,
+            "waiting": waiting,
+            "logins": self.logins,
+            "relogins": self.relogins,
+            "requests": sum(session.requests for session in self.sessions),
+        }
+
+
+registry_session_pool = RegistrySessionPool(
+    accounts=parse_accounts(settings.REGISTRY_LIBRARY_ACCOUNTS) or [("mock_username", "mock_password")],
+    sessions_per_account=settings.REGISTRY_LIBRARY_SESSIONS_PER_ACCOUNT,
+    max_concurrency=settings.REGISTRY_LIBRARY_MAX_CONCURRENCY,
+    min_interval=settings.REGISTRY_LIBRARY_MIN_INTERVAL,
+    session_ttl=settings.REGISTRY_LIBRARY_SESSION_TTL,
+)
@@ -0,0 +1,266 @@
+"""
+Incrementally maintained analytics rollups.
+
+Customer and billing write paths call record_customer_change /
+record_billing_change inside their own transaction, so the rollup tables
+commit or roll back together with the base rows. rebuild_rollups recomputes
+both tables from scratch.
+
+Usage:
+    python -m app.core.rollups rebuild
+"""
+from collections import Counter
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import Integer, Date, case, cast, func, insert
+from sqlalchemy.orm import Session
+
+from app.db.session import is_sqlite
+from app.models.analytics_rollup import BillingDailyRollup, CustomerDailyRollup
+from app.models.billing import Billing
+from app.models.customer import Customer
+
+
+class CustomerBucket(NamedTuple):
+    day: date
+    assigned_to: Optional[int]
+    status: Optional[str]
+    source: Optional[str]
+    property_type: Optional[str]
+    closed_day: Optional[date]
+    days_to_close: int
+
+
+class BillingBucket(NamedTuple):
+    day: date
+    user_id: Optional[int]
+    amount: float
+
+
+def days_between(start: Any, end: Any) -> Any:
+    """Whole calendar days between two timestamp columns, in SQL."""
+    if is_sqlite:
+        return func.julianday(func.date(end)) - func.julianday(func.date(start))
+    return cast(end, Date) - cast(start, Date)
+
+
+def _as_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def customer_bucket(customer: Customer) -> Optional[CustomerBucket]:
+    """
+    The rollup bucket a customer currently contributes to.
+    Must be called on a flushed row so created_at/updated_at are populated.
+    """
+    created_day = _as_date(customer.created_at)
+    if created_day is None:
+        return None
+
+    closed_day = None
+    days_to_close = 0
+    if customer.status == "closed":
+        closed_day = _as_date(customer.updated_at) or created_day
+        days_to_close = (closed_day - created_day).days
+
+    return CustomerBucket(
+        day=created_day,
+        assigned_to=customer.assigned_to,
+        status=customer.status,
+        source=customer.source,
+        property_type=customer.property_type,
+        closed_day=closed_day,
+        days_to_close=days_to_close,
+    )
+
+
+def billing_bucket(billing: Billing) -> Optional[BillingBucket]:
+    """The revenue bucket a billing row contributes to, if it is paid."""
+    if billing.status != "paid" or billing.paid_date is None:
+        return None
+    return BillingBucket(day=billing.paid_date, user_id=billing.user_id, amount=billing.amount or 0.0)
+
+
+def _key_filter(model: Any, key: Dict[str, Any]) -> List[Any]:
+    return [
+        getattr(model, name).is_(None) if value is None else getattr(model, name) == value
+        for name, value in key.items()
+    ]
+
+
+def _apply_customer_delta(db: Session, bucket: CustomerBucket, sign: int) -> None:
+    key = bucket._asdict()
+    days_to_close = key.pop("days_to_close")
+
+    updated = (
+        db.query(CustomerDailyRollup)
+        .filter(*_key_filter(CustomerDailyRollup, key))
+        .update(
+            {
+                CustomerDailyRollup.customer_count: CustomerDailyRollup.customer_count + sign,
+                CustomerDailyRollup.days_to_close: CustomerDailyRollup.days_to_close + sign * days_to_close,
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.add(CustomerDailyRollup(**key, customer_count=sign, days_to_close=sign * days_to_close))
+        db.flush()
+
+
+def _apply_billing_delta(db: Session, bucket: BillingBucket, sign: int) -> None:
+    key = bucket._asdict()
+    amount = key.pop("amount")
+
+    updated = (
+        db.query(BillingDailyRollup)
+        .filter(*_key_filter(BillingDailyRollup, key))
+        .update(
+            {
+                BillingDailyRollup.amount: BillingDailyRollup.amount + sign * amount,
+                BillingDailyRollup.billing_count: BillingDailyRollup.billing_count + sign,
+            },
+            synchronize_session=False,
+        )
+    )
+    if not updated:
+        db.add(BillingDailyRollup(**key, amount=sign * amount, billing_count=sign))
+        db.flush()
+
+
+def record_customer_change(
+    db: Session,
+    before: Optional[CustomerBucket],
+    after: Optional[CustomerBucket],
+) -> None:
+    """
+    Move a customer's contribution from one bucket to another.
+    Pass before=None for inserts and after=None for deletes.
+    """
+    if before == after:
+        return
+    if before is not None:
+        _apply_customer_delta(db, before, -1)
+    if after is not None:
+        _apply_customer_delta(db, after, 1)
+
+
+def record_customer_changes(
+    db: Session,
+    before: Iterable[Optional[CustomerBucket]],
+    after: Iterable[Optional[CustomerBucket]],
+) -> None:
+    """
+    record_customer_change for many customers at once, with one rollup update
+    per bucket whose net count changed. Pass before=[] for inserts and
+    after=[] for deletes.
+    """
+    deltas = Counter(bucket for bucket in after if bucket is not None)
+    deltas.subtract(bucket for bucket in before if bucket is not None)
+    for bucket, count in deltas.items():
+        if count:
+            _apply_customer_delta(db, bucket, count)
+
+
+def record_billing_change(
+    db: Session,
+    before: Optional[BillingBucket],
+    after: Optional[BillingBucket],
+) -> None:
+    """
+    Move a billing row's revenue from one bucket to another.
+    Pass before=None for inserts and after=None for deletes.
+    """
+    if before == after:
+        return
+    if before is not None:
+        _apply_billing_delta(db, before, -1)
+    if after is not None:
+        _apply_billing_delta(db, after, 1)
+
+
+def rebuild_rollups(db: Session) -> None:
+    """Recompute both rollup tables from the base tables."""
+    is_closed = Customer.status == "closed"
+    closed_day = case((is_closed, func.date(Customer.updated_at)), else_=None)
+    day = func.date(Customer.created_at)
+
+    db.query(CustomerDailyRollup).delete(synchronize_session=False)
+    db.query(BillingDailyRollup).delete(synchronize_session=False)
+
+    db.execute(
+        insert(CustomerDailyRollup).from_select(
+            [
+                "day", "assigned_to", "status", "source", "property_type", "closed_day",
+                "customer_count", "days_to_close",
+            ],
+            db.query(
+                day,
+                Customer.assigned_to,
+                Customer.status,
+                Customer.source,
+                Customer.property_type,
+                closed_day,
+                func.count(Customer.id),
+                func.coalesce(func.sum(
+                    case((is_closed, cast(days_between(Customer.created_at, Customer.updated_at), Integer)), else_=0)
+                ), 0),
+            )
+            .filter(Customer.created_at.isnot(None))
+            .group_by(
+                day, Customer.assigned_to, Customer.status, Customer.source,
+                Customer.property_type, closed_day,
+            )
+            .statement,
+        )
+    )
+
+    db.execute(
+        insert(BillingDailyRollup).from_select(
+            ["day", "user_id", "amount", "billing_count"],
+            db.query(
+                Billing.paid_date,
+                Billing.user_id,
+                func.coalesce(func.sum(Billing.amount), 0.0),
+                func.count(Billing.id),
+            )
+            .filter(Billing.status == "paid", Billing.paid_date.isnot(None))
+            .group_by(Billing.paid_date, Billing.user_id)
+            .statement,
+        )
+    )
+
+    db.commit()
+
+
+def ensure_rollups(db: Session) -> None:
+    """Build the rollups on first start against a database that predates them."""
+    if db.query(CustomerDailyRollup.id).first() or db.query(BillingDailyRollup.id).first():
+        return
+    if db.query(Customer.id).first() or db.query(Billing.id).first():
+        rebuild_rollups(db)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.db.init_db import init_db
+    from app.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the analytics rollup tables.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        rebuild_rollups(db)
+        print(
+            f"Rebuilt rollups: {db.query(CustomerDailyRollup).count()} customer rows, "
+            f"{db.query(BillingDailyRollup).count()} billing rows"
+        )
+    finally:
+        db.close()
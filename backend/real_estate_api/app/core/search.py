@@ -0,0 +1,125 @@
+"""
+Indexed substring search over customer name, email and phone number.
+
+SQLite uses an external-content FTS5 table with the trigram tokenizer, kept
+in sync by triggers. Postgres uses pg_trgm GIN indexes, which serve
+ILIKE '%term%' directly and are maintained by the database itself. Both
+tokenize by character n-grams, so Japanese names without spaces match.
+Terms shorter than a trigram fall back to a plain ILIKE scan.
+"""
+import logging
+from typing import List
+
+from sqlalchemy import column, func, literal_column, or_, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from app.db.session import is_sqlite
+from app.models.customer import Customer
+
+logger = logging.getLogger(__name__)
+
+MIN_INDEXED_TERM_LENGTH = 3
+
+SEARCH_COLUMNS = ("name", "email", "phone_number")
+
+customers_fts = table("customers_fts", column("rowid"), column("rank"))
+
+SQLITE_FTS_DDL: List[str] = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+        name, email, phone_number,
+        content='customers', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_fts_ai AFTER INSERT ON customers BEGIN
+        INSERT INTO customers_fts(rowid, name, email, phone_number)
+        VALUES (new.id, new.name, new.email, new.phone_number);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_fts_ad AFTER DELETE ON customers BEGIN
+        INSERT INTO customers_fts(customers_fts, rowid, name, email, phone_number)
+        VALUES ('delete', old.id, old.name, old.email, old.phone_number);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customers_fts_au AFTER UPDATE OF name, email, phone_number ON customers BEGIN
+        INSERT INTO customers_fts(customers_fts, rowid, name, email, phone_number)
+        VALUES ('delete', old.id, old.name, old.email, old.phone_number);
+        INSERT INTO customers_fts(rowid, name, email, phone_number)
+        VALUES (new.id, new.name, new.email, new.phone_number);
+    END
+    """,
+]
+
+POSTGRES_TRGM_DDL: List[str] = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+    f"CREATE INDEX IF NOT EXISTS ix_customers_{name}_trgm ON customers USING gin ({name} gin_trgm_ops)"
+    for name in SEARCH_COLUMNS
+]
+
+# Set by init_search_index; False keeps search on the unindexed ILIKE path.
+search_index_enabled = False
+
+
+def init_search_index(engine: Engine) -> bool:
+    """Create the search index and its sync triggers if they do not exist yet."""
+    global search_index_enabled
+
+    try:
+        with engine.begin() as conn:
+            if is_sqlite:
+                exists = conn.execute(
+                    text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'customers_fts'")
+                ).first()
+                for statement in SQLITE_FTS_DDL:
+                    conn.execute(text(statement))
+                if not exists:
+                    conn.execute(text("INSERT INTO customers_fts(customers_fts) VALUES ('rebuild')"))
+            else:
+                for statement in POSTGRES_TRGM_DDL:
+                    conn.execute(text(statement))
+    except Exception as exc:
+        logger.warning(f"Customer search index unavailable, falling back to ILIKE: {exc}")
+        search_index_enabled = False
+    else:
+        search_index_enabled = True
+
+    return search_index_enabled
+
+
+def _fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def apply_customer_search(query: Query, term: str) -> Query:
+    """
+    Filter `query` to customers whose name, email or phone number contains
+    `term`, ordered by relevance.
+    """
+    term = term.strip()
+    pattern = f"%{term}%"
+    fallback = or_(
+        Customer.name.ilike(pattern),
+        Customer.email.ilike(pattern),
+        Customer.phone_number.ilike(pattern),
+    )
+
+    if not search_index_enabled or len(term) < MIN_INDEXED_TERM_LENGTH:
+        return query.filter(fallback)
+
+    if is_sqlite:
+        return (
+            query.join(customers_fts, customers_fts.c.rowid == Customer.id)
+            .filter(literal_column("customers_fts").op("MATCH")(_fts_phrase(term)))
+            .order_by(customers_fts.c.rank)
+        )
+
+    return query.filter(fallback).order_by(
+        func.greatest(
+            func.similarity(Customer.name, term),
+            func.similarity(Customer.email, term),
+            func.similarity(Customer.phone_number, term),
+        ).desc()
+    )
@@ -0,0 +1,76 @@
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from io import StringIO
+from typing import Any, Iterable, Iterator, Sequence
+
+# Flush the text buffer to the client once it grows past this many characters.
+FLUSH_THRESHOLD = 64 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """
+    Encode rows as CSV, yielding buffered chunks instead of the whole document.
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= FLUSH_THRESHOLD:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def ndjson_line(item: Any) -> bytes:
+    """Serialize a single object as one newline-delimited JSON record."""
+    return json.dumps(item, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n"
+
+
+def iter_ndjson(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """
+    Encode rows as newline-delimited JSON objects, yielding buffered chunks.
+    """
+    chunk = []
+    size = 0
+    for row in rows:
+        line = ndjson_line(dict(zip(keys, row)))
+        chunk.append(line)
+        size += len(line)
+        if size >= FLUSH_THRESHOLD:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+
+    if chunk:
+        yield b"".join(chunk)
+
+
+def iter_gzip(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """
+    Compress a byte stream on the fly into a single gzip member.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """Serialize one Server-Sent Events message with a JSON payload."""
+    payload = json.dumps(data, ensure_ascii=False, default=_json_default)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
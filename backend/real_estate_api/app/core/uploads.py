@@ -0,0 +1,126 @@
+"""
+Streaming multipart uploads.
+
+Starlette's form parser spools every file before the endpoint runs; this
+parser writes each file part straight to disk as the request body arrives,
+hashing it on the way, so memory use does not grow with the upload.
+"""
+import hashlib
+import os
+from typing import Callable, List, NamedTuple, Optional
+
+import anyio
+import multipart
+from fastapi import HTTPException, Request, status
+from multipart.multipart import parse_options_header
+
+PDF_MAGIC = b"%PDF-"
+
+
+class UploadedFile(NamedTuple):
+    filename: str
+    path: str
+    size: int
+    sha256: str
+
+
+class _Part:
+    def __init__(self):
+        self.headers: List[tuple] = []
+        self.field = b""
+        self.value = b""
+        self.filename: Optional[str] = None
+        self.path: Optional[str] = None
+        self.file = None
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+
+
+async def receive_pdf_uploads(
+    request: Request, temp_path: Callable[[], str], max_bytes: int
+) -> List[UploadedFile]:
+    """
+    Save every PDF file part of a multipart/form-data request to temp_path().
+
+    Non-file fields are ignored. Raises 400 for bodies that are not multipart
+    or parts that are not PDFs, and 413 for files larger than max_bytes.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a multipart/form-data upload"
+        )
+
+    events: List[tuple] = []
+    parser = multipart.MultipartParser(boundary, {
+        "on_part_begin": lambda: events.append(("begin", b"")),
+        "on_header_field": lambda data, start, end: events.append(("field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("value", data[start:end])),
+        "on_header_end": lambda: events.append(("header", b"")),
+        "on_headers_finished": lambda: events.append(("headers", b"")),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", b"")),
+    })
+
+    uploads: List[UploadedFile] = []
+    part: Optional[_Part] = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, data in events:
+                if kind == "begin":
+                    part = _Part()
+                elif kind == "field":
+                    part.field += data
+                elif kind == "value":
+                    part.value += data
+                elif kind == "header":
+                    part.headers.append((part.field.lower(), part.value))
+                    part.field, part.value = b"", b""
+                elif kind == "headers":
+                    disposition = dict(part.headers).get(b"content-disposition", b"")
+                    filename = parse_options_header(disposition)[1].get(b"filename")
+                    if filename is not None:
+                        part.filename = os.path.basename(filename.decode("utf-8", "replace"))
+                        part.path = temp_path()
+                        part.file = await anyio.open_file(part.path, "wb")
+                elif kind == "data" and part.file is not None:
+                    part.size += len(data)
+                    if part.size > max_bytes:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"{part.filename} is larger than {max_bytes} bytes"
+                        )
+                    if len(part.head) < len(PDF_MAGIC):
+                        part.head += data[:len(PDF_MAGIC)]
+                    part.digest.update(data)
+                    await part.file.write(data)
+                elif kind == "end" and part.file is not None:
+                    await part.file.aclose()
+                    part.file = None
+                    uploads.append(UploadedFile(part.filename, part.path, part.size, part.digest.hexdigest()))
+                    if not part.head.startswith(PDF_MAGIC):
+                        raise HTTPException(
+                            status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"{part.filename} is not a PDF file"
+                        )
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        if part is not None and part.file is not None:
+            await part.file.aclose()
+            uploads.append(UploadedFile(part.filename, part.path, part.size, ""))
+        for upload in uploads:
+            if os.path.exists(upload.path):
+                os.remove(upload.path)
+        raise
+
+    if not uploads:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No PDF files were uploaded"
+        )
+    return uploads
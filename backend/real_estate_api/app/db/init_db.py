@@ -1,6 +1,8 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 from datetime import datetime, date
 import os
+from app.core.search import init_search_index
 from app.core.security import get_password_hash
 from app.models.user import User
 from app.models.customer import Customer
@@ -12,6 +14,25 @@ from app.db.session import Base, engine, is_sqlite
 def init_db():
     Base.metadata.create_all(bind=engine)
     
+    # create_all leaves existing tables as they are, so add columns introduced
+    # since (they are all nullable).
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+    
+    # create_all skips tables that already exist, including any indexes added
+    # to them since, so create missing indexes explicitly.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    
+    init_search_index(engine)
+    
 def init_sample_data(db: Session):
     if not is_sqlite:
         print("Production environment detected, skipping sample data initialization")
@@ -1,23 +1,76 @@
+from typing import Any, Callable, Optional, TypeVar, Union
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 import os
 
 from app.core.config import settings
+from app.db.pool import engine_options, install_sqlite_profile
+
+T = TypeVar("T")
 
 is_sqlite = settings.DATABASE_URL.startswith("sqlite")
 
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
 if is_sqlite:
-    engine = create_engine(
-        settings.DATABASE_URL, connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(settings.DATABASE_URL)
+    install_sqlite_profile(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+def get_async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (aiosqlite / asyncpg)."""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    scheme, _, rest = url.partition("://")
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme.startswith("postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+async_engine = None
+AsyncSessionLocal = None
+
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_database_url = get_async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(
+        async_database_url, **engine_options(async_database_url, is_async=True)
+    )
+    if is_sqlite:
+        install_sqlite_profile(async_engine.sync_engine)
+    # Objects must stay readable after commit without lazy IO outside a greenlet.
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine, autocommit=False, autoflush=False, expire_on_commit=False
+    )
+
+class SessionRunner:
+    """
+    Runs synchronous ORM code against the request's session.
+
+    With the async engine the callable runs through AsyncSession.run_sync, so
+    its queries await the async driver on the event loop; with the sync engine
+    it runs in the threadpool. Either way the callable receives a plain
+    Session, which keeps a single implementation of every route.
+    """
+
+    def __init__(self, session: Any):
+        self.session = session
+
+    @property
+    def is_async(self) -> bool:
+        return not isinstance(self.session, Session)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.is_async:
+            return await self.session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
 def get_db():
     db = SessionLocal()
     try:
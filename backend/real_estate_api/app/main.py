@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
@@ -7,11 +9,23 @@ except ImportError:
     pass
 
 from app.core.config import settings
+from app.core.external_services import close_http_client
+from app.core.hashing import hashing_service
+from app.core.jobs import job_queue
+from app.core.pagination import NEXT_CURSOR_HEADER
 from app.core.middleware import RateLimitMiddleware, CSRFMiddleware
+from app.core.ratelimit import create_rate_limit_store, parse_route_limits
+from app.core.registry_extraction import registry_extractor
+from app.core.registry_pool import registry_session_pool
+from app.core.duplicates import ensure_duplicate_keys
+from app.core.rollups import ensure_rollups
 from app.api import deps
 from app.routers import api_router
+from app.routers.external import warm_lookup_caches
 from app.db.init_db import init_db, init_sample_data
-from app.db.session import SessionLocal
+from app.db.pool import pool_status
+from app.db.session import SessionLocal, async_engine, engine
+from app.models.user import User
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -25,12 +39,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=[NEXT_CURSOR_HEADER, "X-RateLimit-Limit", "X-RateLimit-Remaining", "Retry-After"],
 )
 
 app.add_middleware(
     RateLimitMiddleware,
-    rate_limit_per_minute=60,
-    exclude_paths=["/healthz", "/docs", "/redoc"]
+    rate_limit_per_minute=settings.RATE_LIMIT_PER_MINUTE,
+    exclude_paths=["/healthz", "/docs", "/redoc"],
+    user_rate_limit_per_minute=settings.RATE_LIMIT_USER_PER_MINUTE,
+    route_limits=parse_route_limits(settings.RATE_LIMIT_ROUTES),
+    store=create_rate_limit_store(),
 )
 
 app.add_middleware(
@@ -50,15 +68,72 @@ async def healthz():
     """
     return {"status": "ok", "service": settings.PROJECT_NAME}
 
+@app.get("/healthz/db")
+async def healthz_db(current_user: User = Depends(deps.get_current_owner)):
+    """
+    Connection pool statistics: occupancy, overflow and checkout wait times.
+    Only accessible by owners.
+    """
+    pools = {"sync": pool_status(engine)}
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine)
+    return pools
+
+@app.get("/healthz/hashing")
+async def healthz_hashing(current_user: User = Depends(deps.get_current_owner)):
+    """
+    Password hashing executor: workers, in-flight operations and queue depth.
+    Only accessible by owners.
+    """
+    return hashing_service.stats()
+
 @app.on_event("startup")
 def startup_event():
     init_db()
     
     db = SessionLocal()
     try:
-        from app.models.user import User
         user_count = db.query(User).count()
         if user_count == 0:
             init_sample_data(db)
+        ensure_rollups(db)
+        ensure_duplicate_keys(db)
     finally:
         db.close()
+
+@app.on_event("startup")
+async def warm_lookup_caches_on_startup():
+    if settings.LOOKUP_CACHE_WARM_ON_STARTUP:
+        # Runs in the background: warming is paced by the upstream rate limits.
+        app.state.lookup_cache_warmup = asyncio.create_task(
+            warm_lookup_caches(settings.LOOKUP_CACHE_WARM_LIMIT)
+        )
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+@app.on_event("startup")
+async def start_registry_health_checks():
+    if settings.REGISTRY_LIBRARY_HEALTH_CHECK_INTERVAL > 0:
+        # Idle sessions are logged in again before a request finds them stale.
+        app.state.registry_health_checks = asyncio.create_task(
+            registry_session_pool.run_health_checks(settings.REGISTRY_LIBRARY_HEALTH_CHECK_INTERVAL)
+        )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup = getattr(app.state, "lookup_cache_warmup", None)
+    if warmup is not None:
+        warmup.cancel()
+    await job_queue.stop()
+    hashing_service.shutdown()
+    registry_extractor.shutdown()
+    health_checks = getattr(app.state, "registry_health_checks", None)
+    if health_checks is not None:
+        health_checks.cancel()
+        await asyncio.gather(health_checks, return_exceptions=True)
+    await registry_session_pool.close()
+    await close_http_client()
+    if async_engine is not None:
+        await async_engine.dispose()
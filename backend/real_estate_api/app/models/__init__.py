@@ -3,3 +3,7 @@ from app.models.customer import Customer
 from app.models.activity import Activity
 from app.models.registry_data import RegistryData
 from app.models.billing import Billing
+from app.models.analytics_rollup import CustomerDailyRollup, BillingDailyRollup
+from app.models.duplicate_key import DuplicateKey
+from app.models.registry_upload import RegistryUpload
+from app.models.registry_pdf import RegistryPdf
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -18,3 +18,8 @@ class Activity(Base):
 
     customer = relationship("Customer", back_populates="activities")
     creator = relationship("User", back_populates="created_activities")
+
+    __table_args__ = (
+        # Keyset pagination of a customer's activities on (date, id).
+        Index("ix_activities_customer_id_date_id", "customer_id", "date", "id"),
+    )
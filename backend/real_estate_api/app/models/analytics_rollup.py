@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Date, Float, Index
+from app.db.session import Base
+
+class CustomerDailyRollup(Base):
+    """
+    Customer counts per created day x assigned_to x status x source x property_type.
+    closed_day is the updated_at day of closed customers and NULL otherwise.
+    A bucket may be split across several rows; readers always SUM.
+    """
+    __tablename__ = "customer_daily_rollup"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    assigned_to = Column(Integer, nullable=True)
+    status = Column(String, nullable=True)
+    source = Column(String, nullable=True)
+    property_type = Column(String, nullable=True)
+    closed_day = Column(Date, nullable=True)
+    customer_count = Column(Integer, nullable=False, default=0)
+    days_to_close = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            "ix_customer_daily_rollup_bucket",
+            "assigned_to", "day", "status", "source", "property_type", "closed_day",
+        ),
+    )
+
+class BillingDailyRollup(Base):
+    """Paid revenue per paid day x user."""
+    __tablename__ = "billing_daily_rollup"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    amount = Column(Float, nullable=False, default=0.0)
+    billing_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_billing_daily_rollup_bucket", "user_id", "day"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Date, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -25,3 +25,9 @@ class Customer(Base):
 
     assigned_user = relationship("User", back_populates="customers")
     activities = relationship("Activity", back_populates="customer", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), for owners and per assignee.
+        Index("ix_customers_created_at_id", "created_at", "id"),
+        Index("ix_customers_assigned_to_created_at_id", "assigned_to", "created_at", "id"),
+    )
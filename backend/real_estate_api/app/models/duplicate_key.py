@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, Index
+from app.db.session import Base
+
+class DuplicateKey(Base):
+    """
+    One blocking key of a customer or registry row; records sharing a key are
+    duplicate candidates. owner_id is the customer's assignee or the registry
+    row's creator, so members' lookups stay on their own records.
+    """
+    __tablename__ = "duplicate_keys"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # phone/name/email
+    key = Column(String, nullable=False)
+    record_type = Column(String, nullable=False)  # customer/registry_data
+    record_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_duplicate_keys_kind_key", "kind", "key"),
+        Index("ix_duplicate_keys_owner_id_kind_key", "owner_id", "kind", "key"),
+        Index("ix_duplicate_keys_record", "record_type", "record_id"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.session import Base
@@ -7,6 +7,7 @@ class RegistryData(Base):
     __tablename__ = "registry_data"
 
     id = Column(Integer, primary_key=True, index=True)
+    registry_id = Column(String, index=True, nullable=True)  # Registry Library id
     extracted_at = Column(DateTime(timezone=True), index=True)
     customer_name = Column(String, index=True)
     postal_code = Column(String, index=True)
@@ -17,8 +18,20 @@ class RegistryData(Base):
     status = Column(String, index=True)  # pending/registered/error
     pdf_path = Column(String)
     extracted_pdf_path = Column(String, nullable=True)
+    pdf_sha256 = Column(String(64), index=True, nullable=True)  # address in the PDF store
     created_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     creator = relationship("User", back_populates="registry_data")
+
+    __table_args__ = (
+        # Listings filter on one of these columns and page on (extracted_at, id).
+        Index("ix_registry_data_status_extracted_at_id", "status", "extracted_at", "id"),
+        Index("ix_registry_data_prefecture_extracted_at_id", "prefecture", "extracted_at", "id"),
+        Index("ix_registry_data_created_by_extracted_at_id", "created_by", "extracted_at", "id"),
+        Index(
+            "ix_registry_data_created_by_status_extracted_at_id",
+            "created_by", "status", "extracted_at", "id",
+        ),
+    )
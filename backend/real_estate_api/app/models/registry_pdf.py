@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class RegistryPdf(Base):
+    """
+    The PDF store object last downloaded for a Registry Library id, so repeat
+    requests are served locally whether or not a registry row refers to it.
+    """
+    __tablename__ = "registry_pdfs"
+
+    id = Column(Integer, primary_key=True)
+    registry_id = Column(String, unique=True, index=True, nullable=False)
+    pdf_sha256 = Column(String(64), nullable=False)  # address in the PDF store
+    downloaded_by = Column(Integer, ForeignKey("users.id"))
+    downloaded_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.session import Base
+
+class RegistryUpload(Base):
+    """
+    A reception ledger whose extraction ran to the end. Rows of a file without
+    one are leftovers of an interrupted extraction.
+    """
+    __tablename__ = "registry_uploads"
+
+    id = Column(Integer, primary_key=True)
+    pdf_sha256 = Column(String(64), nullable=False)
+    filename = Column(String)
+    rows = Column(Integer, nullable=False, default=0)
+    created_by = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_registry_uploads_pdf_sha256_created_by", "pdf_sha256", "created_by"),
+    )
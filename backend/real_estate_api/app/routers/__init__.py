@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.routers import auth, users, customers, external, analytics
+from app.routers import auth, users, customers, external, analytics, jobs, registry_data
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
@@ -7,3 +7,5 @@ api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(customers.router, prefix="/customers", tags=["customers"])
 api_router.include_router(external.router, prefix="/external", tags=["external"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(registry_data.router, prefix="/registry-data", tags=["registry-data"])
@@ -1,93 +1,139 @@
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, case
+from sqlalchemy import func, case, and_
 from datetime import datetime, timedelta, date
 
 from app.api import deps
+from app.core.cache import analytics_cache, analytics_scope
+from app.db.session import SessionRunner
 from app.models.user import User
 from app.models.customer import Customer
 from app.models.activity import Activity
-from app.models.billing import Billing
+from app.models.analytics_rollup import CustomerDailyRollup, BillingDailyRollup
 from app.schemas.analytics import DashboardData, StatusData, SalesPerformanceData
 
 router = APIRouter()
 
+def _month_windows(today: date, count: int = 6) -> List[Tuple[str, date, date]]:
+    """
+    Return (label, first day, first day of next month) for the last `count`
+    calendar months, oldest first, ending with the current month.
+    """
+    windows = []
+    year, month = today.year, today.month
+    for _ in range(count):
+        start = date(year, month, 1)
+        end = date(year + (month == 12), month % 12 + 1, 1)
+        windows.append((start.strftime("%b %Y"), start, end))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return list(reversed(windows))
+
+def _sum_if(value: Any, *conditions) -> Any:
+    return func.coalesce(func.sum(case((and_(*conditions), value), else_=0)), 0)
+
 @router.get("/dashboard", response_model=DashboardData)
-def get_dashboard_data(
-    db: Session = Depends(deps.get_db),
+async def get_dashboard_data(
+    db: SessionRunner = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get analytics data for the dashboard.
     """
+    return await analytics_cache.get_or_compute(
+        f"dashboard:{analytics_scope(current_user)}",
+        lambda: db.run(_dashboard_data, current_user),
+    )
+
+def _dashboard_data(db: Session, current_user: User) -> Dict[str, Any]:
     today = date.today()
     first_day_of_month = date(today.year, today.month, 1)
+    months = _month_windows(today)
     
-    customer_query = db.query(Customer)
-    
-    if current_user.role != "owner":
-        customer_query = customer_query.filter(Customer.assigned_to == current_user.id)
+    rollup = CustomerDailyRollup
     
-    total_customers = customer_query.count()
+    # One grouped pass over the customer rollup yields every customer metric per status.
+    customer_query = db.query(
+        rollup.status,
+        func.sum(rollup.customer_count),
+        _sum_if(rollup.customer_count, rollup.day >= first_day_of_month),
+        _sum_if(rollup.customer_count, rollup.closed_day >= first_day_of_month),
+        *[
+            _sum_if(rollup.customer_count, rollup.day >= start, rollup.day < end)
+            for _, start, end in months
+        ],
+    )
     
-    new_customers_this_month = customer_query.filter(
-        Customer.created_at >= first_day_of_month
-    ).count()
+    if current_user.role != "owner":
+        customer_query = customer_query.filter(rollup.assigned_to == current_user.id)
     
-    active_customers = customer_query.filter(
-        Customer.status.notin_(["closed", "lost"])
-    ).count()
+    total_customers = 0
+    new_customers_this_month = 0
+    active_customers = 0
+    closed_deals_this_month = 0
+    status_counts = {}
+    monthly_counts = [0] * len(months)
     
-    closed_deals_this_month = customer_query.filter(
-        Customer.status == "closed",
-        Customer.updated_at >= first_day_of_month
-    ).count()
+    customer_rows = (
+        customer_query
+        .group_by(rollup.status)
+        .having(func.sum(rollup.customer_count) != 0)
+        .all()
+    )
+    for row in customer_rows:
+        customer_status, count, new_count, closed_count = row[:4]
+        total_customers += count
+        new_customers_this_month += new_count
+        if customer_status is not None and customer_status not in ("closed", "lost"):
+            active_customers += count
+        if customer_status == "closed":
+            closed_deals_this_month += closed_count
+        status_key = customer_status or "Unknown"
+        status_counts[status_key] = status_counts.get(status_key, 0) + count
+        for i, month_count in enumerate(row[4:]):
+            monthly_counts[i] += month_count
     
-    billing_query = db.query(func.sum(Billing.amount))
+    billing_query = db.query(func.sum(BillingDailyRollup.amount))
     
     if current_user.role != "owner":
-        billing_query = billing_query.filter(Billing.user_id == current_user.id)
+        billing_query = billing_query.filter(BillingDailyRollup.user_id == current_user.id)
     
     revenue_this_month = billing_query.filter(
-        Billing.status == "paid",
-        Billing.paid_date >= first_day_of_month
+        BillingDailyRollup.day >= first_day_of_month
     ).scalar() or 0.0
     
-    activity_query = db.query(Activity)
+    activity_query = (
+        db.query(
+            Activity.id,
+            Activity.date,
+            Activity.type,
+            Activity.description,
+            Customer.name,
+            User.username,
+        )
+        .outerjoin(Customer, Customer.id == Activity.customer_id)
+        .outerjoin(User, User.id == Activity.created_by)
+    )
     
     if current_user.role != "owner":
-        activity_query = activity_query.join(Customer).filter(Customer.assigned_to == current_user.id)
+        activity_query = activity_query.filter(Customer.assigned_to == current_user.id)
     
-    recent_activities = []
-    for activity in activity_query.order_by(Activity.date.desc()).limit(10).all():
-        customer = db.query(Customer).filter(Customer.id == activity.customer_id).first()
-        user = db.query(User).filter(User.id == activity.created_by).first()
-        
-        recent_activities.append({
-            "id": activity.id,
-            "date": activity.date,
-            "type": activity.type,
-            "description": activity.description,
-            "customer_name": customer.name if customer else "Unknown",
-            "user_name": user.username if user else "Unknown"
-        })
-    
-    status_counts = {}
-    for status_row in db.query(Customer.status, func.count(Customer.id)).group_by(Customer.status).all():
-        status_counts[status_row[0]] = status_row[1]
+    recent_activities = [
+        {
+            "id": activity_id,
+            "date": activity_date,
+            "type": activity_type,
+            "description": description,
+            "customer_name": customer_name or "Unknown",
+            "user_name": user_name or "Unknown"
+        }
+        for activity_id, activity_date, activity_type, description, customer_name, user_name
+        in activity_query.order_by(Activity.date.desc()).limit(10).all()
+    ]
     
-    monthly_acquisition = {}
-    for i in range(5, -1, -1):
-        month_date = today.replace(day=1) - timedelta(days=i*30)
-        month_name = month_date.strftime("%b %Y")
-        
-        count = customer_query.filter(
-            extract('year', Customer.created_at) == month_date.year,
-            extract('month', Customer.created_at) == month_date.month
-        ).count()
-        
-        monthly_acquisition[month_name] = count
+    monthly_acquisition = {
+        label: monthly_counts[i] for i, (label, _, _) in enumerate(months)
+    }
     
     return {
         "total_customers": total_customers,
@@ -101,65 +147,68 @@ def get_dashboard_data(
     }
 
 @router.get("/status", response_model=StatusData)
-def get_status_data(
-    db: Session = Depends(deps.get_db),
+async def get_status_data(
+    db: SessionRunner = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get status-based analytics data.
     """
-    customer_query = db.query(Customer)
+    return await analytics_cache.get_or_compute(
+        f"status:{analytics_scope(current_user)}",
+        lambda: db.run(_status_data, current_user),
+    )
+
+def _status_data(db: Session, current_user: User) -> Dict[str, Any]:
+    rollup = CustomerDailyRollup
+    months = _month_windows(date.today())
+    
+    rollup_query = db.query(
+        rollup.status,
+        rollup.property_type,
+        rollup.source,
+        func.sum(rollup.customer_count),
+        *[
+            _sum_if(rollup.customer_count, rollup.day >= start, rollup.day < end)
+            for _, start, end in months
+        ],
+    )
     
     if current_user.role != "owner":
-        customer_query = customer_query.filter(Customer.assigned_to == current_user.id)
+        rollup_query = rollup_query.filter(rollup.assigned_to == current_user.id)
     
-    status_counts = {}
-    for status_row in customer_query.with_entities(Customer.status, func.count(Customer.id)).group_by(Customer.status).all():
-        status_counts[status_row[0]] = status_row[1]
+    rows = (
+        rollup_query
+        .group_by(rollup.status, rollup.property_type, rollup.source)
+        .having(func.sum(rollup.customer_count) != 0)
+        .all()
+    )
     
+    status_counts = {}
     status_by_property_type = {}
-    for row in customer_query.with_entities(Customer.status, Customer.property_type, func.count(Customer.id)).group_by(Customer.status, Customer.property_type).all():
-        status = row[0]
+    status_by_source = {}
+    status_timeline = {}
+    
+    for row in rows:
+        status = row[0] or "Unknown"
         property_type = row[1] or "Unknown"
-        count = row[2]
+        source = row[2] or "Unknown"
+        count = row[3]
         
-        if status not in status_by_property_type:
-            status_by_property_type[status] = {}
-        
-        status_by_property_type[status][property_type] = count
-    
-    status_by_source = {}
-    for row in customer_query.with_entities(Customer.status, Customer.source, func.count(Customer.id)).group_by(Customer.status, Customer.source).all():
-        status = row[0]
-        source = row[1] or "Unknown"
-        count = row[2]
+        status_counts[status] = status_counts.get(status, 0) + count
         
-        if status not in status_by_source:
-            status_by_source[status] = {}
+        by_property_type = status_by_property_type.setdefault(status, {})
+        by_property_type[property_type] = by_property_type.get(property_type, 0) + count
         
-        status_by_source[status][source] = count
-    
-    today = date.today()
-    status_timeline = {}
-    statuses = db.query(Customer.status).distinct().all()
-    
-    for status_row in statuses:
-        status = status_row[0]
-        status_timeline[status] = []
+        by_source = status_by_source.setdefault(status, {})
+        by_source[source] = by_source.get(source, 0) + count
         
-        for i in range(5, -1, -1):
-            month_date = today.replace(day=1) - timedelta(days=i*30)
-            
-            count = customer_query.filter(
-                Customer.status == status,
-                extract('year', Customer.created_at) == month_date.year,
-                extract('month', Customer.created_at) == month_date.month
-            ).count()
-            
-            status_timeline[status].append(count)
+        timeline = status_timeline.setdefault(status, [0] * len(months))
+        for i, month_count in enumerate(row[4:]):
+            timeline[i] += month_count
     
     conversion_rates = {}
-    total = customer_query.count() or 1  # Avoid division by zero
+    total = sum(status_counts.values()) or 1  # Avoid division by zero
     
     for status, count in status_counts.items():
         conversion_rates[status] = round(count / total * 100, 2)
@@ -173,61 +222,79 @@ def get_status_data(
     }
 
 @router.get("/sales", response_model=SalesPerformanceData)
-def get_sales_performance(
-    db: Session = Depends(deps.get_db),
+async def get_sales_performance(
+    db: SessionRunner = Depends(deps.get_db),
     current_user: User = Depends(deps.get_current_owner),  # Only owners can access this endpoint
 ) -> Any:
     """
     Get sales rep performance analytics. Only accessible by owners.
     """
-    sales_reps = db.query(User).filter(User.role == "member").all()
+    return await analytics_cache.get_or_compute(
+        f"sales:{analytics_scope(current_user)}",
+        lambda: db.run(_sales_performance_data, current_user),
+    )
+
+def _sales_performance_data(db: Session, current_user: User) -> Dict[str, Any]:
+    rollup = CustomerDailyRollup
+    revenue_rollup = BillingDailyRollup
+    is_closed = rollup.status == "closed"
     
-    total_customers = db.query(Customer).count()
-    total_closed_deals = db.query(Customer).filter(Customer.status == "closed").count()
+    rep_customers = (
+        db.query(
+            rollup.assigned_to.label("rep_id"),
+            func.sum(rollup.customer_count).label("total_customers"),
+            _sum_if(rollup.customer_count, rollup.status.notin_(["closed", "lost"])).label("active_customers"),
+            _sum_if(rollup.customer_count, is_closed).label("closed_deals"),
+            func.sum(rollup.days_to_close).label("days_to_close"),
+        )
+        .group_by(rollup.assigned_to)
+        .subquery()
+    )
     
-    overall_conversion_rate = round(total_closed_deals / (total_customers or 1) * 100, 2)
+    rep_revenue = (
+        db.query(
+            revenue_rollup.user_id.label("rep_id"),
+            func.sum(revenue_rollup.amount).label("revenue"),
+        )
+        .group_by(revenue_rollup.user_id)
+        .subquery()
+    )
+    
+    rep_rows = (
+        db.query(
+            User.id,
+            User.username,
+            func.coalesce(rep_customers.c.total_customers, 0),
+            func.coalesce(rep_customers.c.active_customers, 0),
+            func.coalesce(rep_customers.c.closed_deals, 0),
+            rep_customers.c.days_to_close,
+            func.coalesce(rep_revenue.c.revenue, 0.0),
+        )
+        .outerjoin(rep_customers, rep_customers.c.rep_id == User.id)
+        .outerjoin(rep_revenue, rep_revenue.c.rep_id == User.id)
+        .filter(User.role == "member")
+        .order_by(User.id)
+        .all()
+    )
     
     sales_rep_data = []
-    for rep in sales_reps:
-        rep_customers = db.query(Customer).filter(Customer.assigned_to == rep.id).all()
-        rep_customer_count = len(rep_customers)
-        
-        rep_active_customers = db.query(Customer).filter(
-            Customer.assigned_to == rep.id,
-            Customer.status.notin_(["closed", "lost"])
-        ).count()
-        
-        rep_closed_deals = db.query(Customer).filter(
-            Customer.assigned_to == rep.id,
-            Customer.status == "closed"
-        ).count()
-        
+    for rep_id, rep_name, rep_customer_count, rep_active_customers, rep_closed_deals, days_to_close, revenue in rep_rows:
         rep_conversion_rate = round(rep_closed_deals / (rep_customer_count or 1) * 100, 2)
         
-        closed_customers = [c for c in rep_customers if c.status == "closed"]
-        if closed_customers:
-            total_days = sum(
-                (c.updated_at.date() - c.created_at.date()).days
-                for c in closed_customers
-            )
-            avg_time_to_close = total_days // len(closed_customers)
+        if rep_closed_deals:
+            avg_time_to_close = int(days_to_close or 0) // rep_closed_deals
         else:
             avg_time_to_close = None
         
-        rep_revenue = db.query(func.sum(Billing.amount)).filter(
-            Billing.user_id == rep.id,
-            Billing.status == "paid"
-        ).scalar() or 0.0
-        
         sales_rep_data.append({
-            "rep_id": rep.id,
-            "rep_name": rep.username,
+            "rep_id": rep_id,
+            "rep_name": rep_name,
             "total_customers": rep_customer_count,
             "active_customers": rep_active_customers,
             "closed_deals": rep_closed_deals,
             "conversion_rate": rep_conversion_rate,
             "average_time_to_close": avg_time_to_close,
-            "revenue_generated": rep_revenue
+            "revenue_generated": float(revenue)
         })
     
     top_performers = sorted(
@@ -236,34 +303,40 @@ def get_sales_performance(
         reverse=True
     )[:3]
     
-    today = date.today()
-    performance_by_month = {}
+    months = _month_windows(date.today())
     
-    for i in range(5, -1, -1):
-        month_date = today.replace(day=1) - timedelta(days=i*30)
-        month_name = month_date.strftime("%b %Y")
-        
-        new_customers = db.query(Customer).filter(
-            extract('year', Customer.created_at) == month_date.year,
-            extract('month', Customer.created_at) == month_date.month
-        ).count()
-        
-        closed_deals = db.query(Customer).filter(
-            Customer.status == "closed",
-            extract('year', Customer.updated_at) == month_date.year,
-            extract('month', Customer.updated_at) == month_date.month
-        ).count()
-        
-        revenue = db.query(func.sum(Billing.amount)).filter(
-            Billing.status == "paid",
-            extract('year', Billing.paid_date) == month_date.year,
-            extract('month', Billing.paid_date) == month_date.month
-        ).scalar() or 0.0
-        
+    customer_totals = db.query(
+        func.coalesce(func.sum(rollup.customer_count), 0),
+        _sum_if(rollup.customer_count, is_closed),
+        *[
+            _sum_if(rollup.customer_count, rollup.day >= start, rollup.day < end)
+            for _, start, end in months
+        ],
+        *[
+            _sum_if(rollup.customer_count, rollup.closed_day >= start, rollup.closed_day < end)
+            for _, start, end in months
+        ],
+    ).one()
+    
+    total_customers, total_closed_deals = customer_totals[0], customer_totals[1]
+    new_by_month = customer_totals[2:2 + len(months)]
+    closed_by_month = customer_totals[2 + len(months):]
+    
+    revenue_by_month = db.query(
+        *[
+            _sum_if(revenue_rollup.amount, revenue_rollup.day >= start, revenue_rollup.day < end)
+            for _, start, end in months
+        ]
+    ).one()
+    
+    overall_conversion_rate = round(total_closed_deals / (total_customers or 1) * 100, 2)
+    
+    performance_by_month = {}
+    for i, (month_name, _, _) in enumerate(months):
         performance_by_month[month_name] = {
-            "new_customers": new_customers,
-            "closed_deals": closed_deals,
-            "revenue": revenue
+            "new_customers": new_by_month[i],
+            "closed_deals": closed_by_month[i],
+            "revenue": float(revenue_by_month[i])
         }
     
     return {
@@ -274,3 +347,12 @@ def get_sales_performance(
         "top_performers": top_performers,
         "performance_by_month": performance_by_month
     }
+
+@router.get("/cache-stats")
+async def get_cache_stats(
+    current_user: User = Depends(deps.get_current_owner),
+) -> Any:
+    """
+    Get hit/miss counters for the analytics result cache. Only accessible by owners.
+    """
+    return analytics_cache.stats()
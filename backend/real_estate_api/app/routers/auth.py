@@ -1,27 +1,35 @@
 from datetime import timedelta
-from typing import Any
+from typing import Any, Optional, Tuple
 
 from fastapi import APIRouter, Depends, HTTPException, status, Body
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import case, or_
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.cache import invalidate_principal
 from app.core.config import settings
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.hashing import hashing_service
+from app.core.security import create_access_token
+from app.db.session import SessionRunner
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserCreate, UserLogin, PasswordResetRequest, PasswordReset, Token
 
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-def register(
+async def register(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     user_in: UserCreate,
 ) -> Any:
     """
     Register a new user.
     """
+    password_hash = await hashing_service.hash_password(user_in.password)
+    return await db.run(_register, user_in, password_hash)
+
+def _register(db: Session, user_in: UserCreate, password_hash: str) -> UserSchema:
     user = db.query(User).filter(User.email == user_in.email).first()
     if user:
         raise HTTPException(
@@ -39,105 +47,118 @@ def register(
     user = User(
         username=user_in.username,
         email=user_in.email,
-        password=get_password_hash(user_in.password),
+        password=password_hash,
         role=user_in.role,
         company=user_in.company,
     )
     db.add(user)
     db.commit()
     db.refresh(user)
-    return user
+    return UserSchema.model_validate(user)
+
+def _find_login_user(db: Session, login: str, allow_username: bool) -> Optional[Tuple[int, str]]:
+    query = db.query(User.id, User.password)
+    if allow_username:
+        # One round trip; an email match wins over a username match.
+        query = query.filter(or_(User.email == login, User.username == login)).order_by(
+            case((User.email == login, 0), else_=1)
+        )
+    else:
+        query = query.filter(User.email == login)
+    user = query.first()
+    return tuple(user) if user else None
+
+def _upgrade_password_hash(db: Session, user_id: int, old_hash: str, new_hash: str) -> None:
+    # Only replace the hash that was verified, never a password changed meanwhile.
+    db.query(User).filter(User.id == user_id, User.password == old_hash).update(
+        {User.password: new_hash}, synchronize_session=False
+    )
+    db.commit()
+
+async def _authenticate(db: SessionRunner, user: Optional[Tuple[int, str]], password: str) -> Optional[int]:
+    if not user:
+        return None
+    
+    user_id, password_hash = user
+    valid, new_hash = await hashing_service.verify_password(password, password_hash)
+    if not valid:
+        return None
+    if new_hash:
+        await db.run(_upgrade_password_hash, user_id, password_hash, new_hash)
+        invalidate_principal(user_id)
+    return user_id
+
+def _token_for(user_id: int) -> dict:
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": create_access_token(
+            subject=user_id, expires_delta=access_token_expires
+        ),
+        "token_type": "bearer",
+    }
 
 @router.post("/login", response_model=Token)
-def login(
-    db: Session = Depends(deps.get_db),
+async def login(
+    db: SessionRunner = Depends(deps.get_db),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user:
-        user = db.query(User).filter(User.username == form_data.username).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email/username or password",
-            )
-    
-    if not verify_password(form_data.password, user.password):
+    user = await db.run(_find_login_user, form_data.username, True)
+    user_id = await _authenticate(db, user, form_data.password)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/username or password",
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": create_access_token(
-            subject=user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+    return _token_for(user_id)
 
 @router.post("/login/json", response_model=Token)
-def login_json(
+async def login_json(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     user_in: UserLogin = Body(...),
 ) -> Any:
     """
     JSON login endpoint for frontend applications.
     """
-    email = user_in.email
-    password = user_in.password
-    
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-        )
-    
-    if not verify_password(password, user.password):
+    user = await db.run(_find_login_user, user_in.email, False)
+    user_id = await _authenticate(db, user, user_in.password)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": create_access_token(
-            subject=user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+    return _token_for(user_id)
 
 @router.post("/logout")
-def logout() -> Any:
+async def logout() -> Any:
     """
     Logout endpoint (client-side only, just for API completeness).
     """
     return {"message": "Logged out successfully"}
 
 @router.post("/reset-password", response_model=dict)
-def reset_password_request(
+async def reset_password_request(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     reset_request: PasswordResetRequest,
 ) -> Any:
     """
     Request password reset.
     """
-    user = db.query(User).filter(User.email == reset_request.email).first()
+    user = await db.run(_find_login_user, reset_request.email, False)
     if not user:
         return {"message": "If the email exists, a password reset link has been sent."}
     
     return {"message": "If the email exists, a password reset link has been sent."}
 
 @router.post("/reset-password/confirm", response_model=dict)
-def reset_password_confirm(
+async def reset_password_confirm(
     *,
-    db: Session = Depends(deps.get_db),
     reset_data: PasswordReset,
 ) -> Any:
     """
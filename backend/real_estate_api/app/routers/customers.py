@@ -1,71 +1,157 @@
-from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Path
+from typing import Any, Dict, List, Literal, Optional, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from datetime import date
-import csv
-from io import StringIO
 
 from app.api import deps
+from app.core.cache import invalidate_analytics
+from app.core.config import settings
+from app.core.duplicates import (
+    CUSTOMER,
+    KINDS,
+    REGISTRY_DATA,
+    find_duplicate_clusters,
+    index_customers,
+    rebuild_duplicate_keys,
+    unindex_records,
+)
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_page
+from app.core.rollups import customer_bucket, record_customer_change, record_customer_changes
+from app.core.search import apply_customer_search
+from app.core.streaming import iter_csv, iter_gzip, iter_ndjson
+from app.db.session import SessionLocal, SessionRunner
 from app.models.user import User
 from app.models.customer import Customer
 from app.models.activity import Activity
+from app.models.duplicate_key import DuplicateKey
+from app.models.registry_data import RegistryData
 from app.schemas.customer import (
     Customer as CustomerSchema,
     CustomerCreate,
     CustomerUpdate,
     CustomerWithActivities,
+    CustomerBulk,
+    CustomerBulkItem,
+    CustomerBulkOperation,
+    CustomerBulkResult,
     Activity as ActivitySchema,
     ActivityCreate,
-    CustomerExport
+    DuplicateCluster,
+    DuplicateScan,
 )
 
 router = APIRouter()
 
+EXPORT_COLUMNS = [
+    ("ID", Customer.id),
+    ("Name", Customer.name),
+    ("Phone Number", Customer.phone_number),
+    ("Email", Customer.email),
+    ("Current Address", Customer.current_address),
+    ("Postal Code", Customer.postal_code),
+    ("Inheritance Address", Customer.inheritance_address),
+    ("Property Type", Customer.property_type),
+    ("Status", Customer.status),
+    ("Assigned To", Customer.assigned_to),
+    ("Last Contact Date", Customer.last_contact_date),
+    ("Next Contact Date", Customer.next_contact_date),
+    ("Notes", Customer.notes),
+    ("Source", Customer.source),
+    ("Created At", Customer.created_at),
+    ("Updated At", Customer.updated_at),
+]
+
+# Columns needed to move a customer between rollup buckets and re-key it.
+BULK_COLUMNS = [
+    Customer.id, Customer.created_at, Customer.updated_at, Customer.assigned_to, Customer.status,
+    Customer.source, Customer.property_type, Customer.name, Customer.phone_number,
+    Customer.postal_code, Customer.email,
+]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+def _visible_customers_filter(current_user: User, assigned_to: Optional[int]) -> List[Any]:
+    if assigned_to:
+        if current_user.role != "owner" and assigned_to != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Regular members can only filter by their own ID",
+            )
+        return [Customer.assigned_to == assigned_to]
+    if current_user.role != "owner":
+        return [Customer.assigned_to == current_user.id]
+    return []
+
+def _get_accessible_customer(db: Session, customer_id: int, current_user: User, action: str) -> Customer:
+    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    if not customer:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Customer not found",
+        )
+    
+    if current_user.role != "owner" and customer.assigned_to != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Not enough permissions to {action}",
+        )
+    return customer
+
 @router.get("/", response_model=List[CustomerSchema])
-def get_customers(
-    db: Session = Depends(deps.get_db),
+async def get_customers(
+    response: Response,
+    db: SessionRunner = Depends(deps.get_db),
     skip: int = 0,
-    limit: int = 100,
-    status: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
     assigned_to: Optional[int] = None,
     search: Optional[str] = None,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Retrieve customers with optional filtering.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
     """
-    query = db.query(Customer)
+    criteria = _visible_customers_filter(current_user, assigned_to)
+    if status_filter:
+        criteria.append(Customer.status == status_filter)
     
-    if status:
-        query = query.filter(Customer.status == status)
-    
-    if assigned_to:
-        if current_user.role != "owner" and assigned_to != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Regular members can only filter by their own ID",
-            )
-        query = query.filter(Customer.assigned_to == assigned_to)
-    elif current_user.role != "owner":
-        query = query.filter(Customer.assigned_to == current_user.id)
+    customers, next_cursor = await db.run(_get_customers, criteria, search, skip, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return customers
+
+def _get_customers(
+    db: Session,
+    criteria: List[Any],
+    search: Optional[str],
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+) -> Tuple[List[CustomerSchema], Optional[str]]:
+    query = db.query(Customer).filter(*criteria)
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            (Customer.name.ilike(search_term)) |
-            (Customer.email.ilike(search_term)) |
-            (Customer.phone_number.ilike(search_term))
+        # Relevance-ranked results page by offset rather than by cursor.
+        query = apply_customer_search(query, search)
+        query = query.order_by(Customer.created_at.desc(), Customer.id.desc())
+        customers, next_cursor = query.offset(skip).limit(limit).all(), None
+    else:
+        customers, next_cursor = keyset_page(
+            query, [Customer.created_at, Customer.id], limit, cursor=cursor, skip=skip
         )
-    
-    query = query.order_by(Customer.created_at.desc())
-    
-    customers = query.offset(skip).limit(limit).all()
-    return customers
+    return [CustomerSchema.model_validate(customer) for customer in customers], next_cursor
 
 @router.post("/", response_model=CustomerSchema, status_code=status.HTTP_201_CREATED)
-def create_customer(
+async def create_customer(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     customer_in: CustomerCreate,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -81,41 +167,352 @@ def create_customer(
             detail="Regular members can only create customers assigned to themselves",
         )
     
+    customer = await db.run(_create_customer, customer_in)
+    invalidate_analytics(customer_in.assigned_to)
+    return customer
+
+def _create_customer(db: Session, customer_in: CustomerCreate) -> CustomerSchema:
     customer = Customer(**customer_in.model_dump())
     db.add(customer)
+    db.flush()
+    record_customer_change(db, None, customer_bucket(customer))
+    index_customers(db, [customer])
     db.commit()
     db.refresh(customer)
-    return customer
+    return CustomerSchema.model_validate(customer)
 
-@router.get("/{customer_id}", response_model=CustomerWithActivities)
-def get_customer(
+@router.post("/bulk", response_model=CustomerBulkResult, response_model_exclude_none=True)
+async def bulk_customers(
     *,
-    db: Session = Depends(deps.get_db),
-    customer_id: int = Path(..., gt=0),
+    db: SessionRunner = Depends(deps.get_db),
+    bulk: CustomerBulk,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
-    Get a specific customer by id with activities.
+    Create, update and delete many customers in one request.
+    
+    The permission rules of the single-customer endpoints are checked for the
+    whole batch before anything is written; operations that fail them are
+    reported and the rest still run. A customer may only be updated or deleted
+    once per batch. Writes are committed every CUSTOMER_BULK_CHUNK operations,
+    with one multi-row INSERT for the creates and one UPDATE per distinct set
+    of changes. `results` has one entry per operation, in request order.
     """
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not customer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer not found",
+    result, assignees = await db.run(_bulk_customers, bulk.operations, current_user, settings.CUSTOMER_BULK_CHUNK)
+    invalidate_analytics(*assignees)
+    return result
+
+def _bulk_denial(
+    operation: CustomerBulkOperation,
+    assignees: Dict[int, Optional[int]],
+    seen: Set[int],
+    current_user: User,
+) -> Optional[CustomerBulkItem]:
+    """Why an operation may not run, as its result; None when it may."""
+    is_owner = current_user.role == "owner"
+    if operation.op == "create":
+        if not is_owner and operation.data.assigned_to not in (None, current_user.id):
+            return CustomerBulkItem(
+                status=status.HTTP_403_FORBIDDEN,
+                detail="Regular members can only create customers assigned to themselves",
+            )
+        return None
+    
+    if operation.id in seen:
+        return CustomerBulkItem(
+            status=status.HTTP_409_CONFLICT, id=operation.id,
+            detail="Customer appears more than once in this batch",
+        )
+    seen.add(operation.id)
+    if operation.id not in assignees:
+        return CustomerBulkItem(status=status.HTTP_404_NOT_FOUND, id=operation.id, detail="Customer not found")
+    if not is_owner and assignees[operation.id] != current_user.id:
+        return CustomerBulkItem(
+            status=status.HTTP_403_FORBIDDEN, id=operation.id,
+            detail=f"Not enough permissions to {operation.op} this customer",
+        )
+    if (
+        operation.op == "update" and not is_owner and
+        operation.data.assigned_to is not None and operation.data.assigned_to != current_user.id
+    ):
+        return CustomerBulkItem(
+            status=status.HTTP_403_FORBIDDEN, id=operation.id,
+            detail="Regular members cannot reassign customers to other users",
+        )
+    return None
+
+def _bulk_customers(
+    db: Session,
+    operations: List[CustomerBulkOperation],
+    current_user: User,
+    chunk_size: int,
+) -> Tuple[CustomerBulkResult, Set[Optional[int]]]:
+    targets = list({operation.id for operation in operations if operation.op != "create"})
+    assignees = {}
+    for start in range(0, len(targets), chunk_size):
+        assignees.update(
+            db.query(Customer.id, Customer.assigned_to).filter(Customer.id.in_(targets[start:start + chunk_size]))
         )
     
-    if current_user.role != "owner" and customer.assigned_to != current_user.id:
+    results: List[Optional[CustomerBulkItem]] = [None] * len(operations)
+    accepted, seen = [], set()
+    for index, operation in enumerate(operations):
+        results[index] = _bulk_denial(operation, assignees, seen, current_user)
+        if results[index] is None:
+            accepted.append(index)
+    
+    touched: Set[Optional[int]] = set()
+    for start in range(0, len(accepted), chunk_size):
+        chunk = accepted[start:start + chunk_size]
+        _bulk_create(db, [(index, operations[index]) for index in chunk if operations[index].op == "create"],
+                     current_user, results, touched)
+        _bulk_update(db, [(index, operations[index]) for index in chunk if operations[index].op == "update"],
+                     results, touched)
+        _bulk_delete(db, [(index, operations[index]) for index in chunk if operations[index].op == "delete"],
+                     results, touched)
+        db.commit()
+    
+    counts = {"create": 0, "update": 0, "delete": 0}
+    for index in accepted:
+        counts[operations[index].op] += 1
+    return CustomerBulkResult(
+        created=counts["create"],
+        updated=counts["update"],
+        deleted=counts["delete"],
+        failed=len(operations) - len(accepted),
+        results=results,
+    ), touched
+
+def _bulk_create(
+    db: Session,
+    operations: List[Tuple[int, CustomerBulkOperation]],
+    current_user: User,
+    results: List[Optional[CustomerBulkItem]],
+    touched: Set[Optional[int]],
+) -> None:
+    if not operations:
+        return
+    values = [
+        CustomerCreate(**operation.data.model_dump(exclude_none=True)).model_dump()
+        for _, operation in operations
+    ]
+    for row in values:
+        row["assigned_to"] = row["assigned_to"] or current_user.id
+        touched.add(row["assigned_to"])
+    
+    # Rows come back in the order of values, so each id pairs with its operation.
+    inserted = db.execute(
+        insert(Customer).returning(Customer.id, Customer.created_at, sort_by_parameter_order=True), values
+    ).all()
+    for (index, _), row in zip(operations, inserted):
+        results[index] = CustomerBulkItem(status=status.HTTP_201_CREATED, id=row.id)
+    record_customer_changes(db, [], (
+        customer_bucket(Customer(**row, created_at=created.created_at, updated_at=created.created_at))
+        for row, created in zip(values, inserted)
+    ))
+    index_customers(db, ({**row, "id": created.id} for row, created in zip(values, inserted)))
+
+def _bulk_update(
+    db: Session,
+    operations: List[Tuple[int, CustomerBulkOperation]],
+    results: List[Optional[CustomerBulkItem]],
+    touched: Set[Optional[int]],
+) -> None:
+    if not operations:
+        return
+    ids = [operation.id for _, operation in operations]
+    before = db.query(*BULK_COLUMNS).filter(Customer.id.in_(ids)).all()
+    
+    # Operations making the same changes share one set-based UPDATE, so a
+    # batch reassigning many customers is a single statement per chunk.
+    groups: Dict[Tuple, List[int]] = {}
+    for _, operation in operations:
+        changes = tuple(sorted(operation.data.model_dump(exclude_unset=True).items()))
+        groups.setdefault(changes, []).append(operation.id)
+    for changes, group_ids in groups.items():
+        if changes:
+            db.query(Customer).filter(Customer.id.in_(group_ids)).update(
+                dict(changes), synchronize_session=False
+            )
+    
+    after = db.query(*BULK_COLUMNS).filter(Customer.id.in_(ids)).all()
+    record_customer_changes(db, map(customer_bucket, before), map(customer_bucket, after))
+    index_customers(db, after)
+    touched.update(row.assigned_to for row in before)
+    touched.update(row.assigned_to for row in after)
+    for index, operation in operations:
+        results[index] = CustomerBulkItem(status=status.HTTP_200_OK, id=operation.id)
+
+def _bulk_delete(
+    db: Session,
+    operations: List[Tuple[int, CustomerBulkOperation]],
+    results: List[Optional[CustomerBulkItem]],
+    touched: Set[Optional[int]],
+) -> None:
+    if not operations:
+        return
+    ids = [operation.id for _, operation in operations]
+    before = db.query(*BULK_COLUMNS).filter(Customer.id.in_(ids)).all()
+    
+    # A set-based DELETE skips the ORM cascade, so remove activities first.
+    db.query(Activity).filter(Activity.customer_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Customer).filter(Customer.id.in_(ids)).delete(synchronize_session=False)
+    record_customer_changes(db, map(customer_bucket, before), [])
+    unindex_records(db, CUSTOMER, ids)
+    touched.update(row.assigned_to for row in before)
+    for index, operation in operations:
+        results[index] = CustomerBulkItem(status=status.HTTP_200_OK, id=operation.id)
+
+@router.get("/export")
+async def export_customers(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    assigned_to: Optional[int] = None,
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream customers as CSV or NDJSON, optionally gzip-compressed.
+    """
+    criteria = _visible_customers_filter(current_user, assigned_to)
+    if status_filter:
+        criteria.append(Customer.status == status_filter)
+    
+    statement = (
+        select(*[column for _, column in EXPORT_COLUMNS])
+        .where(*criteria)
+        .order_by(Customer.created_at.desc(), Customer.id.desc())
+        .execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+    )
+    
+    def iter_rows():
+        # The request session may be closed before the body is sent, so the
+        # stream reads through its own session on a server-side cursor.
+        export_db = SessionLocal()
+        try:
+            yield from export_db.execute(statement)
+        finally:
+            export_db.close()
+    
+    if format == "csv":
+        body = iter_csv([label for label, _ in EXPORT_COLUMNS], iter_rows())
+    else:
+        body = iter_ndjson([column.key for _, column in EXPORT_COLUMNS], iter_rows())
+    
+    filename = f"customers_export_{date.today().isoformat()}.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
+    if gzip:
+        body = iter_gzip(body)
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+async def get_duplicate_customers(
+    *,
+    response: Response,
+    db: SessionRunner = Depends(deps.get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    kind: Optional[Literal[KINDS]] = None,
+    assigned_to: Optional[int] = None,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Candidate duplicates across customers and registry rows, ordered by each
+    cluster's smallest shared key. Records land in one cluster when they share
+    a phone number, a postal code and name, or an email local part, directly
+    or through other records. Regular members only see clusters among their
+    own records.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
+    """
+    if assigned_to and current_user.role != "owner" and assigned_to != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this customer",
+            detail="Regular members can only filter by their own ID",
         )
+    owner_id = assigned_to or (current_user.id if current_user.role != "owner" else None)
+    after = tuple(decode_cursor(cursor, [DuplicateKey.kind, DuplicateKey.key])) if cursor else None
+    clusters, next_key = await db.run(_get_duplicate_customers, owner_id, kind, limit, after)
+    if next_key:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(next_key)
+    return clusters
+
+def _get_duplicate_customers(
+    db: Session,
+    owner_id: Optional[int],
+    kind: Optional[str],
+    limit: int,
+    after: Optional[Tuple[str, str]],
+) -> Tuple[List[DuplicateCluster], Optional[Tuple[str, str]]]:
+    clusters, next_key = find_duplicate_clusters(db, owner_id, [kind] if kind else None, limit, after)
+    wanted = {CUSTOMER: set(), REGISTRY_DATA: set()}
+    for _, records in clusters:
+        for record_type, record_id in records:
+            wanted[record_type].add(record_id)
     
-    return customer
+    details = {}
+    if wanted[CUSTOMER]:
+        for row in db.query(
+            Customer.id, Customer.name, Customer.phone_number, Customer.postal_code,
+            Customer.email, Customer.assigned_to, Customer.created_at,
+        ).filter(Customer.id.in_(wanted[CUSTOMER])):
+            details[(CUSTOMER, row.id)] = {
+                "name": row.name, "phone_number": row.phone_number, "postal_code": row.postal_code,
+                "email": row.email, "owner_id": row.assigned_to, "created_at": row.created_at,
+            }
+    if wanted[REGISTRY_DATA]:
+        for row in db.query(
+            RegistryData.id, RegistryData.customer_name, RegistryData.phone_number,
+            RegistryData.postal_code, RegistryData.created_by, RegistryData.created_at,
+        ).filter(RegistryData.id.in_(wanted[REGISTRY_DATA])):
+            details[(REGISTRY_DATA, row.id)] = {
+                "name": row.customer_name, "phone_number": row.phone_number, "postal_code": row.postal_code,
+                "owner_id": row.created_by, "created_at": row.created_at,
+            }
+    
+    return [
+        DuplicateCluster(
+            keys=[{"kind": kind, "key": key} for kind, key in keys],
+            records=[
+                {"type": record_type, "id": record_id, **details.get((record_type, record_id), {})}
+                for record_type, record_id in records
+            ],
+        )
+        for keys, records in clusters
+    ], next_key
+
+@router.post("/duplicates/scan", response_model=DuplicateScan)
+async def scan_duplicate_customers(
+    db: SessionRunner = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_owner),
+) -> Any:
+    """
+    Rebuild the duplicate key index from every customer and registry row.
+    Only needed for records written before the index existed or outside the API.
+    """
+    return await db.run(rebuild_duplicate_keys)
+
+@router.get("/{customer_id}", response_model=CustomerWithActivities)
+async def get_customer(
+    *,
+    db: SessionRunner = Depends(deps.get_db),
+    customer_id: int = Path(..., gt=0),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get a specific customer by id with activities.
+    """
+    return await db.run(_get_customer, customer_id, current_user)
+
+def _get_customer(db: Session, customer_id: int, current_user: User) -> CustomerWithActivities:
+    customer = _get_accessible_customer(db, customer_id, current_user, "access this customer")
+    return CustomerWithActivities.model_validate(customer)
 
 @router.put("/{customer_id}", response_model=CustomerSchema)
-def update_customer(
+async def update_customer(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     customer_id: int = Path(..., gt=0),
     customer_in: CustomerUpdate,
     current_user: User = Depends(deps.get_current_active_user),
@@ -123,19 +520,6 @@ def update_customer(
     """
     Update a customer.
     """
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not customer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer not found",
-        )
-    
-    if current_user.role != "owner" and customer.assigned_to != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to update this customer",
-        )
-    
     if (
         current_user.role != "owner" and 
         customer_in.assigned_to is not None and 
@@ -146,81 +530,101 @@ def update_customer(
             detail="Regular members cannot reassign customers to other users",
         )
     
+    customer, previous_assignee = await db.run(_update_customer, customer_id, customer_in, current_user)
+    invalidate_analytics(previous_assignee, customer.assigned_to)
+    return customer
+
+def _update_customer(
+    db: Session,
+    customer_id: int,
+    customer_in: CustomerUpdate,
+    current_user: User,
+) -> Tuple[CustomerSchema, Optional[int]]:
+    customer = _get_accessible_customer(db, customer_id, current_user, "update this customer")
+    
+    before = customer_bucket(customer)
+    previous_assignee = customer.assigned_to
     customer_data = customer_in.model_dump(exclude_unset=True)
     for field in customer_data:
         setattr(customer, field, customer_data[field])
     
     db.add(customer)
+    db.flush()
+    record_customer_change(db, before, customer_bucket(customer))
+    index_customers(db, [customer])
     db.commit()
     db.refresh(customer)
-    return customer
+    return CustomerSchema.model_validate(customer), previous_assignee
 
 @router.delete("/{customer_id}", response_model=CustomerSchema)
-def delete_customer(
+async def delete_customer(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     customer_id: int = Path(..., gt=0),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Delete a customer.
     """
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not customer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer not found",
-        )
-    
-    if current_user.role != "owner" and customer.assigned_to != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to delete this customer",
-        )
+    customer = await db.run(_delete_customer, customer_id, current_user)
+    invalidate_analytics(customer.assigned_to)
+    return customer
+
+def _delete_customer(db: Session, customer_id: int, current_user: User) -> CustomerSchema:
+    customer = _get_accessible_customer(db, customer_id, current_user, "delete this customer")
     
+    deleted = CustomerSchema.model_validate(customer)
+    record_customer_change(db, customer_bucket(customer), None)
+    unindex_records(db, CUSTOMER, [customer.id])
     db.delete(customer)
     db.commit()
-    return customer
+    return deleted
 
 @router.get("/{customer_id}/activities", response_model=List[ActivitySchema])
-def get_customer_activities(
+async def get_customer_activities(
     *,
-    db: Session = Depends(deps.get_db),
+    response: Response,
+    db: SessionRunner = Depends(deps.get_db),
     customer_id: int = Path(..., gt=0),
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Get activities for a specific customer.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
     """
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not customer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer not found",
-        )
-    
-    if current_user.role != "owner" and customer.assigned_to != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to access this customer's activities",
-        )
-    
-    activities = (
-        db.query(Activity)
-        .filter(Activity.customer_id == customer_id)
-        .order_by(Activity.date.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    activities, next_cursor = await db.run(
+        _get_customer_activities, customer_id, current_user, skip, limit, cursor
     )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return activities
 
+def _get_customer_activities(
+    db: Session,
+    customer_id: int,
+    current_user: User,
+    skip: int,
+    limit: int,
+    cursor: Optional[str],
+) -> Tuple[List[ActivitySchema], Optional[str]]:
+    _get_accessible_customer(db, customer_id, current_user, "access this customer's activities")
+    
+    activities, next_cursor = keyset_page(
+        db.query(Activity).filter(Activity.customer_id == customer_id),
+        [Activity.date, Activity.id],
+        limit,
+        cursor=cursor,
+        skip=skip,
+    )
+    return [ActivitySchema.model_validate(activity) for activity in activities], next_cursor
+
 @router.post("/{customer_id}/activities", response_model=ActivitySchema, status_code=status.HTTP_201_CREATED)
-def create_customer_activity(
+async def create_customer_activity(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     customer_id: int = Path(..., gt=0),
     activity_in: ActivityCreate,
     current_user: User = Depends(deps.get_current_active_user),
@@ -228,87 +632,37 @@ def create_customer_activity(
     """
     Create a new activity for a customer.
     """
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
-    if not customer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Customer not found",
-        )
-    
-    if current_user.role != "owner" and customer.assigned_to != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Not enough permissions to add activities to this customer",
-        )
-    
     if activity_in.customer_id != customer_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Customer ID in path must match customer ID in request body",
         )
     
+    activity, assignee = await db.run(_create_customer_activity, customer_id, activity_in, current_user)
+    invalidate_analytics(assignee)
+    return activity
+
+def _create_customer_activity(
+    db: Session,
+    customer_id: int,
+    activity_in: ActivityCreate,
+    current_user: User,
+) -> Tuple[ActivitySchema, Optional[int]]:
+    customer = _get_accessible_customer(db, customer_id, current_user, "add activities to this customer")
+    
     activity = Activity(
         **activity_in.model_dump(),
         created_by=current_user.id
     )
     db.add(activity)
     
+    before = customer_bucket(customer)
     customer.last_contact_date = activity_in.date
     db.add(customer)
+    db.flush()
+    record_customer_change(db, before, customer_bucket(customer))
+    assignee = customer.assigned_to
     
     db.commit()
     db.refresh(activity)
-    return activity
-
-@router.get("/export", response_model=CustomerExport)
-def export_customers(
-    db: Session = Depends(deps.get_db),
-    status: Optional[str] = None,
-    assigned_to: Optional[int] = None,
-    current_user: User = Depends(deps.get_current_active_user),
-) -> Any:
-    """
-    Export customers as CSV.
-    """
-    query = db.query(Customer)
-    
-    if status:
-        query = query.filter(Customer.status == status)
-    
-    if assigned_to:
-        if current_user.role != "owner" and assigned_to != current_user.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Regular members can only filter by their own ID",
-            )
-        query = query.filter(Customer.assigned_to == assigned_to)
-    elif current_user.role != "owner":
-        query = query.filter(Customer.assigned_to == current_user.id)
-    
-    query = query.order_by(Customer.created_at.desc())
-    
-    customers = query.all()
-    
-    output = StringIO()
-    writer = csv.writer(output)
-    
-    writer.writerow([
-        "ID", "Name", "Phone Number", "Email", "Current Address", "Postal Code",
-        "Inheritance Address", "Property Type", "Status", "Assigned To",
-        "Last Contact Date", "Next Contact Date", "Notes", "Source",
-        "Created At", "Updated At"
-    ])
-    
-    for customer in customers:
-        writer.writerow([
-            customer.id, customer.name, customer.phone_number, customer.email,
-            customer.current_address, customer.postal_code, customer.inheritance_address,
-            customer.property_type, customer.status, customer.assigned_to,
-            customer.last_contact_date, customer.next_contact_date, customer.notes,
-            customer.source, customer.created_at, customer.updated_at
-        ])
-    
-    return {
-        "data": customers,
-        "filename": f"customers_export_{date.today().isoformat()}.csv"
-    }
+    return ActivitySchema.model_validate(activity), assignee
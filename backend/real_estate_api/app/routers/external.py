@@ -1,17 +1,99 @@
-from typing import Any, Optional
+import logging
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.api import deps
+from app.core.config import settings
+from app.core.pdf_store import registry_pdf_store
+from app.core.registry_pool import registry_session_pool
+from app.core.streaming import ndjson_line
+from app.db.session import SessionLocal, SessionRunner
+from app.models.customer import Customer
+from app.models.registry_data import RegistryData
+from app.models.registry_pdf import RegistryPdf
 from app.models.user import User
-from app.core.external_services import PostalCodeService, PhoneNumberService, RegistryLibraryService
+from app.schemas.external import PhoneNumberBatch, PostalCodeBatch
+from app.core.external_services import (
+    ExternalServiceError,
+    PhoneNumberService,
+    PostalCodeService,
+    is_valid_phone_number,
+    is_valid_postal_code,
+    lookup_cache,
+    normalize_phone_number,
+    normalize_postal_code,
+    resolve_batch,
+)
 
 router = APIRouter()
 
-postal_code_service = PostalCodeService()
-phone_number_service = PhoneNumberService()
+async def _call_upstream(call: Awaitable[Dict[str, Any]]) -> Dict[str, Any]:
+    try:
+        return await call
+    except ExternalServiceError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=str(exc),
+        )
+
+logger = logging.getLogger(__name__)
+
+postal_code_service = PostalCodeService(
+    cache=lookup_cache("postal_code", settings.POSTAL_CODE_CACHE_TTL_SECONDS)
+)
+phone_number_service = PhoneNumberService(
+    cache=lookup_cache("phone_number", settings.PHONE_NUMBER_CACHE_TTL_SECONDS)
+)
+
+def _frequent_customer_values(limit: int) -> Tuple[List[str], List[str]]:
+    db = SessionLocal()
+    try:
+        values = []
+        for column in (Customer.postal_code, Customer.phone_number):
+            rows = (
+                db.query(column)
+                .filter(column.isnot(None))
+                .group_by(column)
+                .order_by(func.count().desc())
+                .limit(limit)
+                .all()
+            )
+            values.append([row[0] for row in rows])
+        return values[0], values[1]
+    finally:
+        db.close()
+
+async def warm_lookup_caches(limit: int) -> Dict[str, int]:
+    """
+    Resolve the most common postal codes and phone numbers of existing
+    customers that are not cached yet. Returns the number looked up per service.
+    """
+    postal_codes, phone_numbers = await run_in_threadpool(_frequent_customer_values, limit)
+    warmed = {}
+    for name, service, normalize, is_valid, values in (
+        ("postal_code", postal_code_service, normalize_postal_code, is_valid_postal_code, postal_codes),
+        ("phone_number", phone_number_service, normalize_phone_number, is_valid_phone_number, phone_numbers),
+    ):
+        if not service.is_remote or service.cache is None:
+            continue
+        keys = [key for key in dict.fromkeys(map(normalize, values)) if is_valid(key)]
+        cached = await run_in_threadpool(service.cache.cached_keys, keys)
+        missing = [key for key in keys if key not in cached]
+        for value in missing:
+            try:
+                await service.lookup(value)
+            except ExternalServiceError as exc:
+                logger.warning(f"Cache warm-up lookup failed for {value}: {exc}")
+        warmed[name] = len(missing)
+    return warmed
 
 @router.get("/postal-code/{postal_code}")
-def lookup_postal_code(
+async def lookup_postal_code(
     *,
     postal_code: str,
     current_user: User = Depends(deps.get_current_active_user),
@@ -19,7 +101,7 @@ def lookup_postal_code(
     """
     Look up address details by postal code.
     """
-    result = postal_code_service.lookup(postal_code)
+    result = await _call_upstream(postal_code_service.lookup(postal_code))
     
     if "error" in result:
         raise HTTPException(
@@ -30,7 +112,7 @@ def lookup_postal_code(
     return result
 
 @router.get("/phone-number/{phone_number}")
-def lookup_phone_number(
+async def lookup_phone_number(
     *,
     phone_number: str,
     current_user: User = Depends(deps.get_current_active_user),
@@ -38,7 +120,7 @@ def lookup_phone_number(
     """
     Look up details by phone number.
     """
-    result = phone_number_service.lookup(phone_number)
+    result = await _call_upstream(phone_number_service.lookup(phone_number))
     
     if "error" in result:
         raise HTTPException(
@@ -48,20 +130,64 @@ def lookup_phone_number(
     
     return result
 
+def _stream_batch(values, normalize, lookup) -> StreamingResponse:
+    async def lines():
+        async for item in resolve_batch(values, normalize, lookup, settings.EXTERNAL_BATCH_CONCURRENCY):
+            yield ndjson_line(item)
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@router.post("/postal-code/batch")
+async def lookup_postal_codes(
+    *,
+    batch_in: PostalCodeBatch,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Look up many postal codes at once. Values are normalised and deduplicated;
+    results stream back as NDJSON lines in completion order.
+    """
+    return _stream_batch(batch_in.postal_codes, normalize_postal_code, postal_code_service.lookup)
+
+@router.post("/phone-number/batch")
+async def lookup_phone_numbers(
+    *,
+    batch_in: PhoneNumberBatch,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Look up many phone numbers at once. Values are normalised and deduplicated;
+    results stream back as NDJSON lines in completion order.
+    """
+    return _stream_batch(batch_in.phone_numbers, normalize_phone_number, phone_number_service.lookup)
+
+@router.get("/cache-stats")
+async def get_cache_stats(
+    current_user: User = Depends(deps.get_current_owner),
+) -> Any:
+    """
+    Get hit/miss counters for the lookup result caches. Only accessible by owners.
+    """
+    return [postal_code_service.cache.stats(), phone_number_service.cache.stats()]
+
+@router.get("/registry-library/pool")
+async def get_registry_pool_stats(
+    current_user: User = Depends(deps.get_current_owner),
+) -> Any:
+    """
+    Get Registry Library session pool usage. Only accessible by owners.
+    """
+    return registry_session_pool.stats()
+
 @router.post("/registry-library/login")
-def registry_library_login(
+async def registry_library_login(
     *,
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
     """
     Log in to the Registry Library website.
     """
-    registry_service = RegistryLibraryService(
-        username="example_username",
-        password="example_password"
-    )
-    
-    result = registry_service.login()
+    result = await _call_upstream(registry_session_pool.run(lambda service: service.login()))
     
     if not result.get("success", False):
         raise HTTPException(
@@ -72,7 +198,7 @@ def registry_library_login(
     return result
 
 @router.post("/registry-library/search")
-def registry_library_search(
+async def registry_library_search(
     *,
     name: Optional[str] = None,
     address: Optional[str] = None,
@@ -87,15 +213,15 @@ def registry_library_search(
             detail="At least one search criterion (name or address) must be provided"
         )
     
-    registry_service = RegistryLibraryService()
-    
     criteria = {}
     if name:
         criteria["name"] = name
     if address:
         criteria["address"] = address
     
-    result = registry_service.search_registry(criteria)
+    result = await _call_upstream(
+        registry_session_pool.run(lambda service: service.search_registry(criteria))
+    )
     
     if not result.get("success", False):
         raise HTTPException(
@@ -106,7 +232,7 @@ def registry_library_search(
     return result
 
 @router.get("/registry-library/details/{registry_id}")
-def registry_library_details(
+async def registry_library_details(
     *,
     registry_id: str,
     current_user: User = Depends(deps.get_current_active_user),
@@ -114,9 +240,9 @@ def registry_library_details(
     """
     Get detailed information for a specific registry.
     """
-    registry_service = RegistryLibraryService()
-    
-    result = registry_service.get_registry_details(registry_id)
+    result = await _call_upstream(
+        registry_session_pool.run(lambda service: service.get_registry_details(registry_id))
+    )
     
     if not result.get("success", False):
         raise HTTPException(
@@ -125,3 +251,68 @@ def registry_library_details(
         )
     
     return result
+
+def _stored_pdf_hashes(db: Session, registry_id: str) -> List[str]:
+    downloaded = db.query(RegistryPdf.pdf_sha256).filter(RegistryPdf.registry_id == registry_id)
+    extracted = (
+        db.query(RegistryData.pdf_sha256)
+        .filter(RegistryData.registry_id == registry_id, RegistryData.pdf_sha256.isnot(None))
+        .distinct()
+    )
+    return [sha256 for sha256, in downloaded.all() + extracted.all()]
+
+def _record_pdf(db: Session, registry_id: str, stored: Dict[str, Any], user_id: int) -> None:
+    values = {"pdf_sha256": stored["sha256"], "downloaded_by": user_id}
+    if not db.query(RegistryPdf).filter(RegistryPdf.registry_id == registry_id).update(values):
+        try:
+            with db.begin_nested():
+                db.add(RegistryPdf(registry_id=registry_id, **values))
+        except IntegrityError:
+            # A concurrent download of the same registry recorded it first.
+            db.query(RegistryPdf).filter(RegistryPdf.registry_id == registry_id).update(values)
+    db.query(RegistryData).filter(RegistryData.registry_id == registry_id).update(
+        {RegistryData.pdf_sha256: stored["sha256"], RegistryData.pdf_path: stored["path"]},
+        synchronize_session=False,
+    )
+    db.commit()
+
+@router.get("/registry-library/pdf/{registry_id}")
+async def registry_library_pdf(
+    *,
+    db: SessionRunner = Depends(deps.get_db),
+    registry_id: str,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get the PDF for a specific registry. Registries downloaded before are
+    served from the local PDF store without contacting the Registry Library.
+    """
+    stored = next(
+        (sha256 for sha256 in await db.run(_stored_pdf_hashes, registry_id) if registry_pdf_store.has(sha256)),
+        None,
+    )
+    if stored is None:
+        result = await _call_upstream(registry_pdf_store.fetch(
+            registry_id,
+            lambda registry_id, path: registry_session_pool.run(
+                lambda service: service.download_registry_pdf(registry_id, path, resume=True)
+            ),
+        ))
+        await db.run(_record_pdf, registry_id, result, current_user.id)
+        stored = result["sha256"]
+    
+    return FileResponse(
+        registry_pdf_store.path_for(stored),
+        media_type="application/pdf",
+        filename=f"{registry_id}.pdf",
+        headers={"ETag": f'"{stored}"'},
+    )
+
+@router.get("/registry-library/pdf-store")
+async def get_registry_pdf_store_stats(
+    current_user: User = Depends(deps.get_current_owner),
+) -> Any:
+    """
+    Get PDF store download and deduplication counts. Only accessible by owners.
+    """
+    return registry_pdf_store.stats()
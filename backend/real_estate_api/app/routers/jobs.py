@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.api import deps
+from app.core.config import settings
+from app.core.jobs import FINISHED, job_queue
+from app.core.streaming import sse_event
+from app.models.user import User
+from app.schemas.job import Job, RegistryDetailsJobCreate, RegistrySearchJobCreate
+
+router = APIRouter()
+
+async def _get_job(job_id: str, current_user: User) -> Dict[str, Any]:
+    job = await run_in_threadpool(job_queue.store.get, job_id)
+    # Members only see their own jobs; other ids look the same as unknown ones.
+    if job is None or (current_user.role != "owner" and job["owner_id"] != current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+@router.post("/registry-search", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def submit_registry_search(
+    *,
+    job_in: RegistrySearchJobCreate,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Queue a Registry Library search. Poll GET /jobs/{id} or stream /jobs/{id}/events for the result.
+    """
+    return await job_queue.submit(
+        "registry_search", job_in.model_dump(exclude_none=True), current_user.id
+    )
+
+@router.post("/registry-details", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+async def submit_registry_details(
+    *,
+    job_in: RegistryDetailsJobCreate,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Queue a Registry Library details lookup.
+    """
+    return await job_queue.submit("registry_details", job_in.model_dump(), current_user.id)
+
+@router.get("/stats")
+async def get_job_stats(
+    current_user: User = Depends(deps.get_current_owner),
+) -> Any:
+    """
+    Get job counts by status and the number of workers. Only accessible by owners.
+    """
+    return await run_in_threadpool(job_queue.stats)
+
+@router.get("/{job_id}", response_model=Job)
+async def read_job(
+    *,
+    job_id: str,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get a job's status and, once finished, its result or error.
+    """
+    return await _get_job(job_id, current_user)
+
+@router.get("/{job_id}/events")
+async def stream_job_events(
+    *,
+    job_id: str,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Stream the job as Server-Sent Events: one "job" event per status change,
+    ending after it succeeds or fails.
+    """
+    job = await _get_job(job_id, current_user)
+    
+    async def events():
+        current, last_state = job, None
+        last_sent = time.monotonic()
+        while True:
+            state = (current["status"], current["updated_at"])
+            if state != last_state:
+                yield sse_event("job", Job(**current).model_dump(mode="json"))
+                last_state, last_sent = state, time.monotonic()
+            elif time.monotonic() - last_sent >= settings.JOB_EVENTS_KEEPALIVE_SECONDS:
+                yield b": keep-alive\n\n"
+                last_sent = time.monotonic()
+            if current["status"] in FINISHED:
+                return
+            # Polls the store: the job may be running in another worker process.
+            await asyncio.sleep(job_queue.poll_interval)
+            current = await run_in_threadpool(job_queue.store.get, job_id) or current
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
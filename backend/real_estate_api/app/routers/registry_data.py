@@ -0,0 +1,358 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pypdf.errors import PyPdfError
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.api import deps
+from app.core.cache import invalidate_analytics
+from app.core.config import settings
+from app.core.duplicates import (
+    REGISTRY_DATA,
+    blocking_keys,
+    existing_customer_keys,
+    index_customers,
+    index_registry_rows,
+    unindex_records,
+)
+from app.core.external_services import normalize_phone_number, normalize_postal_code
+from app.core.pagination import NEXT_CURSOR_HEADER, keyset_page
+from app.core.pdf_store import registry_pdf_store
+from app.core.registry_extraction import registry_extractor
+from app.core.rollups import customer_bucket, record_customer_changes
+from app.core.streaming import sse_event
+from app.core.uploads import receive_pdf_uploads
+from app.db.session import SessionLocal, SessionRunner
+from app.models.customer import Customer
+from app.models.registry_data import RegistryData
+from app.models.registry_upload import RegistryUpload
+from app.models.user import User
+from app.schemas.registry_data import (
+    RegistryData as RegistryDataSchema,
+    RegistryPromotion,
+    RegistryPromotionResult,
+)
+
+router = APIRouter()
+
+LIST_FIELDS = {name: getattr(RegistryData, name) for name in RegistryDataSchema.model_fields}
+DEFAULT_LIST_FIELDS = (
+    "id", "extracted_at", "customer_name", "postal_code", "prefecture",
+    "current_address", "inheritance_address", "phone_number", "status",
+)
+SORT_COLUMNS = [RegistryData.extracted_at, RegistryData.id]
+PROMOTED_SOURCE = "受付台帳"
+
+def _visible_registry_filter(current_user: User, created_by: Optional[int]) -> List[Any]:
+    if created_by:
+        if current_user.role != "owner" and created_by != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Regular members can only filter by their own ID",
+            )
+        return [RegistryData.created_by == created_by]
+    if current_user.role != "owner":
+        return [RegistryData.created_by == current_user.id]
+    return []
+
+def _registry_criteria(
+    current_user: User,
+    status_filter: Optional[str],
+    prefecture: Optional[str],
+    created_by: Optional[int],
+    extracted_from: Optional[date],
+    extracted_to: Optional[date],
+) -> List[Any]:
+    criteria = _visible_registry_filter(current_user, created_by)
+    if status_filter:
+        criteria.append(RegistryData.status == status_filter)
+    if prefecture:
+        criteria.append(RegistryData.prefecture == prefecture)
+    if extracted_from:
+        criteria.append(RegistryData.extracted_at >= datetime.combine(extracted_from, time.min))
+    if extracted_to:
+        criteria.append(RegistryData.extracted_at < datetime.combine(extracted_to + timedelta(days=1), time.min))
+    return criteria
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(DEFAULT_LIST_FIELDS)
+    unknown = [name for name in names if name not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return ["id"] + [name for name in names if name != "id"]
+
+@router.get("/", response_model=List[RegistryDataSchema], response_model_exclude_unset=True)
+async def get_registry_data(
+    response: Response,
+    db: SessionRunner = Depends(deps.get_db),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: Literal["desc", "asc"] = "desc",
+    status_filter: Optional[str] = Query(None, alias="status"),
+    prefecture: Optional[str] = None,
+    created_by: Optional[int] = None,
+    extracted_from: Optional[date] = None,
+    extracted_to: Optional[date] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return; id is always included"),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve extracted registry rows ordered by extraction time.
+    Filters combine; the date range includes both ends. Rows that were never
+    extracted (no extraction time) are not listed.
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
+    """
+    criteria = _registry_criteria(current_user, status_filter, prefecture, created_by, extracted_from, extracted_to)
+    criteria.append(RegistryData.extracted_at.isnot(None))
+    
+    rows, next_cursor = await db.run(_get_registry_data, criteria, _parse_fields(fields), limit, cursor, order)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return rows
+
+def _get_registry_data(
+    db: Session,
+    criteria: List[Any],
+    names: List[str],
+    limit: int,
+    cursor: Optional[str],
+    order: str,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # Only the requested columns are loaded, plus the sort keys for the cursor.
+    selected = list(dict.fromkeys(names + [column.key for column in SORT_COLUMNS]))
+    query = db.query(*[LIST_FIELDS[name] for name in selected]).filter(*criteria)
+    rows, next_cursor = keyset_page(query, SORT_COLUMNS, limit, cursor=cursor, descending=order == "desc")
+    return [{name: getattr(row, name) for name in names} for row in rows], next_cursor
+
+def _completed_upload(sha256: str, current_user: User) -> bool:
+    """Whether the caller can already see a finished extraction of this file."""
+    db = SessionLocal()
+    try:
+        query = db.query(RegistryUpload.id).filter(RegistryUpload.pdf_sha256 == sha256)
+        if current_user.role != "owner":
+            query = query.filter(RegistryUpload.created_by == current_user.id)
+        return query.first() is not None
+    finally:
+        db.close()
+
+def _discard_partial_rows(sha256: str, user_id: int) -> None:
+    """Delete the user's rows from an extraction of this file that did not finish."""
+    db = SessionLocal()
+    try:
+        ids = [row_id for row_id, in db.query(RegistryData.id).filter(
+            RegistryData.pdf_sha256 == sha256,
+            RegistryData.created_by == user_id,
+            or_(RegistryData.status.is_(None), RegistryData.status != "registered"),
+        )]
+        if ids:
+            unindex_records(db, REGISTRY_DATA, ids)
+            db.query(RegistryData).filter(RegistryData.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+    finally:
+        db.close()
+
+def _complete_upload(sha256: str, filename: str, rows: int, user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.add(RegistryUpload(pdf_sha256=sha256, filename=filename, rows=rows, created_by=user_id))
+        db.commit()
+    finally:
+        db.close()
+
+def _insert_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert rows in one multi-row statement; returns them with their ids."""
+    db = SessionLocal()
+    try:
+        ids = db.scalars(
+            insert(RegistryData).returning(RegistryData.id, sort_by_parameter_order=True), records
+        ).all()
+        saved = [{"id": row_id, **record} for row_id, record in zip(ids, records)]
+        index_registry_rows(db, saved)
+        db.commit()
+        return saved
+    finally:
+        db.close()
+
+@router.post("/upload")
+async def upload_registry_ledgers(
+    request: Request,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Upload reception ledger PDFs (multipart/form-data, any number of file
+    fields) and extract RegistryData rows from them.
+    
+    Files are streamed to disk and kept in the PDF store. A file whose
+    extraction the caller can already see is not extracted again; one whose
+    extraction was cut off is extracted afresh. The response is a Server-Sent Events
+    stream: "upload" once the files are received, "progress" per extracted
+    page, "file" with the created rows per file, "error" for unreadable
+    files and finally "complete".
+    """
+    uploads = await receive_pdf_uploads(
+        request, registry_pdf_store.temp_path, settings.REGISTRY_UPLOAD_MAX_BYTES
+    )
+    stored = [
+        (upload.filename, await run_in_threadpool(registry_pdf_store.add, upload.path, upload.sha256, upload.size))
+        for upload in uploads
+    ]
+    
+    async def events():
+        yield sse_event("upload", {"files": [
+            {"filename": filename, "size": pdf["size"], "sha256": pdf["sha256"]} for filename, pdf in stored
+        ]})
+        total_rows = 0
+        for filename, pdf in stored:
+            if await run_in_threadpool(_completed_upload, pdf["sha256"], current_user):
+                yield sse_event("file", {
+                    "filename": filename, "sha256": pdf["sha256"], "duplicate": True, "rows": 0, "records": [],
+                })
+                continue
+            # Rows from an earlier attempt that was cut off are extracted again.
+            await run_in_threadpool(_discard_partial_rows, pdf["sha256"], current_user.id)
+            
+            common = {
+                "extracted_at": datetime.now(timezone.utc),
+                "pdf_path": pdf["path"],
+                "pdf_sha256": pdf["sha256"],
+                "created_by": current_user.id,
+            }
+            pending, saved, pages = [], [], 0
+            try:
+                async for pages_done, pages, records in registry_extractor.extract(pdf["path"]):
+                    pending.extend({**common, **record} for record in records)
+                    if len(pending) >= settings.REGISTRY_UPLOAD_INSERT_BATCH:
+                        saved += await run_in_threadpool(_insert_records, pending)
+                        pending = []
+                    yield sse_event("progress", {
+                        "filename": filename, "pages_done": pages_done, "pages": pages,
+                        "rows": len(saved) + len(pending),
+                    })
+                if pending:
+                    saved += await run_in_threadpool(_insert_records, pending)
+            except PyPdfError as exc:
+                await run_in_threadpool(_discard_partial_rows, pdf["sha256"], current_user.id)
+                yield sse_event("error", {"filename": filename, "detail": f"Could not read PDF: {exc}"})
+                continue
+            await run_in_threadpool(_complete_upload, pdf["sha256"], filename, len(saved), current_user.id)
+            
+            total_rows += len(saved)
+            yield sse_event("file", {
+                "filename": filename, "sha256": pdf["sha256"], "duplicate": False,
+                "pages": pages, "rows": len(saved), "records": saved,
+            })
+        
+        yield sse_event("complete", {"files": len(stored), "rows": total_rows})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/promote", response_model=RegistryPromotionResult)
+async def promote_registry_data(
+    *,
+    db: SessionRunner = Depends(deps.get_db),
+    promotion: RegistryPromotion,
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create customers from registry rows, given by id or by the listing filters.
+    
+    Rows already registered or flagged as errors are left alone. A row is a
+    duplicate when a customer with the same phone number, or the same postal
+    code and name, already exists; duplicates are not inserted but are marked
+    registered along with the new customers. Work is committed in chunks of
+    REGISTRY_PROMOTE_CHUNK rows and only the counts are returned.
+    """
+    assigned_to = promotion.assigned_to or current_user.id
+    if current_user.role != "owner" and assigned_to != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Regular members can only create customers assigned to themselves",
+        )
+    
+    criteria = _registry_criteria(
+        current_user, promotion.status, promotion.prefecture, promotion.created_by,
+        promotion.extracted_from, promotion.extracted_to,
+    )
+    if promotion.ids:
+        criteria.append(RegistryData.id.in_(promotion.ids))
+    criteria.append(or_(RegistryData.status.is_(None), RegistryData.status.notin_(("registered", "error"))))
+    
+    result = await db.run(_promote_registry_data, criteria, assigned_to, settings.REGISTRY_PROMOTE_CHUNK)
+    if result["created"]:
+        invalidate_analytics(assigned_to)
+    return result
+
+def _promote_registry_data(db: Session, criteria: List[Any], assigned_to: int, chunk_size: int) -> Dict[str, int]:
+    counts = dict.fromkeys(RegistryPromotionResult.model_fields, 0)
+    last_id = 0
+    while True:
+        rows = (
+            db.query(
+                RegistryData.id, RegistryData.customer_name, RegistryData.postal_code,
+                RegistryData.current_address, RegistryData.inheritance_address, RegistryData.phone_number,
+            )
+            .filter(*criteria, RegistryData.id > last_id)
+            .order_by(RegistryData.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return counts
+        last_id = rows[-1].id
+        counts["matched"] += len(rows)
+        
+        # Rows match customers on the duplicate detector's phone and postal code + name keys.
+        row_keys = {
+            row.id: blocking_keys(row.customer_name, row.phone_number, row.postal_code) for row in rows
+        }
+        seen = existing_customer_keys(db, set().union(*row_keys.values()))
+        customers, registered = [], []
+        for row in rows:
+            if not row.customer_name:
+                counts["skipped"] += 1
+                continue
+            registered.append(row.id)
+            if row_keys[row.id] & seen:
+                counts["duplicates"] += 1
+                continue
+            seen |= row_keys[row.id]
+            customers.append({
+                "name": row.customer_name.strip(),
+                "phone_number": normalize_phone_number(row.phone_number) if row.phone_number else None,
+                "postal_code": normalize_postal_code(row.postal_code) if row.postal_code else None,
+                "current_address": row.current_address,
+                "inheritance_address": row.inheritance_address,
+                "status": "new",
+                "source": PROMOTED_SOURCE,
+                "assigned_to": assigned_to,
+            })
+        
+        if customers:
+            inserted = db.execute(
+                insert(Customer).returning(Customer.id, Customer.created_at, sort_by_parameter_order=True),
+                customers,
+            ).all()
+            record_customer_changes(db, [], (
+                customer_bucket(Customer(**values, created_at=row.created_at, updated_at=row.created_at))
+                for values, row in zip(customers, inserted)
+            ))
+            index_customers(db, ({**values, "id": row.id} for values, row in zip(customers, inserted)))
+            counts["created"] += len(customers)
+        if registered:
+            counts["registered"] += (
+                db.query(RegistryData)
+                .filter(RegistryData.id.in_(registered))
+                .update({RegistryData.status: "registered"}, synchronize_session=False)
+            )
+            unindex_records(db, REGISTRY_DATA, registered)
+        db.commit()
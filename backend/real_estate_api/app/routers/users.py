@@ -1,17 +1,20 @@
-from typing import Any, List
+from typing import Any, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status, Path
 from sqlalchemy.orm import Session
 
 from app.api import deps
+from app.core.cache import invalidate_principal
+from app.core.hashing import hashing_service
+from app.db.session import SessionRunner
 from app.models.user import User
 from app.schemas.user import User as UserSchema, UserUpdate
 
 router = APIRouter()
 
 @router.get("/", response_model=List[UserSchema])
-def get_users(
-    db: Session = Depends(deps.get_db),
+async def get_users(
+    db: SessionRunner = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(deps.get_current_owner),
@@ -19,13 +22,16 @@ def get_users(
     """
     Retrieve users. Only accessible by owners.
     """
+    return await db.run(_get_users, skip, limit)
+
+def _get_users(db: Session, skip: int, limit: int) -> List[UserSchema]:
     users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    return [UserSchema.model_validate(user) for user in users]
 
 @router.get("/{user_id}", response_model=UserSchema)
-def get_user(
+async def get_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     user_id: int = Path(..., gt=0),
     current_user: User = Depends(deps.get_current_active_user),
 ) -> Any:
@@ -38,18 +44,21 @@ def get_user(
             detail="The user doesn't have enough privileges",
         )
     
+    return await db.run(_get_user, user_id)
+
+def _get_user(db: Session, user_id: int) -> UserSchema:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
-    return user
+    return UserSchema.model_validate(user)
 
 @router.put("/{user_id}", response_model=UserSchema)
-def update_user(
+async def update_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     user_id: int = Path(..., gt=0),
     user_in: UserUpdate,
     current_user: User = Depends(deps.get_current_active_user),
@@ -69,6 +78,15 @@ def update_user(
             detail="Regular members cannot change their role",
         )
     
+    password_hash = None
+    if user_in.password:
+        password_hash = await hashing_service.hash_password(user_in.password)
+    
+    user = await db.run(_update_user, user_id, user_in, password_hash)
+    invalidate_principal(user_id)
+    return user
+
+def _update_user(db: Session, user_id: int, user_in: UserUpdate, password_hash: Optional[str]) -> UserSchema:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -80,25 +98,29 @@ def update_user(
         if field != "password" and getattr(user_in, field) is not None:
             setattr(user, field, getattr(user_in, field))
     
-    if user_in.password:
-        from app.core.security import get_password_hash
-        user.password = get_password_hash(user_in.password)
+    if password_hash:
+        user.password = password_hash
     
     db.add(user)
     db.commit()
     db.refresh(user)
-    return user
+    return UserSchema.model_validate(user)
 
 @router.delete("/{user_id}", response_model=UserSchema)
-def delete_user(
+async def delete_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: SessionRunner = Depends(deps.get_db),
     user_id: int = Path(..., gt=0),
     current_user: User = Depends(deps.get_current_owner),
 ) -> Any:
     """
     Delete a user. Only accessible by owners.
     """
+    user = await db.run(_delete_user, user_id)
+    invalidate_principal(user_id)
+    return user
+
+def _delete_user(db: Session, user_id: int) -> UserSchema:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(
@@ -114,6 +136,7 @@ def delete_user(
                 detail="Cannot delete the last owner",
             )
     
+    deleted = UserSchema.model_validate(user)
     db.delete(user)
     db.commit()
-    return user
+    return deleted
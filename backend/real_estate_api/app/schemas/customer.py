@@ -1,6 +1,9 @@
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr
+from typing import Literal, Optional, List
+from pydantic import BaseModel, EmailStr, Field, model_validator
 from datetime import datetime, date
+import datetime as dt
+
+from app.core.config import settings
 
 class CustomerBase(BaseModel):
     name: Optional[str] = None
@@ -33,9 +36,45 @@ class Customer(CustomerBase):
     class Config:
         from_attributes = True
 
+class CustomerBulkOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # customer to update or delete
+    data: Optional[CustomerUpdate] = None  # fields to create or change
+
+    @model_validator(mode="after")
+    def check_operation(self) -> "CustomerBulkOperation":
+        if self.op == "create":
+            if self.id is not None:
+                raise ValueError("create operations cannot take an id")
+            if self.data is None or not self.data.name or not self.data.phone_number:
+                raise ValueError("create operations need data with a name and phone_number")
+        elif self.id is None:
+            raise ValueError(f"{self.op} operations need an id")
+        elif self.op == "update" and self.data is None:
+            raise ValueError("update operations need data")
+        return self
+
+class CustomerBulk(BaseModel):
+    operations: List[CustomerBulkOperation] = Field(
+        ..., min_length=1, max_length=settings.CUSTOMER_BULK_MAX_OPERATIONS
+    )
+
+class CustomerBulkItem(BaseModel):
+    """Outcome of one operation, in request order; detail is only set on failures."""
+    status: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class CustomerBulkResult(BaseModel):
+    created: int
+    updated: int
+    deleted: int
+    failed: int
+    results: List[CustomerBulkItem]
+
 class ActivityBase(BaseModel):
     customer_id: Optional[int] = None
-    date: Optional[date] = None
+    date: Optional[dt.date] = None  # the field name shadows `date` here
     type: Optional[str] = None
     description: Optional[str] = None
     result: Optional[str] = None
@@ -61,6 +100,26 @@ class CustomerWithActivities(Customer):
     class Config:
         from_attributes = True
 
-class CustomerExport(BaseModel):
-    data: List[Customer]
-    filename: str
+class DuplicateKey(BaseModel):
+    kind: str  # phone/name/email
+    key: str
+
+class DuplicateRecord(BaseModel):
+    """A customer or registry row in a duplicate cluster, with the fields keys are built from."""
+    type: Literal["customer", "registry_data"]
+    id: int
+    name: Optional[str] = None
+    phone_number: Optional[str] = None
+    postal_code: Optional[str] = None
+    email: Optional[str] = None
+    owner_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+class DuplicateCluster(BaseModel):
+    keys: List[DuplicateKey]
+    records: List[DuplicateRecord]
+
+class DuplicateScan(BaseModel):
+    customer: int
+    registry_data: int
+    keys: int
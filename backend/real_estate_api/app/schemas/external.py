@@ -0,0 +1,10 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+from app.core.config import settings
+
+class PostalCodeBatch(BaseModel):
+    postal_codes: List[str] = Field(..., min_length=1, max_length=settings.EXTERNAL_BATCH_MAX_ITEMS)
+
+class PhoneNumberBatch(BaseModel):
+    phone_numbers: List[str] = Field(..., min_length=1, max_length=settings.EXTERNAL_BATCH_MAX_ITEMS)
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+from pydantic import BaseModel, model_validator
+
+class RegistrySearchJobCreate(BaseModel):
+    name: Optional[str] = None
+    address: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_criteria(self) -> "RegistrySearchJobCreate":
+        if not self.name and not self.address:
+            raise ValueError("At least one search criterion (name or address) must be provided")
+        return self
+
+class RegistryDetailsJobCreate(BaseModel):
+    registry_id: str
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    status: str  # queued/running/succeeded/failed
+    params: Dict[str, Any]
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: datetime
+    updated_at: datetime
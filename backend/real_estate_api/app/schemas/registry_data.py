@@ -0,0 +1,41 @@
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+
+from app.core.config import settings
+
+class RegistryData(BaseModel):
+    """A registry row; listings only include the columns that were asked for."""
+    id: int
+    registry_id: Optional[str] = None
+    extracted_at: Optional[datetime] = None
+    customer_name: Optional[str] = None
+    postal_code: Optional[str] = None
+    prefecture: Optional[str] = None
+    current_address: Optional[str] = None
+    inheritance_address: Optional[str] = None
+    phone_number: Optional[str] = None
+    status: Optional[str] = None
+    pdf_path: Optional[str] = None
+    extracted_pdf_path: Optional[str] = None
+    pdf_sha256: Optional[str] = None
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class RegistryPromotion(BaseModel):
+    """Registry rows to turn into customers: explicit ids, or every row matching the filters."""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=settings.REGISTRY_PROMOTION_MAX_IDS)
+    status: Optional[str] = None
+    prefecture: Optional[str] = None
+    created_by: Optional[int] = None
+    extracted_from: Optional[date] = None
+    extracted_to: Optional[date] = None
+    assigned_to: Optional[int] = None
+
+class RegistryPromotionResult(BaseModel):
+    matched: int
+    created: int
+    duplicates: int
+    skipped: int
+    registered: int
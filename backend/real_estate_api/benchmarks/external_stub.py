@@ -0,0 +1,96 @@
+"""
+Local stand-in for the postal code, phone number and Registry Library services.
+
+Point the API at it with POSTAL_CODE_API_URL, PHONE_NUMBER_API_URL and
+REGISTRY_LIBRARY_URL to exercise the HTTP clients without the real services.
+STUB_LATENCY_MS adds a fixed delay to every response.
+
+Usage:
+    uvicorn benchmarks.external_stub:app --port 9000
+"""
+import asyncio
+import os
+import secrets
+from typing import Optional
+
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import Response
+
+from app.core.external_services import (
+    is_valid_phone_number,
+    is_valid_postal_code,
+    offline_phone_number,
+    offline_postal_code,
+    offline_registry_details,
+    offline_registry_search,
+)
+
+app = FastAPI(title="External services stand-in")
+app.state.latency = float(os.getenv("STUB_LATENCY_MS", "0")) / 1000
+app.state.requests = 0
+app.state.sessions = set()
+
+PDF_BYTES = b"%PDF-1.4\n% stand-in registry document\n%%EOF\n"
+
+
+@app.middleware("http")
+async def simulate_latency(request, call_next):
+    app.state.requests += 1
+    if app.state.latency:
+        await asyncio.sleep(app.state.latency)
+    return await call_next(request)
+
+
+def require_session(authorization: Optional[str]) -> None:
+    token = (authorization or "").removeprefix("Bearer ")
+    if token not in app.state.sessions:
+        raise HTTPException(status_code=401, detail="Not logged in")
+
+
+@app.get("/postal-codes/{postal_code}")
+async def postal_code(postal_code: str):
+    if not is_valid_postal_code(postal_code) or postal_code.startswith("000"):
+        raise HTTPException(status_code=404)
+    return offline_postal_code(postal_code)
+
+
+@app.get("/phone-numbers/{phone_number}")
+async def phone_number(phone_number: str):
+    if not is_valid_phone_number(phone_number):
+        raise HTTPException(status_code=404)
+    return offline_phone_number(phone_number)
+
+
+@app.post("/login")
+async def login(credentials: dict):
+    token = secrets.token_hex(16)
+    app.state.sessions.add(token)
+    return {"success": True, "token": token}
+
+
+@app.get("/search")
+async def search(name: Optional[str] = None, address: Optional[str] = None,
+                 authorization: Optional[str] = Header(None)):
+    require_session(authorization)
+    criteria = {key: value for key, value in (("name", name), ("address", address)) if value}
+    return offline_registry_search(criteria)
+
+
+@app.get("/registries/{registry_id}")
+async def registry_details(registry_id: str, authorization: Optional[str] = Header(None)):
+    require_session(authorization)
+    return offline_registry_details(registry_id)
+
+
+@app.get("/registries/{registry_id}/pdf")
+async def registry_pdf(registry_id: str, authorization: Optional[str] = Header(None),
+                       range: Optional[str] = Header(None)):
+    require_session(authorization)
+    if range and range.startswith("bytes="):
+        start = int(range[len("bytes="):].split("-")[0])
+        if start >= len(PDF_BYTES):
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{len(PDF_BYTES)}"})
+        return Response(PDF_BYTES[start:], status_code=206, media_type="application/pdf", headers={
+            "Content-Range": f"bytes {start}-{len(PDF_BYTES) - 1}/{len(PDF_BYTES)}",
+        })
+    return Response(PDF_BYTES, media_type="application/pdf")
@@ -0,0 +1,63 @@
+"""
+Login throughput versus worker count for the password hashing executor.
+
+Runs a burst of concurrent bcrypt verifications through HashingService with
+1, 2, 4, ... workers up to the CPU count, for both the process pool and the
+thread pool, and prints verifications per second.
+
+Usage:
+    python -m benchmarks.login_throughput [--logins 64] [--rounds 12]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from passlib.context import CryptContext
+
+
+def worker_counts(cpus: int):
+    count = 1
+    while count < cpus:
+        yield count
+        count *= 2
+    yield cpus
+
+
+async def burst(service, password_hash: str, logins: int) -> float:
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(service.verify_password("password", password_hash) for _ in range(logins))
+    )
+    elapsed = time.perf_counter() - started
+    assert all(valid for valid, _ in results)
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    from app.core.hashing import HashingService
+
+    password_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=args.rounds).hash("password")
+    cpus = os.cpu_count() or 1
+    print(f"bcrypt rounds={args.rounds} logins={args.logins} cpus={cpus}")
+    print(f"{'executor':<10}{'workers':>8}{'logins/s':>12}")
+    for use_processes in (True, False):
+        for workers in worker_counts(cpus):
+            service = HashingService(workers=workers, max_queue=args.logins, use_processes=use_processes)
+            try:
+                asyncio.run(burst(service, password_hash, workers))  # warm up the pool
+                rate = asyncio.run(burst(service, password_hash, args.logins))
+            finally:
+                service.shutdown()
+            executor = "process" if use_processes else "thread"
+            print(f"{executor:<10}{workers:>8}{rate:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Requests/sec and latency of the middleware stack, ASGI versus BaseHTTPMiddleware.
+
+Drives the real application in-process through httpx's ASGI transport and
+times GET /healthz and GET /api/v1/customers/ with the pure ASGI rate limit
+and CSRF middleware ("asgi") and with BaseHTTPMiddleware wrappers around the
+same checks ("basehttp"), which is how both were implemented before.
+
+Usage:
+    python -m benchmarks.middleware_stack [--requests 2000] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+)
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "100000000")
+os.environ.setdefault("RATE_LIMIT_ROUTES", "")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import httpx
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.core.middleware import CSRFMiddleware, RateLimitMiddleware
+from app.db.init_db import init_db
+from app.main import app
+
+
+class _Terminal:
+    """Stands in for the downstream app so the ASGI middleware can run as a check."""
+
+    def __init__(self):
+        self.called = False
+
+    async def __call__(self, scope, receive, send):
+        self.called = True
+
+
+def base_http(asgi_cls):
+    """Wrap an ASGI middleware's checks in BaseHTTPMiddleware, as before."""
+
+    class Wrapped(BaseHTTPMiddleware):
+        def __init__(self, app, **options):
+            super().__init__(app)
+            self.options = options
+
+        async def dispatch(self, request, call_next):
+            terminal = _Terminal()
+            messages = []
+
+            async def collect(message):
+                messages.append(message)
+
+            await asgi_cls(terminal, **self.options)(request.scope, request.receive, collect)
+            if not terminal.called:
+                start, body = messages[0], messages[1]
+                return Response(body["body"], status_code=start["status"], headers={
+                    k.decode(): v.decode() for k, v in start["headers"]
+                })
+            return await call_next(request)
+
+    Wrapped.__name__ = f"BaseHTTP{asgi_cls.__name__}"
+    return Wrapped
+
+
+def use_stack(kind: str) -> None:
+    stack = []
+    for middleware in app.user_middleware:
+        cls = getattr(middleware.cls, "asgi_cls", middleware.cls)
+        if kind == "basehttp" and cls in (RateLimitMiddleware, CSRFMiddleware):
+            wrapped = base_http(cls)
+            wrapped.asgi_cls = cls
+            stack.append(Middleware(wrapped, **middleware.options))
+        else:
+            stack.append(Middleware(cls, **middleware.options))
+    app.user_middleware = stack
+    app.middleware_stack = app.build_middleware_stack()
+
+
+async def run(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int):
+    latencies = []
+    queue = iter(range(requests))
+
+    async def worker():
+        for _ in queue:
+            started = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+async def login(client: httpx.AsyncClient) -> dict:
+    suffix = uuid.uuid4().hex[:12]
+    email = f"bench{suffix}@example.com"
+    await client.post("/api/v1/auth/register", json={
+        "username": f"bench{suffix}", "email": email, "password": "password", "role": "owner",
+    })
+    response = await client.post("/api/v1/auth/login", data={"username": email, "password": "password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def main(requests: int, concurrency: int):
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = await login(client)
+        print(f"{'stack':<10}{'path':<22}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for kind in ("basehttp", "asgi"):
+            use_stack(kind)
+            for path, path_headers in (("/healthz", {}), ("/api/v1/customers/", headers)):
+                await run(client, path, path_headers, min(requests, 200), concurrency)  # warm up
+                result = await run(client, path, path_headers, requests, concurrency)
+                print(f"{kind:<10}{path:<22}{result['rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency))
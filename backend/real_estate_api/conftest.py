@@ -0,0 +1,27 @@
+"""
+Test configuration shared by the API test modules.
+Points the app at a throwaway SQLite database before it is imported.
+"""
+import os
+import tempfile
+
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test_real_estate.db')}",
+)
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "100000")
+os.environ.setdefault("RATE_LIMIT_ROUTES", "")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOOKUP_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "lookup_cache.db"))
+os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "jobs.db"))
+os.environ.setdefault("REGISTRY_PDF_DIR", tempfile.mkdtemp())
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """Close pooled async connections; aiosqlite keeps a thread per connection."""
+    import asyncio
+    import sys
+
+    db_session = sys.modules.get("app.db.session")
+    if db_session is not None and db_session.async_engine is not None:
+        asyncio.run(db_session.async_engine.dispose())
@@ -0,0 +1,66 @@
+"""
+Tests for the analytics result cache.
+"""
+import asyncio
+import time
+import unittest
+
+from app.core.cache import InMemoryCache, ResultCache
+from tests.utils import auth_headers, client
+
+
+class TestInMemoryCache(unittest.TestCase):
+    """LRU eviction and TTL expiry."""
+
+    def test_lru_eviction(self):
+        cache = InMemoryCache(max_entries=2)
+        cache.set("a", 1, ttl=60)
+        cache.set("b", 2, ttl=60)
+        cache.get("a")
+        cache.set("c", 3, ttl=60)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_ttl_expiry(self):
+        cache = InMemoryCache()
+        cache.set("a", 1, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+    def test_hit_miss_counters(self):
+        results = ResultCache(InMemoryCache(), namespace="test", ttl=60)
+        calls = []
+
+        async def compute():
+            calls.append(1)
+            return {"value": 1}
+
+        for _ in range(3):
+            asyncio.run(results.get_or_compute("key", compute))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results.stats()["hits"], 2)
+        self.assertEqual(results.stats()["misses"], 1)
+
+
+class TestAnalyticsCacheInvalidation(unittest.TestCase):
+    """Customer writes invalidate the cached analytics of the affected scope."""
+
+    def test_create_customer_invalidates_dashboard(self):
+        headers = auth_headers("member")
+        before = client.get("/api/v1/analytics/dashboard", headers=headers).json()
+        self.assertEqual(before, client.get("/api/v1/analytics/dashboard", headers=headers).json())
+
+        response = client.post(
+            "/api/v1/customers/",
+            headers=headers,
+            json={"name": "Cached Customer", "phone_number": "090-3333-0000"}
+        )
+        self.assertEqual(response.status_code, 201, response.text)
+
+        after = client.get("/api/v1/analytics/dashboard", headers=headers).json()
+        self.assertEqual(after["total_customers"], before["total_customers"] + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Tests that the analytics endpoints issue a fixed number of SQL statements.
+"""
+import unittest
+from datetime import date
+
+from app.core.cache import analytics_cache
+from app.core.rollups import rebuild_rollups
+from app.db.session import SessionLocal
+from app.models.activity import Activity
+from app.models.customer import Customer
+from tests.utils import auth_headers, client, count_statements, current_user_id
+
+
+def warm_principal(headers):
+    """Resolve the user once so measured requests hit the principal cache."""
+    client.get("/api/v1/customers/?limit=1", headers=headers)
+
+
+def add_customers(user_id: int, count: int):
+    db = SessionLocal()
+    try:
+        for i in range(count):
+            customer = Customer(
+                name=f"Analytics Customer {i}",
+                phone_number=f"080-1111-{i:04d}",
+                status=["new", "contacted", "closed", "lost"][i % 4],
+                assigned_to=user_id,
+            )
+            db.add(customer)
+            db.flush()
+            db.add(Activity(
+                customer_id=customer.id,
+                date=date.today(),
+                type="call",
+                description="Follow-up call",
+                created_by=user_id,
+            ))
+        db.commit()
+        rebuild_rollups(db)
+        analytics_cache.clear()
+    finally:
+        db.close()
+
+
+class TestAnalyticsQueryCount(unittest.TestCase):
+    """Statement counts must not grow with the amount of data."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.headers = auth_headers("member")
+        cls.user_id = current_user_id(cls.headers)
+        warm_principal(cls.headers)
+
+    def assert_constant_statements(self, path: str):
+        add_customers(self.user_id, 2)
+        with count_statements() as small:
+            response = client.get(path, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+
+        add_customers(self.user_id, 20)
+        with count_statements() as large:
+            response = client.get(path, headers=self.headers)
+        self.assertEqual(response.status_code, 200, response.text)
+
+        self.assertTrue(small)
+        self.assertEqual(len(small), len(large))
+        return response.json()
+
+    def test_dashboard_statement_count(self):
+        """The dashboard payload is computed in a constant number of queries."""
+        data = self.assert_constant_statements("/api/v1/analytics/dashboard")
+        self.assertEqual(len(data["recent_activities"]), 10)
+        self.assertEqual(data["recent_activities"][0]["customer_name"][:9], "Analytics")
+        self.assertEqual(sum(data["status_distribution"].values()), data["total_customers"])
+        self.assertEqual(len(data["monthly_acquisition"]), 6)
+        self.assertEqual(list(data["monthly_acquisition"].values())[-1], data["new_customers_this_month"])
+
+    def test_sales_statement_count(self):
+        """Sales performance does not issue per-rep queries."""
+        owner_headers = auth_headers("owner")
+        warm_principal(owner_headers)
+
+        with count_statements() as small:
+            response = client.get("/api/v1/analytics/sales", headers=owner_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+
+        rep_ids = [current_user_id(auth_headers("member")) for _ in range(3)]
+        for rep_id in rep_ids:
+            add_customers(rep_id, 4)
+        with count_statements() as large:
+            response = client.get("/api/v1/analytics/sales", headers=owner_headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(len(small), len(large))
+
+        data = response.json()
+        reps = {rep["rep_id"]: rep for rep in data["sales_reps"]}
+        rep = reps[rep_ids[0]]
+        self.assertEqual(rep["total_customers"], 4)
+        self.assertEqual(rep["active_customers"], 2)
+        self.assertEqual(rep["closed_deals"], 1)
+        self.assertEqual(rep["conversion_rate"], 25.0)
+        self.assertEqual(rep["average_time_to_close"], 0)
+        self.assertEqual(len(data["performance_by_month"]), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
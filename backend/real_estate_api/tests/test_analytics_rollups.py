@@ -0,0 +1,79 @@
+"""
+Tests for the incrementally maintained analytics rollups.
+"""
+import unittest
+
+from sqlalchemy import func
+
+from app.core.rollups import rebuild_rollups
+from app.db.session import SessionLocal
+from app.models.analytics_rollup import CustomerDailyRollup
+from tests.utils import auth_headers, client, current_user_id
+
+
+def rollup_snapshot(user_id: int):
+    rollup = CustomerDailyRollup
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                rollup.day, rollup.status, rollup.source, rollup.property_type, rollup.closed_day,
+                func.sum(rollup.customer_count), func.sum(rollup.days_to_close),
+            )
+            .filter(rollup.assigned_to == user_id)
+            .group_by(rollup.day, rollup.status, rollup.source, rollup.property_type, rollup.closed_day)
+            .having(func.sum(rollup.customer_count) != 0)
+            .all()
+        )
+        return sorted(tuple(row) for row in rows)
+    finally:
+        db.close()
+
+
+class TestAnalyticsRollups(unittest.TestCase):
+    """Customer write paths keep the rollups equal to a full rebuild."""
+
+    def test_incremental_matches_rebuild(self):
+        headers = auth_headers("member")
+        user_id = current_user_id(headers)
+
+        ids = []
+        for i in range(3):
+            response = client.post(
+                "/api/v1/customers/",
+                headers=headers,
+                json={
+                    "name": f"Rollup Customer {i}",
+                    "phone_number": f"070-2222-000{i}",
+                    "source": "Website",
+                    "property_type": "House",
+                }
+            )
+            self.assertEqual(response.status_code, 201, response.text)
+            ids.append(response.json()["id"])
+
+        response = client.put(f"/api/v1/customers/{ids[0]}", headers=headers, json={"status": "closed"})
+        self.assertEqual(response.status_code, 200, response.text)
+        response = client.put(f"/api/v1/customers/{ids[1]}", headers=headers, json={"source": "Referral"})
+        self.assertEqual(response.status_code, 200, response.text)
+        client.delete(f"/api/v1/customers/{ids[2]}", headers=headers)
+
+        incremental = rollup_snapshot(user_id)
+
+        db = SessionLocal()
+        try:
+            rebuild_rollups(db)
+        finally:
+            db.close()
+
+        self.assertEqual(incremental, rollup_snapshot(user_id))
+
+        response = client.get("/api/v1/analytics/status", headers=headers)
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        self.assertEqual(data["status_counts"], {"closed": 1, "new": 1})
+        self.assertEqual(data["status_by_source"]["new"], {"Referral": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
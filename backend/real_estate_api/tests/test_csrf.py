@@ -0,0 +1,71 @@
+"""
+Tests for the CSRF middleware.
+"""
+import unittest
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware import CSRFMiddleware
+
+
+class TestCSRFMiddleware(unittest.TestCase):
+    """Cookie issuing, token checks and exclusions."""
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(CSRFMiddleware, exclude_paths=["/login"])
+
+        @app.get("/items")
+        async def items():
+            return []
+
+        @app.get("/stream")
+        async def stream():
+            return StreamingResponse(iter([b"a\n", b"b\n"]), media_type="text/plain")
+
+        @app.post("/items")
+        async def create_item():
+            return {}
+
+        @app.post("/login")
+        async def login():
+            return {}
+
+        self.client = TestClient(app)
+
+    def test_get_issues_cookie(self):
+        response = self.client.get("/items")
+        self.assertEqual(response.status_code, 200)
+        cookie = response.headers["set-cookie"]
+        self.assertTrue(cookie.startswith("csrf_token="))
+        self.assertIn("HttpOnly", cookie)
+        self.assertIn("SameSite=strict", cookie)
+
+        response = self.client.get("/items", headers={"Cookie": "csrf_token=abc"})
+        self.assertNotIn("set-cookie", response.headers)
+
+    def test_streaming_response_passes_through(self):
+        response = self.client.get("/stream")
+        self.assertEqual(response.text, "a\nb\n")
+        self.assertIn("set-cookie", response.headers)
+
+    def test_post_requires_matching_token(self):
+        self.assertEqual(self.client.post("/items").status_code, 403)
+        response = self.client.post(
+            "/items", headers={"Cookie": "csrf_token=abc", "X-CSRF-Token": "xyz"}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json(), {"detail": "CSRF token missing or invalid"})
+        response = self.client.post(
+            "/items", headers={"Cookie": "csrf_token=abc", "X-CSRF-Token": "abc"}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_excluded_path(self):
+        self.assertEqual(self.client.post("/login").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Tests for POST /customers/bulk: mixed operations, batch permissions and chunked writes.
+"""
+import unittest
+from unittest import mock
+
+from app.core.config import settings
+from app.core.rollups import rebuild_rollups
+from app.db.session import SessionLocal
+from app.models.activity import Activity
+from app.models.customer import Customer
+from app.models.duplicate_key import DuplicateKey
+from tests.test_analytics_rollups import rollup_snapshot
+from tests.utils import auth_headers, client, count_statements, current_user_id
+
+
+def bulk(headers, operations):
+    return client.post("/api/v1/customers/bulk", headers=headers, json={"operations": operations})
+
+
+def create_ops(count: int, prefix: str, **fields):
+    return [
+        {"op": "create", "data": {"name": f"{prefix} {i}", "phone_number": f"06-4000-{i:04d}", **fields}}
+        for i in range(count)
+    ]
+
+
+class TestCustomerBulk(unittest.TestCase):
+
+    def setUp(self):
+        self.headers = auth_headers("member")
+        self.user_id = current_user_id(self.headers)
+
+    def test_mixed_operations_and_permissions(self):
+        other = auth_headers("member")
+        other_id = bulk(other, create_ops(1, "Other Bulk")).json()["results"][0]["id"]
+        response = bulk(self.headers, create_ops(2, "Mixed Bulk"))
+        first, second = [item["id"] for item in response.json()["results"]]
+        response = client.post(
+            f"/api/v1/customers/{second}/activities",
+            headers=self.headers,
+            json={"customer_id": second, "date": "2025-05-01", "type": "call", "description": "Called"},
+        )
+        self.assertEqual(response.status_code, 201, response.text)
+
+        response = bulk(self.headers, [
+            {"op": "create", "data": {"name": "Mixed New", "phone_number": "06-4100-0001"}},
+            {"op": "update", "id": first, "data": {"status": "contacted"}},
+            {"op": "delete", "id": second},
+            {"op": "update", "id": other_id, "data": {"status": "lost"}},
+            {"op": "delete", "id": 10 ** 9},
+            {"op": "delete", "id": first},
+            {"op": "update", "id": first, "data": {"assigned_to": current_user_id(other)}},
+            {"op": "create", "data": {"name": "Elsewhere", "phone_number": "06-4100-0002",
+                                      "assigned_to": current_user_id(other)}},
+        ])
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+        self.assertEqual(
+            (body["created"], body["updated"], body["deleted"], body["failed"]), (1, 1, 1, 5)
+        )
+        self.assertEqual(
+            [item["status"] for item in body["results"]], [201, 200, 200, 403, 404, 409, 409, 403]
+        )
+        self.assertEqual(body["results"][1], {"status": 200, "id": first})
+        self.assertNotIn("detail", body["results"][0])
+        self.assertEqual(body["results"][3]["detail"], "Not enough permissions to update this customer")
+
+        db = SessionLocal()
+        try:
+            self.assertEqual(db.get(Customer, first).status, "contacted")
+            self.assertIsNone(db.get(Customer, second))
+            self.assertEqual(db.query(Activity).filter(Activity.customer_id == second).count(), 0)
+            self.assertEqual(db.get(Customer, other_id).status, "new")
+            created = db.get(Customer, body["results"][0]["id"])
+            self.assertEqual((created.assigned_to, created.status), (self.user_id, "new"))
+        finally:
+            db.close()
+
+    def test_reassignment_is_set_based_and_chunked(self):
+        owner = auth_headers("owner")
+        successor = auth_headers("member")
+        successor_id = current_user_id(successor)
+
+        with mock.patch.object(settings, "CUSTOMER_BULK_CHUNK", 10), count_statements() as statements:
+            response = bulk(self.headers, create_ops(25, "Leaving Rep", source="Referral"))
+        self.assertEqual(response.json()["created"], 25)
+        # One chunk of keys per ten customers.
+        self.assertEqual(len([sql for sql in statements if sql.startswith("INSERT INTO duplicate_keys")]), 3)
+        ids = [item["id"] for item in response.json()["results"]]
+        db = SessionLocal()
+        try:
+            names = dict(db.query(Customer.id, Customer.name).filter(Customer.id.in_(ids)))
+            self.assertEqual([names[customer_id] for customer_id in ids], [f"Leaving Rep {i}" for i in range(25)])
+        finally:
+            db.close()
+
+        with mock.patch.object(settings, "CUSTOMER_BULK_CHUNK", 10), count_statements() as statements:
+            response = bulk(owner, [
+                {"op": "update", "id": customer_id, "data": {"assigned_to": successor_id}}
+                for customer_id in ids
+            ] + [{"op": "update", "id": ids[0], "data": {"status": "closed"}}])
+        self.assertEqual(response.json()["updated"], 25)
+        self.assertEqual(response.json()["failed"], 1)
+        self.assertEqual(len([sql for sql in statements if sql.startswith("UPDATE customers")]), 3)
+
+        customers = client.get("/api/v1/customers/", headers=successor, params={"limit": 100}).json()
+        self.assertEqual(sorted(customer["id"] for customer in customers), sorted(ids))
+        db = SessionLocal()
+        try:
+            owners = db.query(DuplicateKey.owner_id).filter(
+                DuplicateKey.record_type == "customer", DuplicateKey.record_id.in_(ids)
+            ).distinct().all()
+            self.assertEqual(owners, [(successor_id,)])
+        finally:
+            db.close()
+
+        # Rollups moved with the customers.
+        self.assertEqual(rollup_snapshot(self.user_id), [])
+        incremental = rollup_snapshot(successor_id)
+        db = SessionLocal()
+        try:
+            rebuild_rollups(db)
+            db.commit()
+        finally:
+            db.close()
+        self.assertEqual(rollup_snapshot(successor_id), incremental)
+
+    def test_rollups_follow_updates_and_deletes(self):
+        # Every bucket column is set so the snapshots sort without comparing None.
+        response = bulk(self.headers, create_ops(4, "Rollup Bulk", source="Referral", property_type="Land"))
+        ids = [item["id"] for item in response.json()["results"]]
+        response = bulk(self.headers, [
+            {"op": "update", "id": ids[0], "data": {"status": "closed"}},
+            {"op": "update", "id": ids[1], "data": {"source": "Website", "property_type": "House"}},
+            {"op": "delete", "id": ids[2]},
+        ])
+        self.assertEqual(response.json()["failed"], 0)
+
+        incremental = rollup_snapshot(self.user_id)
+        db = SessionLocal()
+        try:
+            rebuild_rollups(db)
+            db.commit()
+        finally:
+            db.close()
+        self.assertEqual(rollup_snapshot(self.user_id), incremental)
+
+    def test_malformed_operations_reject_the_batch(self):
+        self.assertEqual(bulk(self.headers, [{"op": "update", "data": {"status": "lost"}}]).status_code, 422)
+        self.assertEqual(bulk(self.headers, [{"op": "create", "data": {"name": "No Phone"}}]).status_code, 422)
+        self.assertEqual(bulk(self.headers, []).status_code, 422)
@@ -0,0 +1,71 @@
+"""
+Tests for the streaming customer export endpoint.
+"""
+import csv
+import gzip
+import json
+import unittest
+from io import StringIO
+
+from tests.utils import auth_headers, client
+
+
+class TestCustomerExport(unittest.TestCase):
+    """Test GET /customers/export."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.headers = auth_headers("member")
+        for i in range(3):
+            response = client.post(
+                "/api/v1/customers/",
+                headers=cls.headers,
+                json={"name": f"Export Customer {i}", "phone_number": f"090-0000-000{i}"}
+            )
+            assert response.status_code == 201, response.text
+
+    def test_export_csv(self):
+        """CSV export streams a header row plus one row per visible customer."""
+        response = client.get("/api/v1/customers/export", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/csv"))
+        self.assertIn("attachment", response.headers["content-disposition"])
+
+        rows = list(csv.reader(StringIO(response.text)))
+        self.assertEqual(rows[0][:2], ["ID", "Name"])
+        self.assertEqual(len(rows), 4)
+
+    def test_export_ndjson(self):
+        """NDJSON export emits one JSON object per line."""
+        response = client.get(
+            "/api/v1/customers/export",
+            headers=self.headers,
+            params={"format": "ndjson", "status": "new"}
+        )
+        self.assertEqual(response.status_code, 200)
+        records = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(len(records), 3)
+        self.assertEqual({r["status"] for r in records}, {"new"})
+
+    def test_export_gzip(self):
+        """Gzip export is served with Content-Encoding: gzip."""
+        response = client.get(
+            "/api/v1/customers/export",
+            headers=self.headers,
+            params={"gzip": "true"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Export Customer 0", response.text)
+
+    def test_iter_gzip_roundtrip(self):
+        """The gzip stream decompresses to the original bytes."""
+        from app.core.streaming import iter_gzip
+
+        payload = [b"a,b\n", b"1,2\n" * 10000]
+        compressed = b"".join(iter_gzip(iter(payload)))
+        self.assertEqual(gzip.decompress(compressed), b"".join(payload))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests for keyset (cursor) pagination of customers and activities.
+"""
+import unittest
+from datetime import date, timedelta
+
+from tests.utils import auth_headers, client
+
+
+class TestCustomerPagination(unittest.TestCase):
+    """Walk listings page by page with X-Next-Cursor."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.headers = auth_headers("member")
+        cls.customer_ids = []
+        for i in range(5):
+            response = client.post(
+                "/api/v1/customers/",
+                headers=cls.headers,
+                json={"name": f"Paged Customer {i}", "phone_number": f"090-4444-000{i}"}
+            )
+            assert response.status_code == 201, response.text
+            cls.customer_ids.append(response.json()["id"])
+
+    def walk(self, path: str, limit: int):
+        ids = []
+        params = {"limit": limit}
+        while True:
+            response = client.get(path, headers=self.headers, params=params)
+            self.assertEqual(response.status_code, 200, response.text)
+            page = response.json()
+            self.assertLessEqual(len(page), limit)
+            ids.extend(item["id"] for item in page)
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return ids
+            params = {"limit": limit, "cursor": cursor}
+
+    def test_customer_cursor_pages(self):
+        """Cursor pages cover every customer once, newest first."""
+        ids = self.walk("/api/v1/customers/", limit=2)
+        self.assertEqual(ids, sorted(self.customer_ids, reverse=True))
+
+    def test_skip_still_supported(self):
+        """The legacy skip parameter still offsets the listing."""
+        response = client.get("/api/v1/customers/", headers=self.headers, params={"skip": 3, "limit": 10})
+        self.assertEqual([c["id"] for c in response.json()], sorted(self.customer_ids, reverse=True)[3:])
+        self.assertNotIn("x-next-cursor", response.headers)
+
+    def test_invalid_cursor(self):
+        response = client.get("/api/v1/customers/", headers=self.headers, params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_activity_cursor_pages(self):
+        """Activities page on (date, id)."""
+        customer_id = self.customer_ids[0]
+        activity_ids = []
+        for i in range(3):
+            response = client.post(
+                f"/api/v1/customers/{customer_id}/activities",
+                headers=self.headers,
+                json={
+                    "customer_id": customer_id,
+                    "date": (date.today() - timedelta(days=i % 2)).isoformat(),
+                    "type": "call",
+                    "description": f"Call {i}",
+                }
+            )
+            self.assertEqual(response.status_code, 201, response.text)
+            activity_ids.append(response.json()["id"])
+
+        ids = self.walk(f"/api/v1/customers/{customer_id}/activities", limit=1)
+        self.assertEqual(ids, [activity_ids[2], activity_ids[0], activity_ids[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Tests for indexed customer search.
+"""
+import unittest
+
+from app.core import search
+from tests.utils import auth_headers, client
+
+
+class TestCustomerSearch(unittest.TestCase):
+    """Search through the FTS index, including after updates and deletes."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.headers = auth_headers("member")
+        cls.ids = {}
+        for name, phone in [("山田太郎", "090-5555-0001"), ("Yamada Hanako", "090-5555-0002"), ("田中一郎", "080-6666-0003")]:
+            response = client.post(
+                "/api/v1/customers/",
+                headers=cls.headers,
+                json={"name": name, "phone_number": phone}
+            )
+            assert response.status_code == 201, response.text
+            cls.ids[name] = response.json()["id"]
+
+    def search(self, term: str):
+        response = client.get("/api/v1/customers/", headers=self.headers, params={"search": term})
+        self.assertEqual(response.status_code, 200, response.text)
+        return [customer["id"] for customer in response.json()]
+
+    def test_index_enabled(self):
+        self.assertTrue(search.search_index_enabled)
+
+    def test_substring_without_spaces(self):
+        self.assertEqual(self.search("田太郎"), [self.ids["山田太郎"]])
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.search("yamada"), [self.ids["Yamada Hanako"]])
+
+    def test_phone_number(self):
+        self.assertEqual(sorted(self.search("5555")), sorted([self.ids["山田太郎"], self.ids["Yamada Hanako"]]))
+
+    def test_short_term_fallback(self):
+        self.assertEqual(self.search("田中"), [self.ids["田中一郎"]])
+
+    def test_index_follows_updates(self):
+        response = client.post(
+            "/api/v1/customers/",
+            headers=self.headers,
+            json={"name": "鈴木花子", "phone_number": "070-7777-0004"}
+        )
+        customer_id = response.json()["id"]
+        response = client.put(f"/api/v1/customers/{customer_id}", headers=self.headers, json={"name": "佐藤次郎"})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.search("佐藤次"), [customer_id])
+        self.assertEqual(self.search("鈴木花"), [])
+
+        client.delete(f"/api/v1/customers/{customer_id}", headers=self.headers)
+        self.assertEqual(self.search("佐藤次"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+Tests for the connection pool configuration and SQLite profile.
+"""
+import unittest
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine, is_sqlite
+from tests.utils import auth_headers, client
+
+
+class TestDatabasePool(unittest.TestCase):
+    """Pool sizing, pragmas and runtime statistics."""
+
+    @unittest.skipUnless(is_sqlite, "SQLite profile only")
+    def test_sqlite_pragmas(self):
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar().lower(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)  # NORMAL
+            self.assertEqual(conn.execute(text("PRAGMA busy_timeout")).scalar(), settings.SQLITE_BUSY_TIMEOUT_MS)
+
+    def test_pool_status(self):
+        self.assertEqual(client.get("/healthz/db", headers=auth_headers("member")).status_code, 403)
+        headers = auth_headers("owner")
+        with engine.connect():
+            response = client.get("/healthz/db", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        stats = response.json()["sync"]
+        self.assertEqual(stats["size"], settings.DB_POOL_SIZE)
+        self.assertGreaterEqual(stats["checked_out"], 1)
+        self.assertGreaterEqual(stats["wait"]["checkouts"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests for blocking-key duplicate detection across customers and registry rows.
+"""
+import unittest
+
+from sqlalchemy import insert
+
+from app.core.duplicates import blocking_keys
+from app.db.session import SessionLocal
+from app.models.registry_data import RegistryData
+from tests.utils import auth_headers, client, current_user_id
+
+
+def insert_registry_row(user_id: int, **row):
+    db = SessionLocal()
+    try:
+        row_id = db.scalar(
+            insert(RegistryData).returning(RegistryData.id),
+            {"status": "pending", "created_by": user_id, **row},
+        )
+        db.commit()
+        return row_id
+    finally:
+        db.close()
+
+
+class TestBlockingKeys(unittest.TestCase):
+
+    def test_normalization(self):
+        self.assertEqual(
+            blocking_keys("山田　太郎", "０９０（１２３４）５６７８", "〒150-0001", "Taro.Yamada@Example.com"),
+            {("phone", "09012345678"), ("name", "1500001:山田太郎"), ("email", "taro.yamada")},
+        )
+        self.assertEqual(blocking_keys("山田太郎", "1234", "150", None), set())
+
+
+class TestDuplicateDetection(unittest.TestCase):
+
+    def setUp(self):
+        self.headers = auth_headers("member")
+        self.user_id = current_user_id(self.headers)
+
+    def create_customer(self, **body):
+        response = client.post("/api/v1/customers/", headers=self.headers, json=body)
+        self.assertEqual(response.status_code, 201, response.text)
+        return response.json()["id"]
+
+    def clusters(self, headers=None, **params):
+        response = client.get("/api/v1/customers/duplicates", headers=headers or self.headers, params=params)
+        self.assertEqual(response.status_code, 200, response.text)
+        return [
+            sorted((record["type"], record["id"]) for record in cluster["records"])
+            for cluster in response.json()
+        ]
+
+    def test_clusters_follow_shared_keys(self):
+        first = self.create_customer(name="Sato Ichiro", phone_number="075-811-0001")
+        second = self.create_customer(name="佐藤 次郎", phone_number="0758110002", postal_code="6040001")
+        unrelated = self.create_customer(name="Unrelated", phone_number="075-811-0009")
+
+        # Linked to the first customer by phone and to the second by postal code and name.
+        registry_id = insert_registry_row(
+            self.user_id, customer_name="佐藤次郎", phone_number="０７５-８１１-０００１", postal_code="604-0001",
+        )
+        response = client.post("/api/v1/customers/duplicates/scan", headers=auth_headers("owner"))
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertGreater(response.json()["keys"], 0)
+
+        expected = sorted([("customer", first), ("customer", second), ("registry_data", registry_id)])
+        self.assertEqual(self.clusters(), [expected])
+        self.assertEqual(self.clusters(kind="phone"), [sorted([("customer", first), ("registry_data", registry_id)])])
+        self.assertNotIn(("customer", unrelated), sum(self.clusters(), []))
+
+        # Other members do not see these records.
+        self.assertEqual(self.clusters(auth_headers("member")), [])
+
+    def test_index_follows_writes(self):
+        first = self.create_customer(name="Kato", phone_number="075-822-0001")
+        second = self.create_customer(name="Kato Again", phone_number="(075) 822-0001")
+        self.assertEqual(self.clusters(), [[("customer", first), ("customer", second)]])
+
+        response = client.put(
+            f"/api/v1/customers/{second}", headers=self.headers, json={"phone_number": "075-822-0002"}
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.clusters(), [])
+
+        third = self.create_customer(name="Kato Third", phone_number="075-822-0002")
+        self.assertEqual(self.clusters(), [[("customer", second), ("customer", third)]])
+        client.delete(f"/api/v1/customers/{third}", headers=self.headers)
+        self.assertEqual(self.clusters(), [])
+
+    def test_promoted_rows_leave_the_index(self):
+        customer_id = self.create_customer(name="Ito", phone_number="075-833-0001")
+        registry_id = insert_registry_row(self.user_id, customer_name="Ito", phone_number="075-833-0002")
+        client.post("/api/v1/customers/duplicates/scan", headers=auth_headers("owner"))
+        self.assertEqual(self.clusters(), [])
+
+        response = client.put(
+            f"/api/v1/customers/{customer_id}", headers=self.headers, json={"phone_number": "075-833-0002"}
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.clusters(), [[("customer", customer_id), ("registry_data", registry_id)]])
+
+        response = client.post("/api/v1/registry-data/promote", headers=self.headers, json={"ids": [registry_id]})
+        self.assertEqual(response.json()["duplicates"], 1)
+        self.assertEqual(self.clusters(), [])
+
+    def test_pages_follow_cluster_keys(self):
+        pairs = [
+            [{"name": "Page A", "phone_number": "075-844-0001"}, {"name": "Page A2", "phone_number": "0758440001"}],
+            [{"name": "Page B", "phone_number": "075-844-0002", "postal_code": "6040044"},
+             {"name": "Page B", "phone_number": "075-844-0009", "postal_code": "6040044"}],
+            # Joined by a name key and a phone key that sort far apart.
+            [{"name": "Page C", "phone_number": "075-844-0003", "postal_code": "6040045"},
+             {"name": "Page C", "phone_number": "075-844-0008", "postal_code": "6040045"},
+             {"name": "Page C3", "phone_number": "075-844-0003"}],
+        ]
+        for records in pairs:
+            for record in records:
+                self.create_customer(**record)
+        everything = self.clusters()
+        self.assertEqual(sorted(len(cluster) for cluster in everything), [2, 2, 3])
+
+        pages, cursor = [], None
+        while True:
+            params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/api/v1/customers/duplicates", headers=self.headers, params=params)
+            self.assertEqual(response.status_code, 200, response.text)
+            pages.append([sorted((record["type"], record["id"]) for record in cluster["records"])
+                          for cluster in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        self.assertEqual(pages, [[cluster] for cluster in everything])
+
+        response = client.get("/api/v1/customers/duplicates", headers=self.headers, params={"cursor": "%%%"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_scan_is_owner_only(self):
+        response = client.post("/api/v1/customers/duplicates/scan", headers=self.headers)
+        self.assertEqual(response.status_code, 403)
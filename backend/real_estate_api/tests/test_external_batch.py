@@ -0,0 +1,100 @@
+"""
+Tests for the batch lookup endpoints.
+"""
+import asyncio
+import json
+import unittest
+
+from app.core.external_services import (
+    ExternalServiceError,
+    normalize_phone_number,
+    normalize_postal_code,
+    resolve_batch,
+)
+from tests.utils import auth_headers, client
+
+
+def parse_ndjson(text: str):
+    return [json.loads(line) for line in text.splitlines() if line]
+
+
+class TestNormalisation(unittest.TestCase):
+
+    def test_postal_code(self):
+        self.assertEqual(normalize_postal_code("〒１５０－０００２"), "150-0002")
+        self.assertEqual(normalize_postal_code(" 1500002 "), "150-0002")
+        self.assertEqual(normalize_postal_code("150ー0002"), "150-0002")
+
+    def test_phone_number(self):
+        self.assertEqual(normalize_phone_number("０９０ー１２３４ー５６７８"), "090-1234-5678")
+        self.assertEqual(normalize_phone_number("(03) 1234 5678"), "0312345678")
+
+
+class TestResolveBatch(unittest.TestCase):
+    """Deduplication, bounded concurrency and per-item errors."""
+
+    def test_dedupes_and_bounds_concurrency(self):
+        calls, running, peak = [], [0], [0]
+
+        async def lookup(value):
+            calls.append(value)
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.01)
+            running[0] -= 1
+            if value == "boom":
+                raise ExternalServiceError("upstream down")
+            return {"value": value}
+
+        async def collect():
+            values = ["a", "A", "b", "c", "d", "boom", "a"]
+            return [item async for item in resolve_batch(values, str.lower, lookup, 2)]
+
+        items = asyncio.run(collect())
+        self.assertEqual(sorted(calls), ["a", "b", "boom", "c", "d"])
+        self.assertLessEqual(peak[0], 2)
+        by_value = {item["value"]: item for item in items}
+        self.assertEqual(by_value["a"]["inputs"], ["a", "A", "a"])
+        self.assertEqual(by_value["boom"]["error"], "upstream down")
+        self.assertEqual(by_value["b"]["result"], {"value": "b"})
+
+
+class TestBatchEndpoints(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.headers = auth_headers("member")
+
+    def test_postal_code_batch(self):
+        response = client.post(
+            "/api/v1/external/postal-code/batch",
+            json={"postal_codes": ["150-0002", "１５００００２", "bad"]},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        items = {item["value"]: item for item in parse_ndjson(response.text)}
+        self.assertEqual(set(items), {"150-0002", "bad"})
+        self.assertEqual(items["150-0002"]["inputs"], ["150-0002", "１５００００２"])
+        self.assertIn("prefecture", items["150-0002"]["result"])
+        self.assertEqual(items["bad"]["error"], "Invalid postal code format")
+
+    def test_phone_number_batch(self):
+        response = client.post(
+            "/api/v1/external/phone-number/batch",
+            json={"phone_numbers": ["090-1234-5678", "０９０-１２３４-５６７８"]},
+            headers=self.headers,
+        )
+        items = parse_ndjson(response.text)
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0]["result"]["type"], "Mobile")
+
+    def test_empty_batch_rejected(self):
+        response = client.post(
+            "/api/v1/external/postal-code/batch", json={"postal_codes": []}, headers=self.headers
+        )
+        self.assertEqual(response.status_code, 422)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Tests for the async external lookup clients.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+import httpx
+
+from app.core.external_services import (
+    AsyncRateLimiter,
+    ExternalServiceError,
+    PhoneNumberService,
+    PostalCodeService,
+    RegistryLibraryService,
+)
+from benchmarks.external_stub import PDF_BYTES, app as stub_app
+from tests.utils import auth_headers, client
+
+
+def stub_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app))
+
+
+class TestAsyncRateLimiter(unittest.TestCase):
+    """Callers are spaced out and served in arrival order."""
+
+    def test_fifo_spacing(self):
+        limiter = AsyncRateLimiter(min_interval=0.05)
+        finished = []
+
+        async def call(index):
+            await limiter.acquire()
+            finished.append((index, time.monotonic()))
+
+        async def burst():
+            await asyncio.gather(*(call(i) for i in range(4)))
+
+        started = time.monotonic()
+        asyncio.run(burst())
+        self.assertEqual([index for index, _ in finished], [0, 1, 2, 3])
+        self.assertGreaterEqual(finished[-1][1] - started, 0.15)
+
+
+class TestRemoteServices(unittest.TestCase):
+    """The clients talk to the stand-in server over HTTP."""
+
+    def run_with_client(self, make_coro):
+        async def runner():
+            async with stub_client() as http:
+                return await make_coro(http)
+        return asyncio.run(runner())
+
+    def test_postal_code_lookup(self):
+        async def lookups(http):
+            service = PostalCodeService(base_url="http://stub", client=http, limiter=AsyncRateLimiter(0))
+            return (
+                await service.lookup("150-0001"),
+                await service.lookup("000-0000"),
+                await service.lookup("bad"),
+            )
+
+        requests_before = stub_app.state.requests
+        found, missing, invalid = self.run_with_client(lookups)
+        self.assertEqual(found["prefecture"], "Tokyo")
+        self.assertTrue(found["success"])
+        self.assertEqual(missing, {"error": "Postal code not found"})
+        self.assertEqual(invalid, {"error": "Invalid postal code format"})
+        self.assertEqual(stub_app.state.requests - requests_before, 2)
+
+    def test_phone_number_lookup(self):
+        async def lookup(http):
+            service = PhoneNumberService(base_url="http://stub", client=http, limiter=AsyncRateLimiter(0))
+            return await service.lookup("090-1234-5678")
+
+        self.assertEqual(self.run_with_client(lookup)["type"], "Mobile")
+
+    def test_registry_session(self):
+        save_path = os.path.join(tempfile.mkdtemp(), "registry.pdf")
+
+        async def session(http):
+            service = RegistryLibraryService(base_url="http://stub", client=http, limiter=AsyncRateLimiter(0))
+            with self.assertRaises(ExternalServiceError):
+                await service.get_registry_details("REG1")
+            await service.login()
+            details = await service.get_registry_details("REG1")
+            download = await service.download_registry_pdf("REG1", save_path)
+            return details, download
+
+        details, download = self.run_with_client(session)
+        self.assertEqual(details["registry_id"], "REG1")
+        self.assertTrue(download["success"])
+        with open(save_path, "rb") as file:
+            self.assertEqual(file.read(), PDF_BYTES)
+
+    def test_unreachable_service(self):
+        async def lookup(http):
+            service = PostalCodeService(base_url="http://127.0.0.1:9", limiter=AsyncRateLimiter(0))
+            return await service.lookup("150-0001")
+
+        with self.assertRaises(ExternalServiceError):
+            self.run_with_client(lookup)
+
+
+class TestExternalEndpoints(unittest.TestCase):
+    """Without a configured base URL the endpoints answer from sample data."""
+
+    def test_postal_code_endpoint(self):
+        headers = auth_headers("member")
+        response = client.get("/api/v1/external/postal-code/150-0001", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["prefecture"], "Tokyo")
+        response = client.get("/api/v1/external/postal-code/bad", headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Tests for the background job queue and the registry job endpoints.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+from app.core.external_services import ExternalServiceError
+from app.core.jobs import FAILED, QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore, job_queue
+from tests.utils import auth_headers, client
+
+
+def temp_store() -> JobStore:
+    return JobStore(os.path.join(tempfile.mkdtemp(), "jobs.db"))
+
+
+class TestJobStore(unittest.TestCase):
+
+    def test_claim_and_finish(self):
+        store = temp_store()
+        job = store.submit("echo", {"value": 1}, owner_id=7)
+        self.assertEqual(job["status"], QUEUED)
+
+        claimed = store.claim(lease=60)
+        self.assertEqual((claimed["id"], claimed["status"], claimed["attempts"]), (job["id"], RUNNING, 1))
+        self.assertIsNone(store.claim(lease=60))
+
+        store.finish(job["id"], claimed["lease"], {"value": 1})
+        finished = store.get(job["id"])
+        self.assertEqual((finished["status"], finished["result"]), (SUCCEEDED, {"value": 1}))
+
+    def test_jobs_survive_restart_and_expired_leases_are_reclaimed(self):
+        store = temp_store()
+        job = store.submit("echo", {})
+        store.claim(lease=0)
+
+        # A new store on the same file stands in for a restarted process.
+        restarted = JobStore(store.path)
+        reclaimed = restarted.claim(lease=60)
+        self.assertEqual((reclaimed["id"], reclaimed["attempts"]), (job["id"], 2))
+
+    def test_lost_lease_cannot_finish_or_retry(self):
+        store = temp_store()
+        job = store.submit("echo", {})
+        stale = store.claim(lease=0)
+        current = store.claim(lease=60)
+        self.assertEqual(current["id"], job["id"])
+
+        self.assertFalse(store.finish(job["id"], stale["lease"], {"value": "stale"}))
+        self.assertFalse(store.retry(job["id"], stale["lease"], "upstream down", 0))
+        self.assertEqual((store.get(job["id"])["status"], store.get(job["id"])["error"]), (RUNNING, None))
+
+        self.assertTrue(store.finish(job["id"], current["lease"], {"value": "current"}))
+        self.assertEqual(store.get(job["id"])["result"], {"value": "current"})
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def test_upstream_errors_are_retried_then_fail(self):
+        queue = JobQueue(temp_store(), max_attempts=2, retry_delay=0)
+        calls = []
+
+        @queue.handler("flaky")
+        async def flaky(params):
+            calls.append(params)
+            raise ExternalServiceError("upstream down")
+
+        async def scenario():
+            job = await queue.submit("flaky", {"n": 1})
+            await queue.drain()
+            return queue.store.get(job["id"])
+
+        job = asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual((job["status"], job["error"], job["attempts"]), (FAILED, "upstream down", 2))
+
+    def test_workers_pick_up_submitted_jobs(self):
+        queue = JobQueue(temp_store(), workers=2, poll_interval=5)
+
+        @queue.handler("echo")
+        async def echo(params):
+            return params
+
+        async def scenario():
+            queue.start()
+            try:
+                job = await queue.submit("echo", {"value": "x"})
+                for _ in range(100):
+                    current = queue.store.get(job["id"])
+                    if current["status"] == SUCCEEDED:
+                        return current
+                    await asyncio.sleep(0.01)
+            finally:
+                await queue.stop()
+
+        # Submitting wakes the workers well before the poll interval.
+        self.assertEqual(asyncio.run(scenario())["result"], {"value": "x"})
+
+    def test_unknown_kind_is_rejected(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(JobQueue(temp_store()).submit("missing", {}))
+
+
+class TestJobEndpoints(unittest.TestCase):
+
+    def test_search_job_lifecycle(self):
+        headers = auth_headers("member")
+        response = client.post("/api/v1/jobs/registry-search", json={"name": "Taro"}, headers=headers)
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual((job["kind"], job["status"]), ("registry_search", QUEUED))
+
+        asyncio.run(job_queue.drain())
+
+        job = client.get(f"/api/v1/jobs/{job['id']}", headers=headers).json()
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["result"]["results"][0]["owner"], "Taro")
+
+        response = client.get(f"/api/v1/jobs/{job['id']}/events", headers=headers)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        event, data = response.text.strip().split("\n")
+        self.assertEqual(event, "event: job")
+        self.assertEqual(json.loads(data[len("data: "):])["status"], SUCCEEDED)
+
+    def test_details_job(self):
+        headers = auth_headers("member")
+        job = client.post(
+            "/api/v1/jobs/registry-details", json={"registry_id": "REG123"}, headers=headers
+        ).json()
+        asyncio.run(job_queue.drain())
+        job = client.get(f"/api/v1/jobs/{job['id']}", headers=headers).json()
+        self.assertEqual(job["result"]["registry_id"], "REG123")
+
+    def test_search_requires_criteria(self):
+        response = client.post("/api/v1/jobs/registry-search", json={}, headers=auth_headers("member"))
+        self.assertEqual(response.status_code, 422)
+
+    def test_jobs_are_private_to_members(self):
+        job = client.post(
+            "/api/v1/jobs/registry-search", json={"name": "Hanako"}, headers=auth_headers("member")
+        ).json()
+        other = client.get(f"/api/v1/jobs/{job['id']}", headers=auth_headers("member"))
+        self.assertEqual(other.status_code, 404)
+        owner = client.get(f"/api/v1/jobs/{job['id']}", headers=auth_headers("owner"))
+        self.assertEqual(owner.status_code, 200)
+        asyncio.run(job_queue.drain())
+
+    def test_stats_are_owner_only(self):
+        self.assertEqual(client.get("/api/v1/jobs/stats", headers=auth_headers("member")).status_code, 403)
+        stats = client.get("/api/v1/jobs/stats", headers=auth_headers("owner")).json()
+        self.assertIn(SUCCEEDED, stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Tests for login lookups, the hashing executor and hash upgrades.
+"""
+import asyncio
+import unittest
+import uuid
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.core.hashing import HashingService
+from app.db.session import SessionLocal
+from app.models.user import User
+from tests.utils import auth_headers, client, count_statements
+
+
+def create_user(password_hash: str) -> User:
+    suffix = uuid.uuid4().hex[:12]
+    db = SessionLocal()
+    try:
+        user = User(
+            username=f"login{suffix}",
+            email=f"login{suffix}@example.com",
+            password=password_hash,
+            role="member",
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+        return user
+    finally:
+        db.close()
+
+
+def stored_hash(user_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.query(User.password).filter(User.id == user_id).scalar()
+    finally:
+        db.close()
+
+
+class TestLogin(unittest.TestCase):
+    """Login by email or username with one query, upgrading outdated hashes."""
+
+    def test_login_by_username_single_query(self):
+        user = create_user(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret"))
+        with count_statements() as statements:
+            response = client.post(
+                "/api/v1/auth/login", data={"username": user.username, "password": "secret"}
+            )
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(len([s for s in statements if "FROM users" in s]), 1)
+
+    def test_wrong_password(self):
+        user = create_user(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret"))
+        response = client.post(
+            "/api/v1/auth/login/json", json={"email": user.email, "password": "wrong"}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_rehash_on_cost_change(self):
+        old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=5).hash("secret")
+        user = create_user(old_hash)
+        response = client.post(
+            "/api/v1/auth/login/json", json={"email": user.email, "password": "secret"}
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        new_hash = stored_hash(user.id)
+        self.assertNotEqual(new_hash, old_hash)
+        self.assertTrue(new_hash.startswith("$2b$04$"))
+
+        response = client.post(
+            "/api/v1/auth/login/json", json={"email": user.email, "password": "secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stored_hash(user.id), new_hash)
+
+    def test_hashing_stats(self):
+        self.assertEqual(client.get("/healthz/hashing").status_code, 401)
+        response = client.get("/healthz/hashing", headers=auth_headers("owner"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("queue_depth", response.json())
+
+
+class TestHashingService(unittest.TestCase):
+    """Concurrency cap and queue accounting."""
+
+    def test_rejects_beyond_queue(self):
+        service = HashingService(workers=1, max_queue=1, use_processes=False)
+
+        async def burst():
+            return await asyncio.gather(
+                *(service.hash_password("secret") for _ in range(4)), return_exceptions=True
+            )
+
+        try:
+            results = asyncio.run(burst())
+        finally:
+            service.shutdown()
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        self.assertEqual(len(rejected), 2)
+        self.assertEqual(rejected[0].status_code, 503)
+        stats = service.stats()
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["rejected"], 2)
+        self.assertEqual(stats["queue_depth"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Tests for the two-tier lookup result cache.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+import httpx
+
+from app.core.cache import InMemoryCache, ResultCache, SQLiteCache, TieredCache
+from app.core.external_services import (
+    AsyncRateLimiter,
+    ExternalServiceError,
+    PhoneNumberService,
+    PostalCodeService,
+    lookup_cache,
+)
+from app.core.postal_index import PostalCodeIndex
+from app.db.session import SessionLocal
+from app.models.customer import Customer
+from app.routers import external
+from benchmarks.external_stub import app as stub_app
+from tests.utils import client  # noqa: F401  (creates the schema)
+
+NO_INDEX = PostalCodeIndex(os.path.join(tempfile.mkdtemp(), "missing.idx"))
+
+
+def temp_cache_path() -> str:
+    return os.path.join(tempfile.mkdtemp(), "lookup_cache.db")
+
+
+class TestTieredCache(unittest.TestCase):
+
+    def test_persistent_hits_are_promoted(self):
+        path = temp_cache_path()
+        TieredCache(InMemoryCache(), SQLiteCache(path)).set("k", {"a": 1}, ttl=60)
+
+        cache = TieredCache(InMemoryCache(), SQLiteCache(path))
+        self.assertEqual(cache.get("k"), {"a": 1})
+        self.assertEqual(cache.get("k"), {"a": 1})
+        self.assertEqual(cache.stats()["persistent_hits"], 1)
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+
+    def test_persistent_tier_runs_off_the_event_loop(self):
+        persistent = SQLiteCache(temp_cache_path())
+        threads = []
+        get_entry = persistent.get_entry
+
+        def recording_get_entry(key):
+            threads.append(threading.get_ident())
+            return get_entry(key)
+
+        persistent.get_entry = recording_get_entry
+        results = ResultCache(TieredCache(InMemoryCache(), persistent), "test", ttl=60)
+
+        async def compute():
+            return {"a": 1}
+
+        async def twice():
+            return [await results.get_or_compute("k", compute) for _ in range(2)]
+
+        self.assertEqual(asyncio.run(twice()), [{"a": 1}, {"a": 1}])
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertEqual(persistent.get("test:k"), {"a": 1})
+
+    def test_expiry(self):
+        cache = SQLiteCache(temp_cache_path())
+        cache.set("k", {"a": 1}, ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("k"))
+
+    def test_negative_ttl(self):
+        backend = InMemoryCache()
+        results = ResultCache(
+            backend, "test", ttl=60, negative_ttl=0.01, is_negative=lambda value: "error" in value
+        )
+
+        async def failure():
+            return {"error": "not found"}
+
+        asyncio.run(results.get_or_compute("k", failure))
+        self.assertIsNotNone(backend.get("test:k"))
+        time.sleep(0.02)
+        self.assertIsNone(backend.get("test:k"))
+
+
+class TestCachedServices(unittest.TestCase):
+    """Services answer repeated lookups from the cache."""
+
+    def test_repeated_lookups_hit_cache(self):
+        cache = lookup_cache(f"postal-{uuid.uuid4().hex}", ttl=60)
+
+        async def lookups():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app)) as http:
+                service = PostalCodeService(
+                    base_url="http://stub", client=http, limiter=AsyncRateLimiter(0),
+                    index=NO_INDEX, cache=cache,
+                )
+                return [await service.lookup(code) for code in ("150-0001", "１５００００１", "000-0000", "000-0000")]
+
+        requests_before = stub_app.state.requests
+        results = asyncio.run(lookups())
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[3], {"error": "Postal code not found"})
+        self.assertEqual(stub_app.state.requests - requests_before, 2)
+        self.assertEqual(cache.stats()["hit_ratio"], 0.5)
+
+    def test_upstream_failures_are_cached(self):
+        calls = []
+
+        def unavailable(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        cache = lookup_cache(f"phone-{uuid.uuid4().hex}", ttl=60)
+
+        async def lookups():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(unavailable)) as http:
+                service = PhoneNumberService(
+                    base_url="http://upstream", client=http, limiter=AsyncRateLimiter(0), cache=cache
+                )
+                failures = 0
+                for _ in range(3):
+                    try:
+                        await service.lookup("090-1234-5678")
+                    except ExternalServiceError:
+                        failures += 1
+                return failures
+
+        self.assertEqual(asyncio.run(lookups()), 3)
+        self.assertEqual(len(calls), 1)
+
+
+class TestWarmUp(unittest.TestCase):
+    """Warming resolves frequent customer values that are not cached yet."""
+
+    def test_warm_from_customers(self):
+        phone = f"080-{uuid.uuid4().int % 10000:04d}-{uuid.uuid4().int % 10000:04d}"
+        db = SessionLocal()
+        try:
+            for _ in range(2):
+                db.add(Customer(name="Warm", phone_number=phone, status="new"))
+            db.commit()
+        finally:
+            db.close()
+
+        cache = lookup_cache(f"phone-{uuid.uuid4().hex}", ttl=60)
+
+        async def warm():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app)) as http:
+                service = PhoneNumberService(
+                    base_url="http://stub", client=http, limiter=AsyncRateLimiter(0), cache=cache
+                )
+                with mock.patch.object(external, "phone_number_service", service):
+                    first = await external.warm_lookup_caches(limit=10000)
+                    second = await external.warm_lookup_caches(limit=10000)
+                return first, second
+
+        first, second = asyncio.run(warm())
+        self.assertGreaterEqual(first["phone_number"], 1)
+        self.assertEqual(second["phone_number"], 0)
+        self.assertEqual(cache.cached_keys([phone]), {phone})
+
+
+if __name__ == "__main__":
+    unittest.main()
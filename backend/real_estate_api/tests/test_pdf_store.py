@@ -0,0 +1,157 @@
+"""
+Tests for the content-addressed registry PDF store.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+
+import httpx
+
+from app.core.external_services import (
+    AsyncRateLimiter,
+    ExternalServiceError,
+    RegistryLibraryService,
+    offline_registry_pdf,
+)
+from app.core.pdf_store import RegistryPdfStore, registry_pdf_store
+from app.db.session import SessionLocal
+from app.models.registry_data import RegistryData
+from app.models.registry_pdf import RegistryPdf
+from benchmarks.external_stub import PDF_BYTES, app as stub_app
+from tests.utils import auth_headers, client
+
+
+def with_stub_service(scenario):
+    async def runner():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app)) as http:
+            service = RegistryLibraryService(base_url="http://stub", client=http, limiter=AsyncRateLimiter(0))
+            await service.login()
+            download = lambda registry_id, path: service.download_registry_pdf(registry_id, path, resume=True)
+            return await scenario(download)
+    return asyncio.run(runner())
+
+
+class TestRegistryPdfStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = RegistryPdfStore(tempfile.mkdtemp())
+
+    def read(self, sha256: str) -> bytes:
+        with open(self.store.path_for(sha256), "rb") as file:
+            return file.read()
+
+    def test_identical_documents_are_stored_once(self):
+        async def scenario(download):
+            return [await self.store.fetch(registry_id, download) for registry_id in ("REG1", "REG2")]
+
+        first, second = with_stub_service(scenario)
+        self.assertEqual(first["sha256"], hashlib.sha256(PDF_BYTES).hexdigest())
+        self.assertEqual(first["path"], second["path"])
+        self.assertEqual(self.read(first["sha256"]), PDF_BYTES)
+        self.assertEqual(self.store.stats(), {"downloads": 2, "duplicates": 1})
+        self.assertEqual(os.listdir(os.path.join(self.store.root, "partial")), [])
+
+    def test_partial_download_is_resumed(self):
+        partial_path = self.store._partial_path("REG1")
+        os.makedirs(os.path.dirname(partial_path))
+        # A prefix the server never sent shows the download continued after it.
+        with open(partial_path, "wb") as file:
+            file.write(b"X" * 10)
+
+        stored = with_stub_service(lambda download: self.store.fetch("REG1", download))
+        self.assertEqual(self.read(stored["sha256"]), b"X" * 10 + PDF_BYTES[10:])
+
+    def test_concurrent_requests_share_one_download(self):
+        calls = []
+
+        async def scenario(download):
+            async def counted(registry_id, path):
+                calls.append(registry_id)
+                await asyncio.sleep(0.01)
+                return await download(registry_id, path)
+            return await asyncio.gather(*(self.store.fetch("REG1", counted) for _ in range(5)))
+
+        results = with_stub_service(scenario)
+        self.assertEqual(calls, ["REG1"])
+        self.assertEqual(len({result["sha256"] for result in results}), 1)
+
+
+    def test_workers_do_not_share_a_partial_file(self):
+        document = bytes(range(256)) * 40
+
+        async def slow_resuming_download(registry_id, path):
+            # Continues whatever is on disk, one small chunk at a time.
+            offset = os.path.getsize(path) if os.path.exists(path) else 0
+            for start in range(offset, len(document), 1024):
+                with open(path, "ab") as file:
+                    file.write(document[start:start + 1024])
+                await asyncio.sleep(0.005)
+            return {"size": len(document)}
+
+        # Each thread is a worker with its own store and event loop on the same directory.
+        results, errors = [], []
+
+        def worker():
+            try:
+                store = RegistryPdfStore(self.store.root)
+                results.append(asyncio.run(store.fetch("REG1", slow_resuming_download)))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual({result["sha256"] for result in results}, {hashlib.sha256(document).hexdigest()})
+        self.assertEqual(os.listdir(os.path.join(self.store.root, "partial")), [])
+
+    def test_short_downloads_are_not_stored(self):
+        store = RegistryPdfStore(self.store.root, attempts=2)
+        sizes = []
+
+        async def short_download(registry_id, path):
+            sizes.append(os.path.getsize(path) if os.path.exists(path) else 0)
+            with open(path, "ab") as file:
+                file.write(b"%PDF-1.4 cut off")
+            return {"size": 1000}
+
+        with self.assertRaises(ExternalServiceError):
+            asyncio.run(store.fetch("REG1", short_download))
+        # The second attempt started over instead of appending to the short file.
+        self.assertEqual(sizes, [0, 0])
+        self.assertEqual(store.stats()["downloads"], 0)
+        self.assertEqual(os.listdir(os.path.join(store.root, "partial")), [])
+
+
+class TestRegistryPdfEndpoint(unittest.TestCase):
+
+    def test_repeat_requests_are_served_locally(self):
+        headers = auth_headers("member")
+        response = client.get("/api/v1/external/registry-library/pdf/REG-PDF-1", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/pdf")
+        self.assertEqual(response.content, offline_registry_pdf("REG-PDF-1"))
+
+        sha256 = hashlib.sha256(response.content).hexdigest()
+        db = SessionLocal()
+        try:
+            row = db.query(RegistryPdf).filter(RegistryPdf.registry_id == "REG-PDF-1").one()
+            self.assertEqual(row.pdf_sha256, sha256)
+            # Downloads do not create registry rows of their own.
+            self.assertEqual(db.query(RegistryData).filter(RegistryData.registry_id == "REG-PDF-1").count(), 0)
+        finally:
+            db.close()
+
+        downloads = registry_pdf_store.downloads
+        again = client.get("/api/v1/external/registry-library/pdf/REG-PDF-1", headers=headers)
+        self.assertEqual(again.content, response.content)
+        self.assertEqual(registry_pdf_store.downloads, downloads)
+
+
+if __name__ == "__main__":
+    unittest.main()
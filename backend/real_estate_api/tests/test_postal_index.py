@@ -0,0 +1,107 @@
+"""
+Tests for the offline postal code index.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import httpx
+
+from app.core.external_services import AsyncRateLimiter, PostalCodeService
+from app.core.postal_index import PostalCodeIndex, build_index
+from benchmarks.external_stub import app as stub_app
+
+KEN_ALL_ROWS = [
+    ["01101", "060  ", "0600000", "ﾎｯｶｲﾄﾞｳ", "ｻｯﾎﾟﾛｼﾁｭｳｵｳｸ", "ｲｶﾆｹｲｻｲｶﾞﾅｲﾊﾞｱｲ",
+     "北海道", "札幌市中央区", "以下に掲載がない場合"],
+    ["13113", "150  ", "1500002", "ﾄｳｷｮｳﾄ", "ｼﾌﾞﾔｸ", "ｼﾌﾞﾔ", "東京都", "渋谷区", "渋谷"],
+    ["01224", "066  ", "0660005", "ﾎｯｶｲﾄﾞｳ", "ﾁﾄｾｼ", "ｷｮｳﾜ", "北海道", "千歳市",
+     "協和（８８－２、２７１－１０、"],
+    ["01224", "066  ", "0660005", "ﾎｯｶｲﾄﾞｳ", "ﾁﾄｾｼ", "ｷｮｳﾜ", "北海道", "千歳市",
+     "３４３－２）"],
+    ["13101", "100  ", "1000001", "ﾄｳｷｮｳﾄ", "ﾁﾖﾀﾞｸ", "ﾁﾖﾀﾞ", "東京都", "千代田区", "千代田"],
+    ["27127", "530  ", "5300001", "ｵｵｻｶﾌ", "ｵｵｻｶｼｷﾀｸ", "ｳﾒﾀﾞ", "大阪府", "大阪市北区", "梅田"],
+    ["27127", "530  ", "5300001", "ｵｵｻｶﾌ", "ｵｵｻｶｼｷﾀｸ", "ｶｸﾀﾞﾁｮｳ", "大阪府", "大阪市北区", "角田町"],
+]
+
+
+def write_ken_all(directory: str) -> str:
+    path = os.path.join(directory, "KEN_ALL.CSV")
+    with open(path, "w", encoding="cp932", newline="") as file:
+        for row in KEN_ALL_ROWS:
+            file.write(",".join(f'"{value}"' for value in row + ["0"] * 6) + "\r\n")
+    return path
+
+
+class TestPostalCodeIndex(unittest.TestCase):
+    """Building and querying the memory-mapped index."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.directory, "postal_codes.idx")
+        self.count = build_index(write_ken_all(self.directory), self.index_path)
+        self.index = PostalCodeIndex(self.index_path)
+
+    def test_lookup(self):
+        self.assertEqual(self.count, 5)
+        self.assertEqual(self.index.get("150-0002"), {
+            "postal_code": "150-0002", "prefecture": "東京都", "city": "渋谷区", "street": "渋谷",
+        })
+        self.assertEqual(self.index.get("1000001")["city"], "千代田区")
+        self.assertIsNone(self.index.get("999-9999"))
+        self.assertIsNone(self.index.get("abc-defg"))
+
+    def test_ken_all_quirks(self):
+        self.assertEqual(self.index.get("060-0000")["street"], "")
+        self.assertEqual(self.index.get("066-0005")["street"], "協和（８８－２、２７１－１０、３４３－２）")
+        self.assertEqual(self.index.get("530-0001")["towns"], ["梅田", "角田町"])
+
+    def test_reload_after_rebuild(self):
+        self.assertIsNotNone(self.index.get("150-0002"))
+        with open(os.path.join(self.directory, "small.csv"), "w", encoding="utf-8") as file:
+            file.write(",".join(KEN_ALL_ROWS[4] + ["0"] * 6) + "\n")
+        build_index(file.name, self.index_path, encoding="utf-8")
+        self.index.reload()
+        self.assertIsNone(self.index.get("150-0002"))
+        self.assertEqual(self.index.count, 1)
+
+    def test_missing_index(self):
+        index = PostalCodeIndex(os.path.join(self.directory, "missing.idx"))
+        self.assertFalse(index.available)
+        self.assertIsNone(index.get("150-0002"))
+
+    def test_rebuild_command(self):
+        output = os.path.join(self.directory, "cli.idx")
+        result = subprocess.run(
+            [sys.executable, "-m", "app.core.postal_index", "rebuild",
+             os.path.join(self.directory, "KEN_ALL.CSV"), "--output", output],
+            capture_output=True, text=True, check=True,
+        )
+        self.assertIn("Indexed 5 postal codes", result.stdout)
+        self.assertEqual(PostalCodeIndex(output).get("530-0001")["city"], "大阪市北区")
+
+    def test_service_falls_back_to_remote_on_miss(self):
+        async def lookups():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app)) as http:
+                service = PostalCodeService(
+                    base_url="http://stub", client=http, limiter=AsyncRateLimiter(0), index=self.index
+                )
+                return await service.lookup("150-0002"), await service.lookup("460-0008")
+
+        requests_before = stub_app.state.requests
+        local, remote = asyncio.run(lookups())
+        self.assertEqual(local["city"], "渋谷区")
+        self.assertEqual(remote["prefecture"], "Aichi")
+        self.assertEqual(stub_app.state.requests - requests_before, 1)
+
+    def test_service_without_remote_reports_miss(self):
+        service = PostalCodeService(base_url="", index=self.index)
+        result = asyncio.run(service.lookup("460-0008"))
+        self.assertEqual(result, {"error": "Postal code not found"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Tests for the cached principal lookup in get_current_user.
+"""
+import unittest
+
+from app.core.cache import principal_cache
+from tests.utils import auth_headers, client, count_statements, current_user_id
+
+
+def user_lookups(statements):
+    return [s for s in statements if "FROM users" in s and "WHERE users.id" in s]
+
+
+class TestPrincipalCache(unittest.TestCase):
+    """Authenticated requests resolve the user from the cache."""
+
+    def test_cached_user_skips_database(self):
+        headers = auth_headers("member")
+        client.get("/api/v1/customers/", headers=headers)
+        with count_statements() as statements:
+            response = client.get("/api/v1/customers/", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_lookups(statements), [])
+
+    def test_cached_user_is_detached(self):
+        headers = auth_headers("member")
+        client.get("/api/v1/customers/", headers=headers)
+        user = principal_cache.get(str(current_user_id(headers)))
+        self.assertIsNotNone(user)
+        self.assertTrue(user._sa_instance_state.detached)
+        self.assertEqual(user.role, "member")
+
+    def test_update_invalidates(self):
+        owner = auth_headers("owner")
+        member = auth_headers("member")
+        self.assertEqual(client.get("/api/v1/users/", headers=member).status_code, 403)
+
+        response = client.put(
+            f"/api/v1/users/{current_user_id(member)}", json={"role": "owner"}, headers=owner
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get("/api/v1/users/", headers=member).status_code, 200)
+
+    def test_delete_invalidates(self):
+        owner = auth_headers("owner")
+        member = auth_headers("member")
+        self.assertEqual(client.get("/api/v1/customers/", headers=member).status_code, 200)
+
+        response = client.delete(f"/api/v1/users/{current_user_id(member)}", headers=owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.get("/api/v1/customers/", headers=member).status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
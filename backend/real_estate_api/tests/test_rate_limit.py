@@ -0,0 +1,158 @@
+"""
+Tests for the sliding-window rate limiter and its middleware.
+"""
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RateLimitMiddleware
+from app.core.ratelimit import (
+    InMemoryRateLimitStore,
+    SQLiteRateLimitStore,
+    parse_route_limits,
+)
+from app.core.security import create_access_token
+
+
+class StoreBehaviour:
+    """Shared checks for every RateLimitStore backend."""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_limit_within_window(self):
+        store = self.make_store()
+        results = [store.hit("k", limit=3, window=60, now=120 + i) for i in range(4)]
+        self.assertEqual([r.allowed for r in results], [True, True, True, False])
+        self.assertEqual(results[2].remaining, 0)
+        self.assertEqual(results[3].retry_after, 57)
+
+    def test_previous_window_is_weighted(self):
+        store = self.make_store()
+        for i in range(4):
+            store.hit("k", limit=4, window=60, now=60 + i)
+        # Halfway through the next window half of the previous hits still count.
+        self.assertTrue(store.hit("k", limit=4, window=60, now=150).allowed)
+        self.assertTrue(store.hit("k", limit=4, window=60, now=150).allowed)
+        self.assertFalse(store.hit("k", limit=4, window=60, now=150).allowed)
+        self.assertTrue(store.hit("k", limit=4, window=60, now=240).allowed)
+
+    def test_keys_are_independent(self):
+        store = self.make_store()
+        self.assertTrue(store.hit("a", limit=1, window=60, now=0).allowed)
+        self.assertFalse(store.hit("a", limit=1, window=60, now=1).allowed)
+        self.assertTrue(store.hit("b", limit=1, window=60, now=1).allowed)
+
+    def test_hits_count_only_when_every_rule_allows(self):
+        store = self.make_store()
+        self.assertTrue(store.hit("strict", limit=1, window=60, now=0).allowed)
+        results = store.hit_all([("loose", 5, 60), ("strict", 1, 60)], now=1)
+        self.assertEqual([result.allowed for result in results], [True, False])
+        # The rejected request left the loose key untouched.
+        self.assertEqual(store.hit("loose", limit=5, window=60, now=2).remaining, 4)
+
+
+class TestInMemoryStore(StoreBehaviour, unittest.TestCase):
+
+    def make_store(self):
+        return InMemoryRateLimitStore()
+
+    def test_memory_is_bounded(self):
+        store = InMemoryRateLimitStore(max_keys=10)
+        for i in range(100):
+            store.hit(f"ip:{i}", limit=5, window=60, now=0)
+        self.assertEqual(len(store), 10)
+
+
+class TestSQLiteStore(StoreBehaviour, unittest.TestCase):
+
+    def make_store(self):
+        return SQLiteRateLimitStore(os.path.join(tempfile.mkdtemp(), "limits.db"))
+
+    def test_shared_between_instances(self):
+        path = os.path.join(tempfile.mkdtemp(), "limits.db")
+        first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+        self.assertTrue(first.hit("k", limit=1, window=60, now=0).allowed)
+        self.assertFalse(second.hit("k", limit=1, window=60, now=1).allowed)
+
+    def test_async_hits_leave_the_event_loop(self):
+        store = self.make_store()
+        threads = []
+        hit_all = store.hit_all
+
+        def recording_hit_all(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return hit_all(*args, **kwargs)
+
+        store.hit_all = recording_hit_all
+        [result] = asyncio.run(store.hit_all_async([("k", 1, 60)]))
+        self.assertTrue(result.allowed)
+        self.assertNotEqual(threads, [threading.get_ident()])
+
+
+class TestRateLimitMiddleware(unittest.TestCase):
+    """Per-IP, per-user and per-route limits."""
+
+    def setUp(self):
+        app = FastAPI()
+        app.add_middleware(
+            RateLimitMiddleware,
+            rate_limit_per_minute=2,
+            user_rate_limit_per_minute=3,
+            route_limits=parse_route_limits("POST /login=1"),
+            exclude_paths=["/healthz"],
+        )
+
+        @app.get("/items")
+        async def items():
+            return []
+
+        @app.post("/login")
+        async def login():
+            return {}
+
+        @app.get("/healthz")
+        async def healthz():
+            return {}
+
+        self.client = TestClient(app)
+
+    def test_anonymous_limit(self):
+        codes = [self.client.get("/items").status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+        self.assertEqual(self.client.get("/healthz").status_code, 200)
+
+    def test_user_limit(self):
+        headers = {"Authorization": f"Bearer {create_access_token(42)}"}
+        responses = [self.client.get("/items", headers=headers) for _ in range(4)]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 200, 429])
+        self.assertEqual(responses[0].headers["X-RateLimit-Remaining"], "2")
+        self.assertIn("Retry-After", responses[3].headers)
+        # Another user has a separate budget.
+        other = {"Authorization": f"Bearer {create_access_token(43)}"}
+        self.assertEqual(self.client.get("/items", headers=other).status_code, 200)
+
+    def test_route_limit(self):
+        headers = {"Authorization": f"Bearer {create_access_token(44)}"}
+        self.assertEqual(self.client.post("/login", headers=headers).status_code, 200)
+        self.assertEqual(self.client.post("/login", headers=headers).status_code, 429)
+        self.assertEqual(self.client.get("/items", headers=headers).status_code, 200)
+
+
+    def test_route_rejections_keep_the_default_quota(self):
+        headers = {"Authorization": f"Bearer {create_access_token(45)}"}
+        self.assertEqual(self.client.post("/login", headers=headers).status_code, 200)
+        self.assertEqual(self.client.get("/items", headers=headers).headers["X-RateLimit-Remaining"], "1")
+        for _ in range(2):
+            self.assertEqual(self.client.post("/login", headers=headers).status_code, 429)
+        response = self.client.get("/items", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["X-RateLimit-Remaining"], "0")
+
+if __name__ == "__main__":
+    unittest.main()
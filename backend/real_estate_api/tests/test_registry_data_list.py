@@ -0,0 +1,98 @@
+"""
+Tests for the RegistryData listing: filters, keyset pages and column selection.
+"""
+import unittest
+from datetime import datetime
+
+from sqlalchemy import insert, text
+
+from app.db.session import SessionLocal, engine
+from app.models.registry_data import RegistryData
+from tests.utils import auth_headers, client, current_user_id
+
+
+class TestRegistryDataList(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.headers = auth_headers("member")
+        user_id = current_user_id(cls.headers)
+        rows = [
+            # Two rows share a timestamp so the id breaks the tie.
+            (datetime(2025, 4, 1, 9, 0, 0), "Tokyo", "pending"),
+            (datetime(2025, 4, 1, 9, 0, 0), "Osaka", "pending"),
+            (datetime(2025, 4, 2, 9, 30, 0, 250000), "Tokyo", "registered"),
+            (datetime(2025, 4, 3, 23, 59, 59), "Tokyo", "pending"),
+            (datetime(2025, 4, 5, 8, 0, 0), "Kyoto", "error"),
+        ]
+        db = SessionLocal()
+        try:
+            cls.ids = db.scalars(
+                insert(RegistryData).returning(RegistryData.id, sort_by_parameter_order=True),
+                [{
+                    "extracted_at": extracted_at, "prefecture": prefecture, "status": status,
+                    "customer_name": f"Listed {index}", "created_by": user_id,
+                } for index, (extracted_at, prefecture, status) in enumerate(rows)],
+            ).all()
+            db.commit()
+        finally:
+            db.close()
+
+    def walk(self, limit: int, **params):
+        ids = []
+        params["limit"] = limit
+        while True:
+            response = client.get("/api/v1/registry-data/", headers=self.headers, params=params)
+            self.assertEqual(response.status_code, 200, response.text)
+            ids.extend(row["id"] for row in response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                return ids
+            params["cursor"] = cursor
+
+    def test_pages_newest_first(self):
+        first, second, third, fourth, fifth = self.ids
+        self.assertEqual(self.walk(2), [fifth, fourth, third, second, first])
+
+    def test_pages_oldest_first(self):
+        self.assertEqual(self.walk(2, order="asc"), list(self.ids))
+
+    def test_filters(self):
+        first, second, third, fourth, fifth = self.ids
+        self.assertEqual(self.walk(10, status="pending", prefecture="Tokyo"), [fourth, first])
+        self.assertEqual(
+            self.walk(10, extracted_from="2025-04-02", extracted_to="2025-04-03"), [fourth, third]
+        )
+
+    def test_selected_columns_only(self):
+        response = client.get(
+            "/api/v1/registry-data/", headers=self.headers, params={"fields": "customer_name,status", "limit": 1}
+        )
+        self.assertEqual(set(response.json()[0]), {"id", "customer_name", "status"})
+
+        response = client.get("/api/v1/registry-data/", headers=self.headers, params={"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_members_only_see_their_rows(self):
+        other = auth_headers("member")
+        response = client.get("/api/v1/registry-data/", headers=other)
+        self.assertEqual(response.json(), [])
+
+        response = client.get(
+            "/api/v1/registry-data/", headers=other, params={"created_by": current_user_id(self.headers)}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_filtered_pages_use_composite_index(self):
+        with engine.connect() as conn:
+            plan = " ".join(str(row[-1]) for row in conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM registry_data "
+                "WHERE status = 'pending' AND extracted_at IS NOT NULL "
+                "ORDER BY extracted_at DESC, id DESC LIMIT 100"
+            )))
+        self.assertIn("ix_registry_data_status_extracted_at_id", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
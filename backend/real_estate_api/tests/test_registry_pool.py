@@ -0,0 +1,121 @@
+"""
+Tests for the pooled Registry Library sessions.
+"""
+import asyncio
+import time
+import unittest
+
+import httpx
+
+from app.core.registry_pool import RegistrySessionPool, parse_accounts
+from benchmarks.external_stub import app as stub_app
+from tests.utils import auth_headers, client
+
+
+def remote_pool(http: httpx.AsyncClient, **options) -> RegistrySessionPool:
+    options.setdefault("min_interval", 0)
+    return RegistrySessionPool(
+        accounts=[("alice", "secret")], base_url="http://stub", client=http, **options
+    )
+
+
+def run_remote(make_coro):
+    async def runner():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=stub_app)) as http:
+            return await make_coro(http)
+    return asyncio.run(runner())
+
+
+class TestRegistrySessionPool(unittest.TestCase):
+
+    def test_parse_accounts(self):
+        self.assertEqual(parse_accounts("a:1, b:2:3,"), [("a", "1"), ("b", "2:3")])
+
+    def test_concurrency_cap_and_session_reuse(self):
+        pool = RegistrySessionPool(accounts=[("a", "1"), ("b", "2"), ("c", "3")], max_concurrency=2)
+        running, peak = [0], [0]
+
+        async def operation(service):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await asyncio.sleep(0.02)
+            running[0] -= 1
+            return service.username
+
+        async def burst():
+            return await asyncio.gather(*(pool.run(operation) for _ in range(6)))
+
+        users = asyncio.run(burst())
+        self.assertEqual(peak[0], 2)
+        self.assertEqual(set(users), {"a", "b"})
+        stats = pool.stats()
+        self.assertEqual(stats["logins"], 2)
+        self.assertEqual(stats["requests"], 6)
+        self.assertEqual(stats["idle"], 2)
+
+    def test_relogin_after_rejection(self):
+        async def scenario(http):
+            pool = remote_pool(http)
+            first = await pool.run(lambda service: service.get_registry_details("REG1"))
+            stub_app.state.sessions.clear()
+            second = await pool.run(lambda service: service.get_registry_details("REG2"))
+            return pool, first, second
+
+        pool, first, second = run_remote(scenario)
+        self.assertEqual(first["registry_id"], "REG1")
+        self.assertEqual(second["registry_id"], "REG2")
+        self.assertEqual(pool.stats()["relogins"], 1)
+
+    def test_expired_sessions_log_in_again(self):
+        pool = RegistrySessionPool(accounts=[("a", "1")], session_ttl=0)
+
+        async def twice():
+            await pool.run(lambda service: service.search_registry({"name": "x"}))
+            await pool.run(lambda service: service.search_registry({"name": "y"}))
+            return await pool.health_check()
+
+        self.assertEqual(asyncio.run(twice()), 1)
+        self.assertEqual(pool.stats()["logins"], 3)
+
+    def test_periodic_health_checks(self):
+        pool = RegistrySessionPool(accounts=[("a", "1")], session_ttl=0)
+
+        async def scenario():
+            task = asyncio.create_task(pool.run_health_checks(0.01))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            return task
+
+        self.assertTrue(asyncio.run(scenario()).cancelled())
+        self.assertGreaterEqual(pool.stats()["logins"], 2)
+
+    def test_per_session_rate_limit(self):
+        async def scenario(http):
+            pool = remote_pool(http, min_interval=0.05)
+            started = time.monotonic()
+            for registry_id in ("REG1", "REG2", "REG3"):
+                await pool.run(lambda service: service.get_registry_details(registry_id))
+            return time.monotonic() - started
+
+        # One login plus three requests on the same session.
+        self.assertGreaterEqual(run_remote(scenario), 0.15)
+
+
+class TestRegistryEndpoints(unittest.TestCase):
+
+    def test_search_uses_pool(self):
+        owner = auth_headers("owner")
+        before = client.get("/api/v1/external/registry-library/pool", headers=owner).json()
+        response = client.post(
+            "/api/v1/external/registry-library/search?name=Taro", headers=owner
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["owner"], "Taro")
+        after = client.get("/api/v1/external/registry-library/pool", headers=owner).json()
+        self.assertEqual(after["requests"], before["requests"] + 1)
+        self.assertEqual(after["in_use"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""
+Tests for promoting registry rows to customers in bulk.
+"""
+import unittest
+from unittest import mock
+
+from sqlalchemy import insert
+
+from app.core.config import settings
+from app.core.rollups import rebuild_rollups
+from app.db.session import SessionLocal
+from app.models.customer import Customer
+from app.models.duplicate_key import DuplicateKey
+from app.models.registry_data import RegistryData
+from tests.test_analytics_rollups import rollup_snapshot
+from tests.utils import auth_headers, client, count_statements, current_user_id
+
+
+def insert_registry_rows(user_id: int, rows):
+    db = SessionLocal()
+    try:
+        ids = db.scalars(
+            insert(RegistryData).returning(RegistryData.id, sort_by_parameter_order=True),
+            [{"status": "pending", "created_by": user_id, **row} for row in rows],
+        ).all()
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def registry_statuses(ids):
+    db = SessionLocal()
+    try:
+        rows = db.query(RegistryData.id, RegistryData.status).filter(RegistryData.id.in_(ids))
+        return {row_id: row_status for row_id, row_status in rows}
+    finally:
+        db.close()
+
+
+class TestRegistryPromotion(unittest.TestCase):
+
+    def setUp(self):
+        self.headers = auth_headers("member")
+        self.user_id = current_user_id(self.headers)
+
+    def promote(self, headers=None, **body):
+        return client.post("/api/v1/registry-data/promote", headers=headers or self.headers, json=body)
+
+    def test_creates_customers_and_skips_duplicates(self):
+        response = client.post(
+            "/api/v1/customers/",
+            headers=self.headers,
+            json={"name": "Existing Owner", "phone_number": "07077710001", "postal_code": "1500001"},
+        )
+        self.assertEqual(response.status_code, 201, response.text)
+
+        ids = insert_registry_rows(self.user_id, [
+            {"customer_name": "New Owner", "phone_number": "070-7771-0002", "postal_code": "150-0002"},
+            # Same phone as the existing customer, written differently.
+            {"customer_name": "Phone Match", "phone_number": "０７０-７７７１-０００１"},
+            # Same postal code and name as the existing customer.
+            {"customer_name": "Existing Owner", "postal_code": "150-0001"},
+            # Duplicate of the first row in the same request.
+            {"customer_name": "New Owner Again", "phone_number": "07077710002"},
+            {"customer_name": None, "phone_number": "070-7771-0003"},
+            {"customer_name": "Unreadable", "phone_number": "abc", "status": "error"},
+            {"customer_name": "Done Before", "status": "registered"},
+        ])
+
+        response = self.promote(ids=ids)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(
+            response.json(),
+            {"matched": 5, "created": 1, "duplicates": 3, "skipped": 1, "registered": 4},
+        )
+        statuses = registry_statuses(ids)
+        self.assertEqual(
+            [statuses[row_id] for row_id in ids],
+            ["registered"] * 4 + ["pending", "error", "registered"],
+        )
+
+        db = SessionLocal()
+        try:
+            customer = db.query(Customer).filter(Customer.name == "New Owner").one()
+            self.assertEqual(customer.phone_number, "070-7771-0002")
+            self.assertEqual(customer.assigned_to, self.user_id)
+            self.assertEqual(customer.status, "new")
+        finally:
+            db.close()
+
+        # Registered rows are not promoted twice.
+        self.assertEqual(self.promote(ids=ids).json()["matched"], 1)
+
+    def test_matches_other_spellings(self):
+        response = client.post(
+            "/api/v1/customers/",
+            headers=self.headers,
+            json={"name": "山田 花子", "phone_number": "070-8881-0001", "postal_code": "604-0002"},
+        )
+        self.assertEqual(response.status_code, 201, response.text)
+
+        ids = insert_registry_rows(self.user_id, [
+            {"customer_name": "Hanako", "phone_number": "07088810001"},
+            {"customer_name": "山田　花子", "postal_code": "6040002"},
+        ])
+        response = self.promote(ids=ids)
+        self.assertEqual((response.json()["created"], response.json()["duplicates"]), (0, 2))
+
+        response = client.get("/api/v1/customers/duplicates", headers=self.headers)
+        self.assertEqual(response.json(), [])
+
+    def test_filter_and_chunks(self):
+        ids = insert_registry_rows(self.user_id, [
+            {"customer_name": f"Chunk Owner {i}", "phone_number": f"080-4444-{i:04d}", "prefecture": "Nara"}
+            for i in range(7)
+        ])
+        before = rollup_snapshot(self.user_id)
+
+        with mock.patch.object(settings, "REGISTRY_PROMOTE_CHUNK", 3), count_statements() as statements:
+            response = self.promote(prefecture="Nara")
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json()["created"], 7)
+        self.assertEqual(set(registry_statuses(ids).values()), {"registered"})
+        inserts = [sql for sql in statements if sql.startswith("INSERT INTO duplicate_keys")]
+        self.assertEqual(len(inserts), 3)
+        db = SessionLocal()
+        try:
+            # Each customer's duplicate keys carry its own phone number.
+            customers = db.query(Customer).filter(Customer.name.like("Chunk Owner %")).all()
+            self.assertEqual(
+                {customer.name: customer.phone_number for customer in customers},
+                {f"Chunk Owner {i}": f"080-4444-{i:04d}" for i in range(7)},
+            )
+            keys = dict(db.query(DuplicateKey.record_id, DuplicateKey.key).filter(
+                DuplicateKey.record_type == "customer",
+                DuplicateKey.kind == "phone",
+                DuplicateKey.record_id.in_([customer.id for customer in customers]),
+            ))
+            self.assertEqual({customer.id: customer.phone_number.replace("-", "") for customer in customers}, keys)
+        finally:
+            db.close()
+
+        after = rollup_snapshot(self.user_id)
+        self.assertNotEqual(before, after)
+        db = SessionLocal()
+        try:
+            rebuild_rollups(db)
+            db.commit()
+        finally:
+            db.close()
+        self.assertEqual(rollup_snapshot(self.user_id), after)
+
+    def test_permissions(self):
+        ids = insert_registry_rows(self.user_id, [{"customer_name": "Private Owner", "phone_number": "080-3333-0001"}])
+        other = auth_headers("member")
+
+        self.assertEqual(self.promote(other, ids=ids).json()["matched"], 0)
+        self.assertEqual(self.promote(other, created_by=self.user_id).status_code, 403)
+        self.assertEqual(self.promote(ids=ids, assigned_to=current_user_id(other)).status_code, 403)
+        self.assertEqual(registry_statuses(ids)[ids[0]], "pending")
@@ -0,0 +1,229 @@
+"""
+Tests for reception ledger uploads and registry row extraction.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import unittest
+import uuid
+from typing import List, Tuple
+from unittest import mock
+
+from pypdf.errors import PyPdfError
+
+from app.core import registry_extraction
+from app.core.config import settings
+from app.core.registry_extraction import RegistryExtractor, build_records, registry_extractor, split_cells
+from app.db.session import SessionLocal
+from app.models.registry_data import RegistryData
+from tests.utils import auth_headers, client
+
+COLUMNS = [40, 160, 240, 330, 520, 700]
+HEADER = ["Name", "Postal Code", "Prefecture", "Current Address", "Inheritance Address", "Phone"]
+
+
+def make_pdf(pages: List[List[Tuple[int, int, str]]]) -> bytes:
+    """A minimal PDF placing each (x, y, text) with Helvetica."""
+    objects = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objects) + 2 * len(pages) + 1
+    kids = []
+    for items in pages:
+        stream = b"".join(
+            b"BT /F1 9 Tf %d %d Td (%s) Tj ET\n" % (x, y, text.encode("latin-1")) for x, y, text in items
+        )
+        content = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 842 595] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content, font)
+        ))
+    add(b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)))
+    catalog = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+    return bytes(out)
+
+
+def ledger(rows: List[List[str]], rows_per_page: int = 2) -> bytes:
+    """Ledger pages with the header printed on the first page only."""
+    pages = []
+    for start in range(0, len(rows), rows_per_page):
+        items = [(x, 550, text) for x, text in zip(COLUMNS, HEADER)] if not start else []
+        for offset, row in enumerate(rows[start:start + rows_per_page]):
+            items += [(x, 520 - 20 * offset, text) for x, text in zip(COLUMNS, row) if text]
+        pages.append(items)
+    return make_pdf(pages)
+
+
+def parse_events(body: str) -> List[Tuple[str, dict]]:
+    events = []
+    for message in body.strip().split("\n\n"):
+        event, data = message.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+class TestExtraction(unittest.TestCase):
+
+    def test_cells_map_to_nearest_header_column(self):
+        header = [(0, "customer_name"), (20, "postal_code"), (40, "current_address")]
+        rows = [split_cells("Taro Yamada        1500001       東京都渋谷区1-1"),
+                split_cells("Hanako              abc"),
+                split_cells("   page 2 of 3")]
+        records = build_records(header, rows)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["postal_code"], "150-0001")
+        self.assertEqual(records[0]["prefecture"], "東京都")
+        self.assertEqual(records[0]["status"], "pending")
+        self.assertEqual(records[1]["status"], "error")
+
+    def test_threads_extract_different_files_at_once(self):
+        directory = tempfile.mkdtemp()
+        paths, expected = [], []
+        for prefix in ("Ichi", "Ni"):
+            names = [f"{prefix} {index}" for index in range(12)]
+            path = os.path.join(directory, f"{prefix}.pdf")
+            with open(path, "wb") as pdf:
+                pdf.write(ledger([[name, "", "Tokyo", "Tokyo 1", "Osaka 2", ""] for name in names]))
+            paths.append(path)
+            expected.append(names)
+
+        extractor = RegistryExtractor(workers=4, use_processes=False)
+        used = []
+
+        def recording_reader(path):
+            reader = real_reader(path)
+            used.append((reader, threading.get_ident()))
+            return reader
+
+        async def names(path):
+            return [record["customer_name"] async for _, _, records in extractor.extract(path) for record in records]
+
+        async def both():
+            return await asyncio.gather(*(names(path) for path in paths))
+
+        real_reader = registry_extraction._reader
+        try:
+            with mock.patch.object(registry_extraction, "_reader", recording_reader):
+                self.assertEqual(asyncio.run(both()), expected)
+        finally:
+            extractor.shutdown()
+        # pypdf readers are not thread-safe, so none may be shared between threads.
+        threads = {}
+        for reader, thread in used:
+            threads.setdefault(id(reader), set()).add(thread)
+        self.assertEqual([len(owners) for owners in threads.values()], [1] * len(threads))
+
+
+class TestRegistryUpload(unittest.TestCase):
+
+    def upload(self, *files: bytes, headers=None):
+        return client.post(
+            "/api/v1/registry-data/upload",
+            files=[("files", (f"ledger{index}.pdf", content, "application/pdf")) for index, content in enumerate(files)],
+            headers=headers or auth_headers("member"),
+        )
+
+    def test_upload_extracts_rows_across_pages(self):
+        name = f"Taro {uuid.uuid4().hex[:8]}"
+        pdf = ledger([
+            [name, "150-0001", "Tokyo", "Tokyo Shibuya 1-1-1", "Osaka Chuo 2-2-2", "03-1234-5678"],
+            ["Hanako Sato", "", "Kanagawa", "Yokohama Naka 3-3", "Kyoto Sakyo 4-4", "090-1111-2222"],
+            ["Jiro Suzuki", "604-0001", "Kyoto", "Kyoto Nakagyo 5-5", "Nara 6-6", "075-123-4567"],
+        ])
+        response = self.upload(pdf)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+
+        events = parse_events(response.text)
+        kinds = [kind for kind, _ in events]
+        self.assertEqual(kinds, ["upload", "progress", "progress", "file", "complete"])
+        self.assertEqual(events[2][1]["pages_done"], 2)
+
+        file_event = events[3][1]
+        self.assertEqual((file_event["pages"], file_event["rows"]), (2, 3))
+        first = file_event["records"][0]
+        self.assertEqual((first["customer_name"], first["phone_number"]), (name, "03-1234-5678"))
+        self.assertEqual(file_event["records"][2]["inheritance_address"], "Nara 6-6")
+
+        db = SessionLocal()
+        try:
+            row = db.query(RegistryData).filter(RegistryData.id == first["id"]).one()
+            self.assertEqual(row.customer_name, name)
+            self.assertEqual(row.pdf_sha256, file_event["sha256"])
+            self.assertEqual(row.status, "pending")
+        finally:
+            db.close()
+
+    def test_reupload_is_scoped_to_the_caller(self):
+        pdf = ledger([[f"Goro {uuid.uuid4().hex[:8]}", "", "Tokyo", "Tokyo 1", "Osaka 2", "03-2222-0001"]])
+        headers = auth_headers("member")
+        self.assertFalse(parse_events(self.upload(pdf, headers=headers).text)[-2][1]["duplicate"])
+
+        again = parse_events(self.upload(pdf, headers=headers).text)
+        self.assertTrue(again[1][1]["duplicate"])
+        self.assertEqual(again[-1][1]["rows"], 0)
+        self.assertTrue(parse_events(self.upload(pdf, headers=auth_headers("owner")).text)[1][1]["duplicate"])
+
+        # Another member has not seen these rows, so the file is extracted for them.
+        other = parse_events(self.upload(pdf).text)
+        self.assertEqual((other[-2][1]["duplicate"], other[-2][1]["rows"]), (False, 1))
+
+    def test_interrupted_extraction_is_redone(self):
+        name = f"Rokuro {uuid.uuid4().hex[:8]}"
+        pdf = ledger([
+            [name, "", "Tokyo", "Tokyo 1", "Osaka 2", "03-2222-0002"],
+            ["Shichiro", "", "Tokyo", "Tokyo 3", "Osaka 4", "03-2222-0003"],
+            ["Hachiro", "", "Tokyo", "Tokyo 5", "Osaka 6", "03-2222-0004"],
+        ])
+        headers = auth_headers("member")
+
+        async def broken(path):
+            async for progress in real_extract(path):
+                yield progress
+                raise PyPdfError("truncated")
+
+        real_extract = registry_extractor.extract
+        with mock.patch.object(settings, "REGISTRY_UPLOAD_INSERT_BATCH", 1), \
+                mock.patch.object(registry_extractor, "extract", broken):
+            events = parse_events(self.upload(pdf, headers=headers).text)
+        self.assertEqual(events[-2][0], "error")
+
+        db = SessionLocal()
+        try:
+            self.assertEqual(db.query(RegistryData).filter(RegistryData.customer_name == name).count(), 0)
+        finally:
+            db.close()
+
+        events = parse_events(self.upload(pdf, headers=headers).text)
+        self.assertEqual((events[-2][1]["duplicate"], events[-2][1]["rows"]), (False, 3))
+
+    def test_rejects_non_pdf_files(self):
+        self.assertEqual(self.upload(b"name,phone\n").status_code, 400)
+
+    def test_rejects_oversized_files(self):
+        with mock.patch.object(settings, "REGISTRY_UPLOAD_MAX_BYTES", 10):
+            self.assertEqual(self.upload(ledger([["A", "", "", "B", "", ""]])).status_code, 413)
+
+    def test_requires_multipart(self):
+        response = client.post("/api/v1/registry-data/upload", json={}, headers=auth_headers("member"))
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Helpers shared by the API tests.
+"""
+import uuid
+from contextlib import contextmanager
+from typing import Dict
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.main import app
+from app.db.init_db import init_db
+from app.db.session import async_engine, engine
+
+init_db()
+
+client = TestClient(app)
+
+CSRF_TOKEN = "test-csrf-token"
+
+
+def auth_headers(role: str = "owner") -> Dict[str, str]:
+    """Register a fresh user and return headers for authenticated, CSRF-valid requests."""
+    suffix = uuid.uuid4().hex[:12]
+    email = f"{role}{suffix}@example.com"
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": f"{role}{suffix}",
+            "email": email,
+            "password": "testpassword",
+            "role": role,
+            "company": "Test Company"
+        }
+    )
+    response = client.post(
+        "/api/v1/auth/login",
+        data={"username": email, "password": "testpassword"}
+    )
+    token = response.json()["access_token"]
+    return {
+        "Authorization": f"Bearer {token}",
+        "X-CSRF-Token": CSRF_TOKEN,
+        "Cookie": f"csrf_token={CSRF_TOKEN}",
+    }
+
+
+def current_user_id(headers: Dict[str, str]) -> int:
+    from jose import jwt
+    from app.core.config import settings
+
+    token = headers["Authorization"].split(" ", 1)[1]
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    return int(payload["sub"])
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    # API routes run on the async engine when DB_ASYNC is enabled.
+    target = async_engine.sync_engine if async_engine is not None else engine
+    event.listen(target, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
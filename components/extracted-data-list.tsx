@@ -1,6 +1,6 @@
 "use client"
 
-import { useState } from "react"
+import { useEffect, useState } from "react"
 import { Button } from "@/components/ui/button"
 import { Input } from "@/components/ui/input"
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from "@/components/ui/table"
@@ -24,6 +24,7 @@ import { Card, CardContent, CardDescription, CardHeader, CardTitle } from "@/com
 import { Badge } from "@/components/ui/badge"
 import { Download, MoreHorizontal, Search, Trash2, Edit, CheckCircle, MapPin } from "lucide-react"
 import { useToast } from "@/hooks/use-toast"
+import { registryDataAPI } from "@/lib/api"
 
 // 抽出データの型定義
 type ExtractedData = {
@@ -37,82 +38,54 @@ type ExtractedData = {
   status: "pending" | "registered" | "error"
 }
 
-// 都道府県リスト
-const prefectures = [
-  "北海道",
-  "青森県",
-  "岩手県",
-  "宮城県",
-  "秋田県",
-  "山形県",
-  "福島県",
-  "茨城県",
-  "栃木県",
-  "群馬県",
-  "埼玉県",
-  "千葉県",
-  "東京都",
-  "神奈川県",
-  "新潟県",
-  "富山県",
-  "石川県",
-  "福井県",
-  "山梨県",
-  "長野県",
-  "岐阜県",
-  "静岡県",
-  "愛知県",
-  "三重県",
-  "滋賀県",
-  "京都府",
-  "大阪府",
-  "兵庫県",
-  "奈良県",
-  "和歌山県",
-  "鳥取県",
-  "島根県",
-  "岡山県",
-  "広島県",
-  "山口県",
-  "徳島県",
-  "香川県",
-  "愛媛県",
-  "高知県",
-  "福岡県",
-  "佐賀県",
-  "長崎県",
-  "熊本県",
-  "大分県",
-  "宮崎県",
-  "鹿児島県",
-  "沖縄県",
-]
+// 一覧で取得する列（サーバーは指定された列だけを返す）
+const LIST_FIELDS = "extracted_at,customer_name,postal_code,prefecture,current_address,inheritance_address,status"
 
-// ダミーデータ生成
-const generateDummyData = (): ExtractedData[] => {
-  return Array.from({ length: 10 }, (_, i) => {
-    const prefecture = prefectures[Math.floor(Math.random() * prefectures.length)]
-    return {
-      id: `EXT-${1000 + i}`,
-      extractedAt: new Date(Date.now() - i * 24 * 60 * 60 * 1000).toISOString().split("T")[0],
-      customerName: `相続者 太郎${i + 1}`,
-      postalCode: `${100 + Math.floor(Math.random() * 900)}-${1000 + Math.floor(Math.random() * 9000)}`,
-      prefecture: prefecture,
-      currentAddress: `${prefecture}${["新宿区", "渋谷区", "中央区", "港区"][i % 4]}${i + 1}-${i + 1}-${i + 1}`,
-      inheritanceAddress: `${prefecture}${["品川区", "目黒区", "世田谷区", "杉並区"][i % 4]}${i + 1}-${i + 1}-${i + 1}`,
-      status: i % 5 === 0 ? "registered" : i % 4 === 0 ? "error" : "pending",
-    }
-  })
-}
+// APIの行を画面の型に変換
+const toExtractedData = (row: any): ExtractedData => ({
+  id: String(row.id),
+  extractedAt: String(row.extracted_at).split("T")[0],
+  customerName: row.customer_name ?? "",
+  postalCode: row.postal_code ?? "",
+  prefecture: row.prefecture ?? "",
+  currentAddress: row.current_address ?? "",
+  inheritanceAddress: row.inheritance_address ?? "",
+  status: row.status ?? "pending",
+})
 
 export default function ExtractedDataList() {
-  const [extractedData, setExtractedData] = useState<ExtractedData[]>(generateDummyData())
+  const [extractedData, setExtractedData] = useState<ExtractedData[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [isLoading, setIsLoading] = useState(false)
   const [searchTerm, setSearchTerm] = useState("")
   const [selectedData, setSelectedData] = useState<ExtractedData | null>(null)
   const [isEditDialogOpen, setIsEditDialogOpen] = useState(false)
   const [isDeleteDialogOpen, setIsDeleteDialogOpen] = useState(false)
   const { toast } = useToast()
 
+  // 抽出データの読み込み（カーソルで次のページを追加取得）
+  const loadPage = async (cursor?: string) => {
+    setIsLoading(true)
+    try {
+      const response = await registryDataAPI.list({ limit: 100, cursor, fields: LIST_FIELDS })
+      const rows = response.data.map(toExtractedData)
+      setExtractedData((prev) => (cursor ? [...prev, ...rows] : rows))
+      setNextCursor(response.headers["x-next-cursor"] ?? null)
+    } catch (error) {
+      toast({
+        title: "抽出データを取得できませんでした",
+        description: error instanceof Error ? error.message : String(error),
+        variant: "destructive",
+      })
+    } finally {
+      setIsLoading(false)
+    }
+  }
+
+  useEffect(() => {
+    loadPage()
+  }, [])
+
   // 検索フィルター
   const filteredData = extractedData.filter(
     (data) =>
@@ -348,6 +321,14 @@ export default function ExtractedDataList() {
               </TableBody>
             </Table>
           </div>
+
+          {nextCursor && (
+            <div className="flex justify-center mt-4">
+              <Button variant="outline" onClick={() => loadPage(nextCursor)} disabled={isLoading}>
+                {isLoading ? "読み込み中..." : "さらに読み込む"}
+              </Button>
+            </div>
+          )}
         </div>
       </CardContent>
 
@@ -49,17 +49,103 @@ export const customerAPI = {
   deleteCustomer: (id: number) => api.delete(`/customers/${id}`),
   getCustomerActivities: (id: number) => api.get(`/customers/${id}/activities`),
   addCustomerActivity: (id: number, activityData: any) => api.post(`/customers/${id}/activities`, activityData),
-  exportCustomers: () => api.get('/customers/export'),
+  exportCustomers: (params?: any) => api.get('/customers/export', { params, responseType: 'blob' }),
+  // Clusters of customers and registry rows sharing a phone number, postal code + name or email local part.
+  getDuplicates: (params?: { kind?: 'phone' | 'name' | 'email'; assigned_to?: number; cursor?: string; limit?: number }) =>
+    api.get('/customers/duplicates', { params }),
+  scanDuplicates: () => api.post('/customers/duplicates/scan'),
+  // Mixed create/update/delete; results holds one { status, id, detail } per operation, in order.
+  bulkCustomers: (operations: { op: 'create' | 'update' | 'delete'; id?: number; data?: any }[]) =>
+    api.post('/customers/bulk', { operations }),
 };
 
 export const externalAPI = {
   lookupPostalCode: (postalCode: string) => api.get(`/external/postal-code/${postalCode}`),
   lookupPhoneNumber: (phoneNumber: string) => api.get(`/external/phone-number/${phoneNumber}`),
+  // Batch lookups answer with NDJSON, one line per distinct value.
+  lookupPostalCodes: (postalCodes: string[]) => api.post('/external/postal-code/batch', { postal_codes: postalCodes }, { responseType: 'text' }),
+  lookupPhoneNumbers: (phoneNumbers: string[]) => api.post('/external/phone-number/batch', { phone_numbers: phoneNumbers }, { responseType: 'text' }),
   registryLibraryLogin: () => api.post('/external/registry-library/login'),
   registryLibrarySearch: (params: any) => api.post('/external/registry-library/search', params),
   getRegistryDetails: (registryId: string) => api.get(`/external/registry-library/details/${registryId}`),
 };
 
+// Registry Library work runs as background jobs; poll getJob or stream jobEventsUrl (SSE).
+export const jobsAPI = {
+  submitRegistrySearch: (criteria: { name?: string; address?: string }) => api.post('/jobs/registry-search', criteria),
+  submitRegistryDetails: (registryId: string) => api.post('/jobs/registry-details', { registry_id: registryId }),
+  getJob: (jobId: string) => api.get(`/jobs/${jobId}`),
+  jobEventsUrl: (jobId: string) => `${api.defaults.baseURL}/jobs/${jobId}/events`,
+};
+
+export type RegistryUploadEvent = { event: string; data: any };
+
+// Uploads reception ledger PDFs; extraction progress arrives as Server-Sent Events.
+export const registryDataAPI = {
+  // Keyset pages: pass the X-Next-Cursor response header back as `cursor`.
+  list: (params?: {
+    limit?: number;
+    cursor?: string;
+    order?: 'asc' | 'desc';
+    status?: string;
+    prefecture?: string;
+    created_by?: number;
+    extracted_from?: string;
+    extracted_to?: string;
+    fields?: string;
+  }) => api.get('/registry-data/', { params }),
+  // Creates customers from rows given by id or by the list filters; returns counts only.
+  promote: (data: {
+    ids?: number[];
+    status?: string;
+    prefecture?: string;
+    created_by?: number;
+    extracted_from?: string;
+    extracted_to?: string;
+    assigned_to?: number;
+  }) => api.post('/registry-data/promote', data),
+  uploadLedgers: (
+    files: File[],
+    handlers: { onUploadProgress?: (percent: number) => void; onEvent?: (event: RegistryUploadEvent) => void } = {},
+  ) =>
+    new Promise<void>((resolve, reject) => {
+      const form = new FormData();
+      files.forEach((file) => form.append('files', file));
+      const xhr = new XMLHttpRequest();
+      xhr.open('POST', `${API_BASE_URL}/registry-data/upload`);
+      const token = typeof window !== 'undefined' ? sessionStorage.getItem('token') : null;
+      if (token) {
+        xhr.setRequestHeader('Authorization', `Bearer ${token}`);
+      }
+      xhr.upload.onprogress = (e) => {
+        if (e.lengthComputable) handlers.onUploadProgress?.((e.loaded / e.total) * 100);
+      };
+      let parsed = 0;
+      const flush = () => {
+        const messages = xhr.responseText.slice(parsed).split('\n\n');
+        messages.pop(); // incomplete message
+        for (const message of messages) {
+          parsed += message.length + 2;
+          const lines = message.split('\n');
+          const event = lines.find((line) => line.startsWith('event: '))?.slice(7) ?? 'message';
+          const data = lines.find((line) => line.startsWith('data: '))?.slice(6);
+          if (data !== undefined) handlers.onEvent?.({ event, data: JSON.parse(data) });
+        }
+      };
+      xhr.onprogress = flush;
+      xhr.onload = () => {
+        if (xhr.status >= 400) {
+          reject(new Error(JSON.parse(xhr.responseText || '{}').detail || `Upload failed (${xhr.status})`));
+          return;
+        }
+        flush();
+        resolve();
+      };
+      xhr.onerror = () => reject(new Error('Upload failed'));
+      xhr.send(form);
+    }),
+};
+
 export const analyticsAPI = {
   getDashboardData: () => api.get('/analytics/dashboard'),
   getStatusData: () => api.get('/analytics/status'),